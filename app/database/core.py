@@ -18,6 +18,11 @@ from models.ClientSetting import ClientSetting
 from models.Entity import Entity
 from models.CardFile import CardFile
 from models.CardMessage import CardMessage
+from models.ScheduledTask import ScheduledTask
+from models.FailedTask import FailedTask
+from models.AIResponse import AIResponse
+from models.CalendarEvent import CalendarEvent
+from models.CalendarSyncState import CalendarSyncState
 
 from modules.enums import UserRole
 
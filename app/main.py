@@ -23,7 +23,14 @@ async def main():
     from database.connection import session_factory
     from modules.tasks.scheduler import TaskScheduler
 
-    scheduler = TaskScheduler(session_factory=session_factory)
+    scheduler = TaskScheduler(
+        session_factory=session_factory,
+        max_concurrency=10
+    )
+
+    # Периодическая сверка хранилища файлов с card_files
+    from modules.tasks.storage_gc import check_and_create_storage_gc_task
+    await check_and_create_storage_gc_task()
 
     # ──────────────── 4. Запуск всего вместе ─────────────
     executor_tasks = manager.start_all()
@@ -31,7 +38,25 @@ async def main():
 
     all_tasks = executor_tasks + [scheduler_task]
 
-    await asyncio.gather(*all_tasks, return_exceptions=True)
+    # Перечитывание json/*.json при изменении файлов
+    from modules.json_utils import config_registry
+    config_task = asyncio.create_task(config_registry.watch())
+
+    # Локальная копия Google Calendar (если календарь настроен)
+    from modules.calendar.calendar import run_calendar_sync
+    calendar_task = asyncio.create_task(run_calendar_sync())
+
+    try:
+        await asyncio.gather(*all_tasks, return_exceptions=True)
+    finally:
+        # Даём уже запущенным публикациям завершиться
+        await scheduler.stop(drain=True)
+
+        config_task.cancel()
+        calendar_task.cancel()
+
+        from modules.image_pool import image_pool
+        image_pool.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from database.connection import Base
+from database.crud_mixins import AsyncCRUDMixin
+from database.annotated_types import createAT
+
+
+class AIResponse(Base, AsyncCRUDMixin):
+    """
+    Кэш ответов AI по хешу промпта (см. :mod:`modules.ai`).
+
+    Хранятся только ответы, прошедшие проверку шлюза; устаревшие
+    по ``ttl`` записи игнорируются и перезаписываются при следующем ответе.
+    """
+    __tablename__ = "ai_responses"
+
+    # SHA-256 от имени провайдера и текста промпта
+    prompt_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    provider: Mapped[str] = mapped_column(String(100), nullable=False)
+    response: Mapped[str] = mapped_column(Text, nullable=False)
+
+    created_at: Mapped[createAT]
+
+    def __repr__(self) -> str:
+        return f"<AIResponse(hash={self.prompt_hash[:12]}, provider='{self.provider}')>"
+
+    @classmethod
+    async def get_fresh(cls, prompt_hash: str, ttl: timedelta) -> Optional[str]:
+        """Ответ из кэша, если он моложе ``ttl``."""
+        from sqlalchemy import select
+
+        threshold = datetime.now(timezone.utc).replace(tzinfo=None) - ttl
+        async with cls._get_session_static() as session:
+            result = await session.execute(
+                select(cls.response).where(
+                    cls.prompt_hash == prompt_hash,
+                    cls.created_at >= threshold,
+                )
+            )
+            return result.scalar_one_or_none()
+
+    @classmethod
+    async def store(cls, prompt_hash: str, provider: str, response: str) -> None:
+        """Записать ответ одним ``INSERT ... ON CONFLICT DO UPDATE``."""
+        from sqlalchemy import func
+        from sqlalchemy.dialects.postgresql import insert
+        from database.connection import session_factory
+
+        stmt = insert(cls).values(prompt_hash=prompt_hash, provider=provider, response=response)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.prompt_hash],
+            set_={
+                "provider": stmt.excluded.provider,
+                "response": stmt.excluded.response,
+                "created_at": func.timezone("utc", func.now()),
+            },
+        )
+
+        async with session_factory() as session:
+            await session.execute(stmt)
+            await session.commit()
@@ -0,0 +1,172 @@
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import String, DateTime, Boolean, Index, delete as sql_delete, select
+from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from database.connection import Base
+from database.crud_mixins import AsyncCRUDMixin
+from database.annotated_types import updateAT
+
+# Строк на один INSERT / ID на один DELETE: asyncpg ограничивает запрос
+# 32767 параметрами, а на строку события их около десятка
+WRITE_CHUNK = 500
+
+
+def _parse_time(value: dict) -> Optional[datetime]:
+    """``start``/``end`` события Google → naive UTC (дата — полночь)."""
+    if not value:
+        return None
+    if value.get('dateTime'):
+        parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    if value.get('date'):
+        return datetime.fromisoformat(value['date'])
+    return None
+
+
+class CalendarEvent(Base, AsyncCRUDMixin):
+    """
+    Локальная копия событий Google Calendar (см. :mod:`modules.calendar.mirror`).
+
+    Хранится событие целиком (``data``) и поля для выборок по времени.
+    Удалённые в календаре события из таблицы удаляются.
+    """
+    __tablename__ = "calendar_events"
+    __table_args__ = (
+        # Выборка событий и проверка занятости по интервалу
+        Index("ix_calendar_events_range", "calendar_id", "start_at", "end_at"),
+    )
+
+    calendar_id: Mapped[str] = mapped_column(String, primary_key=True)
+    event_id: Mapped[str] = mapped_column(String(1024), primary_key=True)
+
+    summary: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default='confirmed')
+    # Время в UTC без timezone
+    start_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    end_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    all_day: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # Исходное событие из API
+    data: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+
+    synced_at: Mapped[updateAT]
+
+    def __repr__(self) -> str:
+        return f"<CalendarEvent(id='{self.event_id}', start={self.start_at})>"
+
+    @staticmethod
+    def row_from_event(calendar_id: str, event: dict) -> dict[str, Any]:
+        start = event.get('start') or {}
+        return {
+            "calendar_id": calendar_id,
+            "event_id": event["id"],
+            "summary": event.get("summary"),
+            "status": event.get("status") or "confirmed",
+            "start_at": _parse_time(start),
+            "end_at": _parse_time(event.get('end') or {}),
+            "all_day": 'date' in start,
+            "data": event,
+        }
+
+    @classmethod
+    async def apply_changes(cls,
+                            calendar_id: str,
+                            events: Iterable[dict] = (),
+                            deleted_ids: Iterable[str] = (),
+                            replace: bool = False,
+                            session=None) -> None:
+        """
+        Записать изменения через ``INSERT ... ON CONFLICT DO UPDATE``.
+
+        Строки пишутся пачками по ``WRITE_CHUNK`` в одной транзакции.
+
+        Args:
+            events: События API для вставки/обновления
+            deleted_ids: ID удалённых событий
+            replace: Полная синхронизация — сначала удалить все события календаря
+        """
+        from sqlalchemy import func
+        from sqlalchemy.dialects.postgresql import insert
+
+        rows = {}
+        for event in events:
+            if event.get("id"):
+                rows[event["id"]] = cls.row_from_event(calendar_id, event)
+        deleted = [event_id for event_id in deleted_ids if event_id not in rows]
+
+        async with cls._get_session_static(session) as sess:
+            if replace:
+                await sess.execute(sql_delete(cls).where(cls.calendar_id == calendar_id))
+            else:
+                for i in range(0, len(deleted), WRITE_CHUNK):
+                    await sess.execute(sql_delete(cls).where(
+                        cls.calendar_id == calendar_id,
+                        cls.event_id.in_(deleted[i:i + WRITE_CHUNK]),
+                    ))
+
+            values = list(rows.values())
+            for i in range(0, len(values), WRITE_CHUNK):
+                stmt = insert(cls).values(values[i:i + WRITE_CHUNK])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[cls.calendar_id, cls.event_id],
+                    set_={
+                        "summary": stmt.excluded.summary,
+                        "status": stmt.excluded.status,
+                        "start_at": stmt.excluded.start_at,
+                        "end_at": stmt.excluded.end_at,
+                        "all_day": stmt.excluded.all_day,
+                        "data": stmt.excluded.data,
+                        "synced_at": func.timezone("utc", func.now()),
+                    },
+                )
+                await sess.execute(stmt)
+
+            if session is None:
+                await sess.commit()
+
+    @classmethod
+    def _overlapping(cls, calendar_id: str, time_min: datetime, time_max: datetime):
+        return select(cls).where(
+            cls.calendar_id == calendar_id,
+            cls.start_at < time_max,
+            cls.end_at > time_min,
+        )
+
+    @classmethod
+    async def between(cls,
+                      calendar_id: str,
+                      time_min: datetime,
+                      time_max: datetime,
+                      limit: Optional[int] = None,
+                      order_by: str = 'startTime') -> list[dict]:
+        """События (как в API), пересекающие интервал ``[time_min, time_max)``."""
+        query = cls._overlapping(calendar_id, time_min, time_max)
+        if order_by == 'updated':
+            query = query.order_by(cls.synced_at)
+        else:
+            query = query.order_by(cls.start_at, cls.event_id)
+        if limit:
+            query = query.limit(limit)
+
+        async with cls._get_session_static() as session:
+            result = await session.execute(query)
+            return [event.data for event in result.scalars()]
+
+    @classmethod
+    async def is_free(cls, calendar_id: str, start: datetime, end: datetime) -> bool:
+        """Нет ни одного события, пересекающего ``[start, end)``."""
+        query = cls._overlapping(calendar_id, start, end).with_only_columns(cls.event_id).limit(1)
+        async with cls._get_session_static() as session:
+            result = await session.execute(query)
+            return result.first() is None
+
+    @classmethod
+    async def get_event(cls, calendar_id: str, event_id: str) -> Optional[dict]:
+        async with cls._get_session_static() as session:
+            result = await session.execute(
+                select(cls.data).where(cls.calendar_id == calendar_id, cls.event_id == event_id)
+            )
+            return result.scalar_one_or_none()
@@ -0,0 +1,49 @@
+from typing import Optional
+
+from sqlalchemy import String, Text, select
+from sqlalchemy.orm import Mapped, mapped_column
+from database.connection import Base
+from database.crud_mixins import AsyncCRUDMixin
+from database.annotated_types import updateAT
+
+
+class CalendarSyncState(Base, AsyncCRUDMixin):
+    """
+    Sync token Google Calendar для инкрементальной синхронизации
+    таблицы calendar_events (одна строка на календарь).
+    """
+    __tablename__ = "calendar_sync_state"
+
+    calendar_id: Mapped[str] = mapped_column(String, primary_key=True)
+    sync_token: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    synced_at: Mapped[updateAT]
+
+    def __repr__(self) -> str:
+        return f"<CalendarSyncState(calendar='{self.calendar_id}', synced_at={self.synced_at})>"
+
+    @classmethod
+    async def get_token(cls, calendar_id: str) -> Optional[str]:
+        async with cls._get_session_static() as session:
+            result = await session.execute(
+                select(cls.sync_token).where(cls.calendar_id == calendar_id)
+            )
+            return result.scalar_one_or_none()
+
+    @classmethod
+    async def save_token(cls, calendar_id: str, sync_token: Optional[str], session=None) -> None:
+        from sqlalchemy import func
+        from sqlalchemy.dialects.postgresql import insert
+
+        stmt = insert(cls).values(calendar_id=calendar_id, sync_token=sync_token)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.calendar_id],
+            set_={
+                "sync_token": stmt.excluded.sync_token,
+                "synced_at": func.timezone("utc", func.now()),
+            },
+        )
+        async with cls._get_session_static(session) as sess:
+            await sess.execute(stmt)
+            if session is None:
+                await sess.commit()
@@ -130,6 +130,146 @@ class Card(Base, AsyncCRUDMixin):
             result = await session.execute(query)
             return list(result.scalars().all())
 
+    @classmethod
+    async def load_aggregate(
+        cls, card_id, session: Optional["AsyncSession"] = None
+    ) -> "Optional[Card]":
+        """Карточка с контентом, настройками клиентов, ентити и файлами.
+
+        Для публикации, где нужны все данные сразу (см. :meth:`publish_view`).
+        Коллекции загружаются через selectinload: карточка и по одному
+        ``SELECT ... WHERE card_id IN (...)`` на каждую связь — всего пять
+        запросов. Один запрос с joinedload по четырём коллекциям дал бы
+        декартово произведение (версии контента × файлы × ентити × настройки)
+        и рос бы мультипликативно вместе с историей контента.
+        """
+        from sqlalchemy import select
+        from sqlalchemy.orm import selectinload
+
+        try:
+            key = _UUID(str(card_id))
+        except (ValueError, TypeError):
+            return None
+
+        async with cls._get_session_static(session) as sess:
+            result = await sess.execute(
+                select(cls)
+                .where(cls.card_id == key)
+                .options(
+                    selectinload(cls.contents),
+                    selectinload(cls.clients_settings_entries),
+                    selectinload(cls.entities_entries),
+                    selectinload(cls.files),
+                )
+            )
+            return result.scalar_one_or_none()
+
+    def publish_view(self, client_key: str) -> dict:
+        """Данные для отправки поста клиенту ``client_key``.
+
+        Работает только с загруженными связями (:meth:`load_aggregate`):
+        последний контент клиента (или общий), общие настройки,
+        дополненные настройками клиента, ентити клиента и общие,
+        записи файлов в порядке ``post_images``.
+        """
+        content = self.content
+        settings = self.clients_settings
+        merged_settings = dict(settings.get('all', {}))
+        merged_settings.update(settings.get(client_key, {}))
+
+        files_by_id = {str(f.id): f for f in self.files or []}
+        post_images = self.post_images or []
+
+        return {
+            "content": content.get(client_key) or content.get('all') or 'nothing',
+            "tags": self.tags,
+            "post_images": post_images,
+            "settings": merged_settings,
+            "entities": [
+                e.to_dict() for e in self.entities_entries or []
+                if e.client_key == client_key or e.client_key is None
+            ],
+            "files": [files_by_id[str(i)] for i in post_images if str(i) in files_by_id],
+        }
+
+    # Дедлайн для сортировки карточек без задания (в конец списка)
+    _NO_DEADLINE = datetime(9999, 12, 31)
+
+    @classmethod
+    async def find_page(
+        cls,
+        after: Optional[list] = None,
+        limit: int = 5,
+        executor_id=None,
+        customer_id=None,
+        member_id=None,
+        department=None,
+        status=None,
+    ) -> tuple[list[dict], int]:
+        """Страница карточек по дедлайну задания (keyset-пагинация) и общее количество.
+
+        Фильтры (все опциональны) — по заданию карточки:
+        ``executor_id``, ``customer_id``, ``member_id`` (исполнитель или заказчик),
+        ``department`` (исполнитель или заказчик из отдела), ``status`` карточки.
+
+        Args:
+            after: Курсор ``[deadline, card_id]`` последней карточки предыдущей страницы
+            limit: Размер страницы
+
+        Returns:
+            ([{"card_id", "name", "deadline", "cursor"}], total)
+        """
+        from sqlalchemy import select, func, or_, tuple_
+        from database.connection import session_factory
+        from models.Task import Task
+        from models.User import User
+
+        conditions = []
+        if executor_id is not None:
+            conditions.append(Task.executor_id == _UUID(str(executor_id)))
+        if customer_id is not None:
+            conditions.append(Task.customer_id == _UUID(str(customer_id)))
+        if member_id is not None:
+            member = _UUID(str(member_id))
+            conditions.append(or_(Task.executor_id == member, Task.customer_id == member))
+        if department is not None:
+            members = select(User.user_id).where(User.department == department)
+            conditions.append(or_(Task.executor_id.in_(members), Task.customer_id.in_(members)))
+        if status is not None:
+            conditions.append(cls.status == status)
+
+        sort_key = func.coalesce(Task.deadline, cls._NO_DEADLINE)
+        base = select(cls.card_id).outerjoin(Task, Task.task_id == cls.task_id).where(*conditions)
+
+        query = (
+            select(cls.card_id, cls.name, Task.deadline, sort_key)
+            .outerjoin(Task, Task.task_id == cls.task_id)
+            .where(*conditions)
+            .order_by(sort_key, cls.card_id)
+            .limit(limit)
+        )
+        if after:
+            query = query.where(
+                tuple_(sort_key, cls.card_id)
+                > tuple_(datetime.fromisoformat(after[0]), _UUID(str(after[1])))
+            )
+
+        async with session_factory() as session:
+            rows = (await session.execute(query)).all()
+            total = (await session.execute(
+                select(func.count()).select_from(base.subquery())
+            )).scalar_one()
+
+        return [
+            {
+                "card_id": str(card_id),
+                "name": name,
+                "deadline": deadline.isoformat() if deadline else None,
+                "cursor": [key.isoformat(), str(card_id)],
+            }
+            for card_id, name, deadline, key in rows
+        ], total
+
     @classmethod
     async def by_message_id(cls, message_id: int) -> "Optional[Card]":
         """Найти карточку по ID сообщения форума или превью."""
@@ -1,7 +1,7 @@
 from typing import Optional, TYPE_CHECKING
 from datetime import datetime
 from uuid import UUID as _UUID
-from sqlalchemy import Text, String, DateTime, ForeignKey
+from sqlalchemy import Text, String, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database.connection import Base
@@ -13,6 +13,10 @@ if TYPE_CHECKING:
 
 class CardContent(Base, AsyncCRUDMixin):
     __tablename__ = "card_contents"
+    __table_args__ = (
+        # get_content(card_id, client_key) и выбор последней версии текста
+        Index("ix_card_contents_card_client_created", "card_id", "client_key", "created_at"),
+    )
 
     id: Mapped[uuidPK]
     card_id: Mapped[_UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("cards.card_id", ondelete="CASCADE"), nullable=False)
@@ -1,6 +1,6 @@
 from typing import Optional, TYPE_CHECKING
 from uuid import UUID as _UUID
-from sqlalchemy import String, BigInteger, ForeignKey, Integer, Boolean
+from sqlalchemy import String, BigInteger, ForeignKey, Integer, Boolean, Index, func, select
 from sqlalchemy.dialects.postgresql import UUID, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database.connection import Base
@@ -14,12 +14,17 @@ if TYPE_CHECKING:
 
 class CardFile(Base, AsyncCRUDMixin):
     __tablename__ = "card_files"
+    __table_args__ = (
+        # Подсчёт ссылок на блоб хранилища (count_refs) и поиск по имени файла
+        Index("ix_card_files_filename", "filename"),
+    )
 
     id: Mapped[uuidPK]
     card_id: Mapped[_UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("cards.card_id", ondelete="CASCADE"), nullable=False)
 
-    # Имя файла в хранилище (UUID + расширение)
-    filename: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    # Ключ файла в хранилище (SHA-256 содержимого; у старых файлов — UUID + расширение).
+    # Один блоб может быть у нескольких записей
+    filename: Mapped[str] = mapped_column(String, nullable=False)
 
     # Оригинальное имя файла
     original_filename: Mapped[str] = mapped_column(String, nullable=False)
@@ -43,16 +48,44 @@ class CardFile(Base, AsyncCRUDMixin):
     # Relationship
     card: Mapped["Card"] = relationship("Card", back_populates="files", foreign_keys=[card_id])
 
+    # Ключи data_info с file_id, полученным от Telegram при первой отправке
+    TG_FILE_ID_KEY = "tg_file_id"
+    TG_FILE_TYPE_KEY = "tg_file_type"
+
+    def telegram_file_id(self, media_type: str) -> Optional[str]:
+        """file_id Telegram для повторной отправки, если он получен для того же типа медиа."""
+        info = self.data_info or {}
+        if info.get(self.TG_FILE_TYPE_KEY) == media_type:
+            return info.get(self.TG_FILE_ID_KEY)
+        return None
+
+    async def update(self, session: Optional["AsyncSession"] = None, **kwargs):
+        """При замене файла в хранилище сбрасываем закэшированный file_id Telegram."""
+        if "filename" in kwargs and kwargs["filename"] != self.filename:
+            info = dict(kwargs.get("data_info", self.data_info) or {})
+            info.pop(self.TG_FILE_ID_KEY, None)
+            info.pop(self.TG_FILE_TYPE_KEY, None)
+            kwargs["data_info"] = info
+        return await super().update(session=session, **kwargs)
+
     async def delete(self, session: Optional["AsyncSession"] = None) -> None:
-        """При удалении из БД — удаляем файл из локального хранилища, затем запись в БД."""
+        """Удалить запись из БД, затем освободить блоб, если на него больше никто не ссылается."""
+        await super().delete(session=session)
         try:
-            from modules.storage import delete_file
-            await delete_file(self.filename)
+            from modules.storage import release_file
+            await release_file(self.filename, CardFile.count_refs)
         except Exception as e:
             from modules.logs import Logger
-            Logger().get_logger("storage").warning(f"Failed to delete file {self.filename} from storage: {e}")
-        finally:
-            await super().delete(session=session)
+            Logger().get_logger("storage").warning(f"Failed to release file {self.filename} from storage: {e}")
+
+    @classmethod
+    async def count_refs(cls, filename: str, session: Optional["AsyncSession"] = None) -> int:
+        """Количество записей, ссылающихся на блоб хранилища."""
+        async with cls._get_session_static(session) as sess:
+            result = await sess.execute(
+                select(func.count()).select_from(cls).where(cls.filename == filename)
+            )
+            return result.scalar_one()
 
     def to_dict(self) -> dict:
         # Convert datetime fields to strings to ensure JSON serializability.
@@ -87,6 +120,23 @@ class CardFile(Base, AsyncCRUDMixin):
         files = await cls.filter_by(card_id=_UUID(str(card_id)))
         return sorted(files, key=lambda f: f.order)
 
+    @classmethod
+    async def get_many(cls, file_ids) -> "list[CardFile]":
+        """Записи файлов одним запросом, в порядке ``file_ids`` (ненайденные пропускаются)."""
+        ids = []
+        for file_id in file_ids:
+            try:
+                ids.append(_UUID(str(file_id)))
+            except (ValueError, TypeError):
+                continue
+        if not ids:
+            return []
+
+        async with cls._get_session_static() as session:
+            result = await session.execute(select(cls).where(cls.id.in_(set(ids))))
+            by_id = {cf.id: cf for cf in result.scalars().all()}
+        return [by_id[i] for i in ids if i in by_id]
+
     @classmethod
     async def upload(
         cls,
@@ -98,17 +148,57 @@ class CardFile(Base, AsyncCRUDMixin):
         """Загрузить файл в хранилище и создать запись в БД."""
         from modules.storage import upload_file as _up
 
-        result = await _up(file_data, filename, content_type)
+        # Запись создаётся в транзакции блокировки блоба — его не освободят до появления ссылки
+        result = await _up(
+            file_data, filename, content_type,
+            on_stored=lambda key, session: cls.create(
+                session=session,
+                card_id=_UUID(str(card_id)),
+                filename=key,
+                original_filename=filename,
+                size=len(file_data),
+                data_info={"content_type": content_type or ""},
+                order=0,
+            ),
+        )
         if result.get("status") != "success":
             return None
-        return await cls.create(
-            card_id=_UUID(str(card_id)),
-            filename=result["filename"],
-            original_filename=filename,
-            size=len(file_data),
-            data_info={"content_type": content_type or ""},
-            order=0,
+        return result["record"]
+
+    @classmethod
+    async def upload_stream(
+        cls,
+        card_id: str,
+        chunks,
+        filename: str,
+        content_type: Optional[str] = None,
+    ) -> "Optional[CardFile]":
+        """Записать файл в хранилище по частям (async-итератор bytes) и создать запись в БД."""
+        from modules.storage import upload_stream as _up_stream
+
+        size = 0
+
+        async def counted():
+            nonlocal size
+            async for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+
+        result = await _up_stream(
+            counted(), filename, content_type,
+            on_stored=lambda key, session: cls.create(
+                session=session,
+                card_id=_UUID(str(card_id)),
+                filename=key,
+                original_filename=filename,
+                size=size,
+                data_info={"content_type": content_type or ""},
+                order=0,
+            ),
         )
+        if result.get("status") != "success":
+            return None
+        return result["record"]
 
     @classmethod
     async def upload_many(cls, card_id: str, files: list[dict], bot) -> int:
@@ -117,7 +207,7 @@ class CardFile(Base, AsyncCRUDMixin):
         Returns:
             Количество успешно загруженных файлов.
         """
-        from modules.file_utils import download_telegram_file
+        from modules.file_utils import stream_telegram_file
 
         uploaded = 0
         for file_info in files:
@@ -125,12 +215,10 @@ class CardFile(Base, AsyncCRUDMixin):
             if not file_id:
                 continue
             try:
-                file_data = await download_telegram_file(bot, file_id)
-                if not file_data:
-                    continue
-                result = await cls.upload(
+                # Файл идёт из Telegram в хранилище блоками, без копии в памяти
+                result = await cls.upload_stream(
                     card_id=card_id,
-                    file_data=file_data,
+                    chunks=stream_telegram_file(bot, file_id),
                     filename=file_info.get("name", "file"),
                 )
                 if result:
@@ -138,3 +226,25 @@ class CardFile(Base, AsyncCRUDMixin):
             except Exception as e:
                 print(f"CardFile.upload_many error for {file_info.get('name')}: {e}")
         return uploaded
+
+    @classmethod
+    async def set_telegram_file_id(
+        cls, file_id: str, tg_file_id: Optional[str], media_type: Optional[str] = None
+    ) -> None:
+        """Запомнить (или сбросить при ``tg_file_id=None``) file_id Telegram для файла."""
+        cf = await cls.get_by_id(_UUID(str(file_id)))
+        if not cf:
+            return
+
+        info = dict(cf.data_info or {})
+        if tg_file_id:
+            if info.get(cls.TG_FILE_ID_KEY) == tg_file_id:
+                return
+            info[cls.TG_FILE_ID_KEY] = tg_file_id
+            info[cls.TG_FILE_TYPE_KEY] = media_type
+        elif cls.TG_FILE_ID_KEY in info:
+            info.pop(cls.TG_FILE_ID_KEY, None)
+            info.pop(cls.TG_FILE_TYPE_KEY, None)
+        else:
+            return
+        await cf.update(data_info=info)
@@ -1,6 +1,6 @@
 from typing import Optional, TYPE_CHECKING
 from uuid import UUID as _UUID
-from sqlalchemy import String, BigInteger, ForeignKey
+from sqlalchemy import String, BigInteger, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database.connection import Base
@@ -17,6 +17,12 @@ class CardMessage(Base, AsyncCRUDMixin):
     Может хранить ID форум-сообщений, превью-сообщений и других типов сообщений.
     """
     __tablename__ = "card_messages"
+    __table_args__ = (
+        # get_messages / get_forum_message: filter_by(card_id, message_type)
+        Index("ix_card_messages_card_type", "card_id", "message_type"),
+        # Card.by_message_id: поиск карточки по ID сообщения
+        Index("ix_card_messages_message_id", "message_id"),
+    )
 
     id: Mapped[uuidPK]
     card_id: Mapped[_UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("cards.card_id", ondelete="CASCADE"), nullable=False)
@@ -1,6 +1,6 @@
 from typing import Optional, TYPE_CHECKING
 from uuid import UUID as _UUID
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import String, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database.connection import Base
@@ -12,6 +12,10 @@ if TYPE_CHECKING:
 
 class ClientSetting(Base, AsyncCRUDMixin):
     __tablename__ = "client_settings"
+    __table_args__ = (
+        # set_client_setting: filter_by(card_id, client_key, type)
+        Index("ix_client_settings_card_client", "card_id", "client_key", "type"),
+    )
 
     id: Mapped[uuidPK]
     card_id: Mapped[_UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("cards.card_id", ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,40 @@
+from sqlalchemy import String, Text, Integer, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import JSON, UUID
+from datetime import datetime
+from database.connection import Base
+from database.crud_mixins import AsyncCRUDMixin
+from database.annotated_types import uuidPK, createAT
+from typing import Optional
+from uuid import UUID as PyUUID
+
+
+class FailedTask(Base, AsyncCRUDMixin):
+    """
+    Dead-letter таблица для запланированных задач.
+
+    Сюда переносятся задачи, которые не удалось выполнить за
+    ``max_attempts`` попыток. Связи с карточкой нет намеренно:
+    запись должна пережить удаление карточки для разбора ошибки.
+    """
+    __tablename__ = "failed_tasks"
+
+    # ID исходной задачи из scheduled_tasks
+    task_id: Mapped[uuidPK]
+
+    card_id: Mapped[Optional[PyUUID]] = mapped_column(UUID(as_uuid=True), nullable=True, index=True)
+
+    function_path: Mapped[str] = mapped_column(String(500), nullable=False)
+    arguments: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+
+    # Время, на которое задача была запланирована изначально
+    execute_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Время переноса в dead-letter
+    failed_at: Mapped[createAT]
+
+    def __repr__(self) -> str:
+        return f"<FailedTask(id={self.task_id}, function='{self.function_path}', attempts={self.attempts})>"
@@ -67,6 +67,47 @@ class Scene(Base, AsyncCRUDMixin):
             await scene.update(**updates)
         return True
 
+    @classmethod
+    async def bulk_upsert_scenes(cls, items: list[dict]) -> int:
+        """Записать пачку сцен одним ``INSERT ... ON CONFLICT DO UPDATE``."""
+        if not items:
+            return 0
+
+        from sqlalchemy import func
+        from sqlalchemy.dialects.postgresql import insert
+        from database.connection import session_factory
+
+        # Последнее состояние для каждого пользователя
+        rows = {
+            item["user_id"]: {
+                "user_id": item["user_id"],
+                "scene": item.get("scene", ""),
+                "scene_path": item.get("scene_path", ""),
+                "page": item.get("page", ""),
+                "message_id": item.get("message_id") or 0,
+                "data": cls._serialize_for_json(item.get("data") or {}),
+            }
+            for item in items
+        }
+
+        stmt = insert(cls).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.user_id],
+            set_={
+                "scene": stmt.excluded.scene,
+                "scene_path": stmt.excluded.scene_path,
+                "page": stmt.excluded.page,
+                "message_id": stmt.excluded.message_id,
+                "data": stmt.excluded.data,
+                "updated_at": func.timezone("utc", func.now()),
+            },
+        )
+
+        async with session_factory() as session:
+            await session.execute(stmt)
+            await session.commit()
+        return len(rows)
+
     @classmethod
     async def delete_scene(cls, user_id: int) -> bool:
         """Удалить сцену пользователя."""
@@ -1,4 +1,4 @@
-from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy import String, Text, Integer, DateTime, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import JSON, UUID
 from datetime import datetime
@@ -16,14 +16,29 @@ class ScheduledTask(Base, AsyncCRUDMixin):
     Модель для хранения запланированных задач.
     
     Задачи выполняются один раз в определенное время (execute_at).
-    После выполнения задача удаляется из базы.
+    Перед выполнением задача захватывается планировщиком на время аренды
+    (locked_until), после успешного выполнения удаляется из базы.
+    При ошибке переносится с экспоненциальной задержкой, а после
+    max_attempts попыток перемещается в ``failed_tasks``.
     """
     __tablename__ = "scheduled_tasks"
+    __table_args__ = (
+        # Поиск наступивших задач планировщиком (execute_at <= now)
+        Index("ix_scheduled_tasks_execute_at", "execute_at"),
+        # cancel_post_tasks / update_post_tasks_time: (card_id, function_path)
+        Index("ix_scheduled_tasks_card_function", "card_id", "function_path"),
+        # Системные задачи без карточки (сброс статистики) ищутся по function_path
+        Index("ix_scheduled_tasks_system_function", "function_path",
+              postgresql_where=text("card_id IS NULL")),
+        # Только захваченные задачи — для проверки истёкших аренд
+        Index("ix_scheduled_tasks_locked_until", "locked_until",
+              postgresql_where=text("locked_until IS NOT NULL")),
+    )
 
     task_id: Mapped[uuidPK]
     
     # ID карточки (для удобного поиска и удаления задач по карточке)
-    card_id: Mapped[Optional[PyUUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("cards.card_id", ondelete="CASCADE"), nullable=True, index=True)
+    card_id: Mapped[Optional[PyUUID]] = mapped_column(UUID(as_uuid=True), ForeignKey("cards.card_id", ondelete="CASCADE"), nullable=True)
     
     # Relationship
     card: Mapped[Optional["Card"]] = relationship("Card", back_populates="scheduled_tasks", foreign_keys=[card_id])
@@ -37,6 +52,17 @@ class ScheduledTask(Base, AsyncCRUDMixin):
     
     # Время выполнения задачи
     execute_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    # Количество попыток выполнения (увеличивается при захвате)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=5, server_default="5")
+
+    # Аренда: кто и до какого времени выполняет задачу
+    locked_by: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    locked_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    # Текст последней ошибки
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     # Временные метки
     created_at: Mapped[createAT]
@@ -1,9 +1,12 @@
 from sqlalchemy import String, Integer, BigInteger
 from sqlalchemy.orm import Mapped, mapped_column
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 from database.connection import Base
 from database.crud_mixins import AsyncCRUDMixin
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 
 class Tag(Base, AsyncCRUDMixin):
     __tablename__ = "tags"
@@ -23,3 +26,25 @@ class Tag(Base, AsyncCRUDMixin):
         """Все теги, отсортированные по полю ``order``."""
         tags = await cls.get_all()
         return sorted(tags, key=lambda t: t.order)
+
+    # Изменения тегов сбрасывают кэш справочника (modules.tag_cache)
+
+    @classmethod
+    async def create(cls, session: Optional["AsyncSession"] = None, **kwargs):
+        obj = await super().create(session=session, **kwargs)
+        cls._invalidate_cache()
+        return obj
+
+    async def update(self, session: Optional["AsyncSession"] = None, **kwargs):
+        result = await super().update(session=session, **kwargs)
+        self._invalidate_cache()
+        return result
+
+    async def delete(self, session: Optional["AsyncSession"] = None) -> None:
+        await super().delete(session=session)
+        self._invalidate_cache()
+
+    @staticmethod
+    def _invalidate_cache() -> None:
+        from modules.tag_cache import tag_cache
+        tag_cache.invalidate()
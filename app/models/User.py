@@ -7,6 +7,7 @@ from modules.enums import UserRole, Department
 from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
     from models.Card import Card
     from models.Task import Task
 
@@ -47,6 +48,28 @@ class User(Base, AsyncCRUDMixin):
     def __repr__(self) -> str:
         return f"<User(id={self.user_id}, telegram_id={self.telegram_id}, role='{self.role}')>"
 
+    # Изменения пользователей сбрасывают их запись в кэше (modules.user_cache)
+
+    @classmethod
+    async def create(cls, session: Optional["AsyncSession"] = None, **kwargs):
+        obj = await super().create(session=session, **kwargs)
+        cls._invalidate_cache(obj.telegram_id)
+        return obj
+
+    async def update(self, session: Optional["AsyncSession"] = None, **kwargs):
+        result = await super().update(session=session, **kwargs)
+        self._invalidate_cache(self.telegram_id)
+        return result
+
+    async def delete(self, session: Optional["AsyncSession"] = None) -> None:
+        await super().delete(session=session)
+        self._invalidate_cache(self.telegram_id)
+
+    @staticmethod
+    def _invalidate_cache(telegram_id: Optional[int]) -> None:
+        from modules.user_cache import user_cache
+        user_cache.invalidate(telegram_id)
+
     # ── Классовые методы-запросы ─────────────────────────────────────────────
 
     @classmethod
@@ -80,4 +103,20 @@ class User(Base, AsyncCRUDMixin):
     async def role_for(cls, telegram_id: int) -> "Optional[str]":
         """Вернуть строковое значение роли для пользователя с данным telegram_id."""
         user = await cls.by_telegram(telegram_id)
-        return user.role.value if user else None
\ No newline at end of file
+        return user.role.value if user else None
+
+    @classmethod
+    async def telegram_ids_for(cls, user_ids) -> "dict":
+        """Вернуть {user_id: telegram_id} для набора user_id одним запросом."""
+        from uuid import UUID as _UUID
+        from sqlalchemy import select
+
+        ids = {_UUID(str(uid)) for uid in user_ids if uid is not None}
+        if not ids:
+            return {}
+
+        async with cls._get_session_static() as session:
+            result = await session.execute(
+                select(cls.user_id, cls.telegram_id).where(cls.user_id.in_(ids))
+            )
+            return {user_id: telegram_id for user_id, telegram_id in result.all()}
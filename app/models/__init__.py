@@ -5,9 +5,13 @@ from .Card import Card
 from .Scene import Scene
 from .Tag import Tag
 from .ScheduledTask import ScheduledTask
+from .FailedTask import FailedTask
 from .CardContent import CardContent
 from .ClientSetting import ClientSetting
 from .Entity import Entity
+from .AIResponse import AIResponse
+from .CalendarEvent import CalendarEvent
+from .CalendarSyncState import CalendarSyncState
 # from .Message import Message
 # from .Automation import Automation, Preset
 
@@ -21,7 +25,10 @@ __all__ = [
     "Card", "CardStatus",
     "Tag",
     "ScheduledTask", "TaskStatus",
+    "FailedTask",
     "CardContent", "ClientSetting", "Entity",
+    "AIResponse",
+    "CalendarEvent", "CalendarSyncState",
     # "Message", "MessageType",
     # "Automation", "AutomationTypes", "Preset"
 ]
\ No newline at end of file
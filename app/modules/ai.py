@@ -1,7 +1,35 @@
+"""
+Асинхронный шлюз к AI.
+
+Все запросы к модели идут через :data:`ai_gateway`::
+
+    text = await ai_gateway.ask(prompt, user_id=user_id)
+
+Шлюз:
+
+- ограничивает число одновременных обращений к провайдеру (``max_concurrency``);
+- ограничивает частоту запросов пользователя (``user_rate`` / ``user_burst``),
+  при превышении — :class:`AIRateLimited`;
+- объединяет одинаковые промпты, пока первый запрос не завершён;
+- хранит проверенные ответы в таблице ``ai_responses`` по хешу промпта;
+- если провайдер не ответил за ``hedge_after`` секунд, запускает
+  параллельную попытку и берёт первый годный ответ.
+
+Провайдер подключаемый (:class:`AIProvider`): по умолчанию g4f,
+для проверок без сети — :class:`FakeProvider`.
+
+Страницы бота отправляют запрос через :func:`send` с callback-данными —
+ответ передаётся в метод страницы, когда будет готов.
+"""
+import asyncio
+import hashlib
 import random
-import time
-import concurrent.futures
-import g4f
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Callable, Optional, Union
+
+from modules.exec.notify_dispatcher import TokenBucket
+from modules.logs import logger
 
 model = 'gpt-4'
 
@@ -11,58 +39,329 @@ user_agents = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
 ]
 
-def send_ai_request(text: str):
-    user_agent = random.choice(user_agents)
-    headers = {
-        'User-Agent': user_agent,
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Connection': 'keep-alive',
-        'DNT': '1',
-        'Referer': 'https://www.google.com/',
-    }
-    time.sleep(random.uniform(0.1, 0.5))
-
-    def do_request():
-        return g4f.ChatCompletion.create(
-            model=model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f'{text}'
-                },
-            ],
-            headers=headers
+# Признаки служебных ответов бесплатных провайдеров (ошибки, реклама)
+forbidden = [
+    "HTTP", "ERR_CHALLENGE", "Blocked by DuckDuckGo", "Bot limit exceeded", "ERR_BN_LIMIT",
+    "Misuse detected. Please get in touch, we can   come up with a solution for your use case.",
+    "Too Many Requests", "Misuse", "message='Too", "AI-powered", 'more](https://pollinations.ai/redirect/2699274)', "module—no guesswork", '\n\n---\n', 'Telegram bot', '\u0000', 'pollinations.ai'
+]
+
+
+class AIError(Exception):
+    """Не удалось получить годный ответ от AI."""
+
+
+class AIRateLimited(AIError):
+    """Пользователь превысил лимит запросов."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Слишком много запросов к AI, повторите через {retry_after:.0f} с")
+
+
+class AIProvider(ABC):
+    """ Источник ответов модели. ``name`` входит в ключ кэша ответов.
+    """
+    name = 'base'
+
+    @abstractmethod
+    async def complete(self, prompt: str) -> str:
+        """Текст ответа модели на ``prompt``."""
+
+
+class G4FProvider(AIProvider):
+    """ Бесплатные модели через g4f.
+    """
+
+    def __init__(self, model_name: str = model):
+        self.model = model_name
+        self.name = f'g4f:{model_name}'
+
+    async def complete(self, prompt: str) -> str:
+        import g4f
+
+        headers = {
+            'User-Agent': random.choice(user_agents),
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Connection': 'keep-alive',
+            'DNT': '1',
+            'Referer': 'https://www.google.com/',
+        }
+        response = await g4f.ChatCompletion.create_async(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            headers=headers,
         )
+        return str(response or '')
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        future = executor.submit(do_request)
-        try:
-            response = future.result(timeout=30)
-        except concurrent.futures.TimeoutError:
-            return ''
-    return response
 
-def send(text: str) -> str:
-    if not isinstance(text, str) or not text.strip():
+FakeResponse = Union[str, Exception, tuple[float, Union[str, Exception]]]
+
+
+class FakeProvider(AIProvider):
+    """ Локальный провайдер для проверок без сети.
+
+        ``responses`` — очередь ответов: строка, исключение или
+        ``(задержка, строка | исключение)``. Когда очередь пуста, отвечает
+        ``reply(prompt)`` (по умолчанию ``"ok: <prompt>"``) через ``latency`` секунд.
+        Все полученные промпты — в ``calls``.
+    """
+    name = 'fake'
+
+    def __init__(
+        self,
+        responses: Optional[list[FakeResponse]] = None,
+        latency: float = 0.0,
+        reply: Optional[Callable[[str], str]] = None,
+    ):
+        self.responses = list(responses or [])
+        self.latency = latency
+        self.reply = reply or (lambda prompt: f"ok: {prompt}")
+        self.calls: list[str] = []
+
+    async def complete(self, prompt: str) -> str:
+        self.calls.append(prompt)
+        delay, result = self.latency, None
+        if self.responses:
+            item = self.responses.pop(0)
+            if isinstance(item, tuple):
+                delay, result = item
+            else:
+                result = item
+
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return self.reply(prompt) if result is None else result
+
+
+def validate_response(text: str) -> Optional[str]:
+    """ Причина, по которой ответ не годится, или None.
+    """
+    if not text or not text.strip():
+        return 'пустой ответ'
+    if any(f in text for f in forbidden):
+        return 'служебный ответ провайдера'
+    return None
+
+
+class AIGateway:
+    """ Шлюз запросов к AI.
+
+        - ``max_concurrency`` — одновременных обращений к провайдеру на весь бот;
+        - ``user_rate`` / ``user_burst`` — запросов в секунду на пользователя
+          и сколько можно сделать подряд;
+        - ``attempts`` — всего обращений к провайдеру на один промпт;
+        - ``attempt_timeout`` — сколько ждать одно обращение;
+        - ``hedge_after`` — через сколько секунд без ответа запускать
+          параллельную попытку (не больше ``max_parallel`` одновременно);
+        - ``cache_ttl`` — срок жизни ответа в ``ai_responses`` (None — без кэша).
+    """
+
+    def __init__(
+        self,
+        provider: AIProvider,
+        max_concurrency: int = 4,
+        user_rate: float = 1 / 20,
+        user_burst: int = 3,
+        attempts: int = 6,
+        attempt_timeout: float = 60,
+        hedge_after: float = 15,
+        max_parallel: int = 2,
+        backoff: float = 1.0,
+        cache_ttl: Optional[timedelta] = timedelta(days=7),
+    ):
+        self.provider = provider
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.attempts = attempts
+        self.attempt_timeout = attempt_timeout
+        self.hedge_after = hedge_after
+        self.max_parallel = max_parallel
+        self.backoff = backoff
+        self.cache_ttl = cache_ttl
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._user_buckets: dict[int, TokenBucket] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.counters = {
+            'requests': 0, 'cache_hits': 0, 'deduplicated': 0, 'rate_limited': 0,
+            'provider_calls': 0, 'hedged': 0, 'rejected': 0, 'failed': 0,
+        }
+
+    def prompt_hash(self, prompt: str) -> str:
+        return hashlib.sha256(f'{self.provider.name}\0{prompt}'.encode('utf-8')).hexdigest()
+
+    async def ask(self, prompt: str, user_id: Optional[int] = None, use_cache: bool = True) -> str:
+        """ Ответ модели на ``prompt``.
+
+            Raises:
+                AIRateLimited: пользователь превысил лимит
+                AIError: все попытки дали ошибку или негодный ответ
+        """
+        self.counters['requests'] += 1
+        key = self.prompt_hash(prompt)
+
+        if use_cache:
+            cached = await self._cache_get(key)
+            if cached is not None:
+                self.counters['cache_hits'] += 1
+                return cached
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.counters['deduplicated'] += 1
+        else:
+            self._check_rate(user_id)
+            task = asyncio.create_task(self._fetch(key, prompt))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Отмена одного ожидающего не должна отменять общий запрос
+        return await asyncio.shield(task)
+
+    def _check_rate(self, user_id: Optional[int]) -> None:
+        if user_id is None:
+            return
+        bucket = self._user_buckets.get(user_id)
+        if bucket is None:
+            bucket = self._user_buckets[user_id] = TokenBucket(self.user_rate, self.user_burst)
+        wait = bucket.try_acquire()
+        if wait:
+            self.counters['rate_limited'] += 1
+            raise AIRateLimited(wait)
+
+    async def _fetch(self, key: str, prompt: str) -> str:
+        try:
+            text = await self._hedged(prompt)
+        except AIError:
+            self.counters['failed'] += 1
+            raise
+        await self._cache_put(key, text)
         return text
 
-    forbidden = [
-        "HTTP", "ERR_CHALLENGE", "Blocked by DuckDuckGo", "Bot limit exceeded", "ERR_BN_LIMIT",
-        "Misuse detected. Please get in touch, we can   come up with a solution for your use case.",
-        "Too Many Requests", "Misuse", "message='Too", "AI-powered", 'more](https://pollinations.ai/redirect/2699274)', "module—no guesswork", '\n\n---\n', 'Telegram bot', '\u0000', 'pollinations.ai'
-    ]
+    async def _attempt(self, prompt: str) -> str:
+        async with self._semaphore:
+            self.counters['provider_calls'] += 1
+            return await asyncio.wait_for(self.provider.complete(prompt), self.attempt_timeout)
+
+    def _start(self, prompt: str) -> asyncio.Task:
+        return asyncio.create_task(self._attempt(prompt))
+
+    async def _hedged(self, prompt: str) -> str:
+        pending: set[asyncio.Task] = set()
+        started = 0
+        last_error = ''
+        try:
+            while True:
+                if not pending:
+                    if started >= self.attempts:
+                        break
+                    if started:
+                        # Все запущенные попытки неудачны — пауза перед следующей
+                        delay = min(self.backoff * 2 ** (started - 1), 30)
+                        await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                    pending.add(self._start(prompt))
+                    started += 1
+
+                can_hedge = started < self.attempts and len(pending) < self.max_parallel
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_after if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if not done:
+                    # Ответа нет за hedge_after — параллельная попытка
+                    self.counters['hedged'] += 1
+                    pending.add(self._start(prompt))
+                    started += 1
+                    continue
+
+                for task in done:
+                    try:
+                        text = task.result()
+                    except asyncio.TimeoutError:
+                        last_error = 'таймаут'
+                        continue
+                    except Exception as e:
+                        last_error = f'{type(e).__name__}: {e}'
+                        continue
+
+                    problem = validate_response(text)
+                    if problem is None:
+                        return text
+                    self.counters['rejected'] += 1
+                    last_error = problem
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise AIError(f"AI не дал ответа за {started} попыток ({last_error})")
+
+    async def _cache_get(self, key: str) -> Optional[str]:
+        if self.cache_ttl is None:
+            return None
+        from models.AIResponse import AIResponse
+        try:
+            return await AIResponse.get_fresh(key, self.cache_ttl)
+        except Exception as e:
+            logger.warning(f"AI: кэш ответов недоступен: {e}")
+            return None
+
+    async def _cache_put(self, key: str, text: str) -> None:
+        if self.cache_ttl is None:
+            return
+        from models.AIResponse import AIResponse
+        try:
+            await AIResponse.store(key, self.provider.name, text)
+        except Exception as e:
+            logger.warning(f"AI: не удалось сохранить ответ в кэш: {e}")
+
+    def stats(self) -> dict:
+        return {**self.counters, 'inflight': len(self._inflight)}
+
+
+ai_gateway = AIGateway(G4FProvider())
+
+
+async def _deliver(callback: dict, result: str) -> None:
+    """ Передать ответ в метод страницы ``callback['function']``, если
+        пользователь всё ещё в той же сцене (сцена восстанавливается из БД,
+        если её ещё нет в памяти).
+    """
+    from modules.exec.executors_manager import manager
+    from tg.oms.manager import scene_manager
+
+    user_id = callback.get('user_id')
+    tg = manager.get('telegram_executor')
+    scene = await scene_manager.ensure_loaded(user_id, tg.bot) if tg else None
+    if scene is None or scene.__scene_name__ != callback.get('scene'):
+        logger.info(f"AI: сцена пользователя {user_id} закрыта, ответ не доставлен")
+        return
 
-    for _ in range(25):
-        new_text = str(send_ai_request(text))
-        if not new_text:
-            print('нет текста')
-            continue
+    page = scene.get_page(callback['page'])
+    handler = getattr(page, callback['function'], None)
+    if handler is None:
+        logger.error(f"AI: у страницы {callback['page']} нет метода {callback['function']}")
+        return
+    await handler(result)
 
-        if any(f in new_text for f in forbidden):
 
-            print("Найден запрещённый текст")
-            continue
+async def send(payload: dict) -> str:
+    """ Выполнить запрос ``{'prompt', 'callback', 'fresh'}`` через шлюз.
 
-        return new_text
-    return text
\ No newline at end of file
+        Если указан ``callback`` (``user_id``, ``scene``, ``page``, ``function``),
+        ответ передаётся в этот метод страницы. ``fresh=True`` — не брать ответ из кэша.
+        Ошибки (:class:`AIError`) пробрасываются вызывающему.
+    """
+    callback = payload.get('callback') or {}
+    result = await ai_gateway.ask(
+        payload['prompt'],
+        user_id=callback.get('user_id'),
+        use_cache=not payload.get('fresh', False),
+    )
+    if callback:
+        await _deliver(callback, result)
+    return result
@@ -2,15 +2,17 @@
 Модуль для работы с Google Calendar.
 
 В монолите заменяет HTTP-вызовы к calendar-api прямыми вызовами calendar_manager.
+Чтение идёт из локальной копии календаря, изменения отправляются
+batch-запросами (см. :mod:`modules.calendar.mirror`).
 """
-import asyncio
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from modules.logs import logger
 
 # Ленивая инициализация - calendar_manager создаётся только если Google Calendar настроен
 _calendar_manager = None
+_mirror = None
 
 
 def _get_manager():
@@ -25,10 +27,30 @@ def _get_manager():
     return _calendar_manager if _calendar_manager else None
 
 
-async def _run_sync(func, *args, **kwargs):
-    """Запустить синхронную функцию Google Calendar в thread pool."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+def _get_mirror():
+    global _mirror
+    manager = _get_manager()
+    if not manager:
+        return None
+    if _mirror is None or _mirror.manager is not manager:
+        from modules.calendar.mirror import CalendarMirror
+        _mirror = CalendarMirror(manager)
+    return _mirror
+
+
+def use_manager(manager) -> None:
+    """Подменить менеджер календаря (например, на FakeCalendarService); None — отключить."""
+    global _calendar_manager, _mirror
+    _calendar_manager = manager if manager is not None else False
+    _mirror = None
+
+
+async def run_calendar_sync(interval: float = 60) -> None:
+    """Фоновая синхронизация локальной копии календаря (если календарь настроен)."""
+    mirror = _get_mirror()
+    if mirror is None:
+        return
+    await mirror.run(interval)
 
 
 async def create_calendar_event(
@@ -45,14 +67,13 @@ async def create_calendar_event(
     if attendees is None:
         attendees = []
 
-    manager = _get_manager()
-    if not manager:
+    mirror = _get_mirror()
+    if not mirror:
         return {"response": None, "status": 503}
 
     logger.info(f"Создание события в календаре: {title}, Начало: {start_time}")
     try:
-        event = await _run_sync(
-            manager.create_event,
+        body = mirror.manager.build_event_body(
             title=title,
             description=description,
             start_time=start_time,
@@ -62,6 +83,7 @@ async def create_calendar_event(
             location=location,
             color_id=color_id
         )
+        event = await mirror.write('insert', body=body)
         return {"response": event, "status": 200 if event else 500}
     except Exception as e:
         logger.error(f"Ошибка создания события в календаре: {e}")
@@ -77,28 +99,32 @@ async def update_calendar_event(
     location: Optional[str] = None,
     attendees: Optional[List[str]] = None
 ) -> Dict[str, Any]:
-    """Обновление существующего события в календаре."""
-    manager = _get_manager()
-    if not manager:
+    """Обновление существующего события в календаре (меняются только переданные поля)."""
+    mirror = _get_mirror()
+    if not mirror:
         return {"response": None, "status": 503}
 
-    update_data = {}
-    if title is not None:
-        update_data["title"] = title
-    if description is not None:
-        update_data["description"] = description
-    if start_time is not None:
-        update_data["start_time"] = start_time
-    if end_time is not None:
-        update_data["end_time"] = end_time
-    if location is not None:
-        update_data["location"] = location
-    if attendees is not None:
-        update_data["attendees"] = attendees
-
-    logger.info(f"Обновление события в календаре {event_id}: {list(update_data.keys())}")
+    logger.info(f"Обновление события в календаре {event_id}")
     try:
-        event = await _run_sync(manager.update_event, event_id=event_id, **update_data)
+        body: Dict[str, Any] = {}
+        if title is not None:
+            body["summary"] = title
+        if description is not None:
+            body["description"] = description
+        if location is not None:
+            body["location"] = location
+        if attendees is not None:
+            body["attendees"] = [{"email": email} for email in attendees]
+        if start_time is not None or end_time is not None:
+            # Формат времени зависит от того, на весь ли день событие
+            current = await mirror.get(event_id) or {}
+            all_day = 'date' in (current.get('start') or {})
+            if start_time is not None:
+                body["start"] = mirror.manager.time_body(start_time, all_day)
+            if end_time is not None:
+                body["end"] = mirror.manager.time_body(end_time, all_day)
+
+        event = await mirror.write('patch', event_id=event_id, body=body)
         return {"response": event, "status": 200 if event else 500}
     except Exception as e:
         logger.error(f"Ошибка обновления события в календаре {event_id}: {e}")
@@ -111,19 +137,15 @@ async def get_calendar_events(
     max_results: int = 10,
     order_by: str = "startTime"
 ) -> Dict[str, Any]:
-    """Получение списка событий из календаря."""
-    manager = _get_manager()
-    if not manager:
+    """Получение списка событий из календаря (по умолчанию — 30 дней от текущего момента)."""
+    mirror = _get_mirror()
+    if not mirror:
         return {"response": None, "status": 503}
 
     try:
-        events = await _run_sync(
-            manager.get_events,
-            time_min=time_min,
-            time_max=time_max,
-            max_results=max_results,
-            order_by=order_by
-        )
+        time_min = time_min or datetime.now()
+        time_max = time_max or time_min + timedelta(days=30)
+        events = await mirror.events(time_min, time_max, max_results, order_by)
         return {"response": events, "status": 200}
     except Exception as e:
         logger.error(f"Ошибка получения событий из календаря: {e}")
@@ -132,12 +154,12 @@ async def get_calendar_events(
 
 async def get_calendar_event(event_id: str) -> Dict[str, Any]:
     """Получение конкретного события по ID."""
-    manager = _get_manager()
-    if not manager:
+    mirror = _get_mirror()
+    if not mirror:
         return {"response": None, "status": 503}
 
     try:
-        event = await _run_sync(manager.get_event, event_id=event_id)
+        event = await mirror.get(event_id)
         return {"response": event, "status": 200 if event else 404}
     except Exception as e:
         logger.error(f"Ошибка получения события {event_id}: {e}")
@@ -146,17 +168,17 @@ async def get_calendar_event(event_id: str) -> Dict[str, Any]:
 
 async def delete_calendar_event(event_id: str) -> Dict[str, Any]:
     """Удаление события из календаря."""
-    manager = _get_manager()
-    if not manager:
+    mirror = _get_mirror()
+    if not mirror:
         return {"response": None, "status": 503}
 
     logger.info(f"Удаление события из календаря: {event_id}")
     try:
-        result = await _run_sync(manager.delete_event, event_id=event_id)
-        return {"response": result, "status": 200}
+        await mirror.write('delete', event_id=event_id)
+        return {"response": True, "status": 200}
     except Exception as e:
         logger.error(f"Ошибка удаления события из календаря {event_id}: {e}")
-        return {"response": None, "status": 500}
+        return {"response": False, "status": 200}
 
 
 async def check_calendar_availability(
@@ -164,16 +186,12 @@ async def check_calendar_availability(
     end_time: datetime
 ) -> Dict[str, Any]:
     """Проверка доступности времени в календаре."""
-    manager = _get_manager()
-    if not manager:
+    mirror = _get_mirror()
+    if not mirror:
         return {"response": None, "status": 503}
 
     try:
-        result = await _run_sync(
-            manager.check_availability,
-            start_time=start_time,
-            end_time=end_time
-        )
+        result = await mirror.is_available(start_time, end_time)
         return {"response": result, "status": 200}
     except Exception as e:
         logger.error(f"Ошибка проверки доступности в календаре: {e}")
@@ -182,12 +200,13 @@ async def check_calendar_availability(
 
 async def get_today_events() -> Dict[str, Any]:
     """Получение событий на сегодня."""
-    manager = _get_manager()
-    if not manager:
+    mirror = _get_mirror()
+    if not mirror:
         return {"response": None, "status": 503}
 
     try:
-        events = await _run_sync(manager.get_today_events)
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        events = await mirror.events(today, today + timedelta(days=1))
         return {"response": events, "status": 200}
     except Exception as e:
         logger.error(f"Ошибка получения событий на сегодня: {e}")
@@ -1,20 +1,33 @@
 
 import json
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
-from google.oauth2.credentials import Credentials
+from os import getenv
+from typing import Optional, List, Dict, Any, Tuple
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from modules.logs import calendar_logger
 
+# Размер страницы events.list (максимум API — 2500)
+PAGE_SIZE = 250
+# Запросов в одном batch-запросе (рекомендация Google для Calendar API)
+BATCH_SIZE = 50
+
 class GoogleCalendarManager:
-    """Менеджер для работы с Google Calendar API"""
+    """Менеджер для работы с Google Calendar API
+
+    ``service`` можно передать готовым (например,
+    :class:`modules.calendar.fake_service.FakeCalendarService`) —
+    тогда переменные окружения не нужны.
+    """
 
-    def __init__(self):
-        self.service = None
-        self.calendar_id = None
-        self._initialize_service()
+    def __init__(self, service=None, calendar_id: Optional[str] = None):
+        self.service = service
+        self.calendar_id = calendar_id
+        if service is None:
+            self._initialize_service()
+        elif not self.calendar_id:
+            self.calendar_id = 'primary'
 
     def _initialize_service(self):
         """Инициализация сервиса Google Calendar"""
@@ -90,54 +103,16 @@ class GoogleCalendarManager:
                 calendar_logger.error("Calendar service not initialized")
                 return None
 
-            # Подготовка времени
-            if all_day:
-                if not start_time:
-                    start_time = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-                if not end_time:
-                    end_time = start_time + timedelta(days=1)
-
-                # Убираем timezone info для событий на весь день
-                if start_time.tzinfo is not None:
-                    start_time = start_time.replace(tzinfo=None)
-                if end_time.tzinfo is not None:
-                    end_time = end_time.replace(tzinfo=None)
-
-                event_start = {'date': start_time.strftime('%Y-%m-%d')}
-                event_end = {'date': end_time.strftime('%Y-%m-%d')}
-            else:
-                if not start_time:
-                    start_time = datetime.now()
-                if not end_time:
-                    end_time = start_time + timedelta(hours=1)
-
-                # Убираем timezone info и добавляем UTC
-                if start_time.tzinfo is not None:
-                    start_time = start_time.replace(tzinfo=None)
-                if end_time.tzinfo is not None:
-                    end_time = end_time.replace(tzinfo=None)
-
-                event_start = {'dateTime': start_time.isoformat() + 'Z', 'timeZone': 'UTC'}
-                event_end = {'dateTime': end_time.isoformat() + 'Z', 'timeZone': 'UTC'}
-
-            # Подготовка участников
-            event_attendees = []
-            if attendees:
-                event_attendees = [{'email': email} for email in attendees]
-
-            # Создание события
-            event = {
-                'summary': title,
-                'description': description,
-                'location': location,
-                'start': event_start,
-                'end': event_end,
-                'attendees': event_attendees,
-            }
-
-            # Добавляем цвет события, если указан
-            if color_id:
-                event['colorId'] = str(color_id)
+            event = self.build_event_body(
+                title=title,
+                description=description,
+                start_time=start_time,
+                end_time=end_time,
+                all_day=all_day,
+                attendees=attendees,
+                location=location,
+                color_id=color_id,
+            )
 
             # Отправка запроса
             created_event = self.service.events().insert(
@@ -155,19 +130,65 @@ class GoogleCalendarManager:
             calendar_logger.error(f"Error while creating event: {e}")
             return None
 
+    @staticmethod
+    def time_body(value: datetime, all_day: bool) -> Dict[str, str]:
+        """Поле ``start``/``end`` события: дата для событий на весь день, иначе время в UTC."""
+        # Убираем timezone info, время считается UTC
+        if value.tzinfo is not None:
+            value = value.replace(tzinfo=None)
+        if all_day:
+            return {'date': value.strftime('%Y-%m-%d')}
+        return {'dateTime': value.isoformat() + 'Z', 'timeZone': 'UTC'}
+
+    @classmethod
+    def build_event_body(cls,
+                         title: str,
+                         description: str = "",
+                         start_time: datetime = None,
+                         end_time: datetime = None,
+                         all_day: bool = False,
+                         attendees: List[str] = None,
+                         location: str = "",
+                         color_id: str = None) -> Dict[str, Any]:
+        """Тело нового события для events.insert (см. :meth:`create_event`)."""
+        if all_day:
+            if not start_time:
+                start_time = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            if not end_time:
+                end_time = start_time + timedelta(days=1)
+        else:
+            if not start_time:
+                start_time = datetime.now()
+            if not end_time:
+                end_time = start_time + timedelta(hours=1)
+
+        event = {
+            'summary': title,
+            'description': description,
+            'location': location,
+            'start': cls.time_body(start_time, all_day),
+            'end': cls.time_body(end_time, all_day),
+            'attendees': [{'email': email} for email in attendees or []],
+        }
+
+        # Добавляем цвет события, если указан
+        if color_id:
+            event['colorId'] = str(color_id)
+        return event
+
     def get_events(self,
                    time_min: datetime = None,
                    time_max: datetime = None,
-                   max_results: int = 10,
+                   max_results: Optional[int] = 10,
                    single_events: bool = True,
                    order_by: str = 'startTime') -> List[Dict[str, Any]]:
         """
-        Получение списка событий из календаря
+        Получение списка событий из календаря (постранично)
 
         Args:
             time_min: Минимальное время для поиска событий
             time_max: Максимальное время для поиска событий
-            max_results: Максимальное количество результатов
+            max_results: Максимальное количество результатов (None — все)
             single_events: Развернуть повторяющиеся события
             order_by: Сортировка результатов
 
@@ -191,17 +212,26 @@ class GoogleCalendarManager:
             if time_max.tzinfo is not None:
                 time_max = time_max.replace(tzinfo=None)
 
-            # Запрос событий
-            events_result = self.service.events().list(
-                calendarId=self.calendar_id,
-                timeMin=time_min.isoformat() + 'Z',
-                timeMax=time_max.isoformat() + 'Z',
-                maxResults=max_results,
-                singleEvents=single_events,
-                orderBy=order_by
-            ).execute()
+            # Запрос событий по страницам
+            events = []
+            page_token = None
+            while max_results is None or len(events) < max_results:
+                page_size = PAGE_SIZE if max_results is None else min(PAGE_SIZE, max_results - len(events))
+                events_result = self.service.events().list(
+                    calendarId=self.calendar_id,
+                    timeMin=time_min.isoformat() + 'Z',
+                    timeMax=time_max.isoformat() + 'Z',
+                    maxResults=page_size,
+                    singleEvents=single_events,
+                    orderBy=order_by,
+                    pageToken=page_token
+                ).execute()
+
+                events.extend(events_result.get('items', []))
+                page_token = events_result.get('nextPageToken')
+                if not page_token:
+                    break
 
-            events = events_result.get('items', [])
             calendar_logger.info(f"Retrieved {len(events)} events")
             return events
   
@@ -212,6 +242,76 @@ class GoogleCalendarManager:
             calendar_logger.error(f"Error while getting events: {e}")
             return []
 
+    def list_changes(self, sync_token: Optional[str] = None) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        Изменения календаря для синхронизации локальной копии
+
+        Без ``sync_token`` — полный список событий, с ним — только изменённые
+        после него (удалённые приходят со ``status='cancelled'``).
+        Ошибки не перехватываются: при устаревшем токене API отвечает 410,
+        и вызывающий код должен выполнить полную синхронизацию.
+
+        Returns:
+            (события, новый sync token)
+        """
+        events = []
+        page_token = None
+        while True:
+            params = {
+                'calendarId': self.calendar_id,
+                'maxResults': PAGE_SIZE,
+                'singleEvents': True,
+                'pageToken': page_token,
+            }
+            if sync_token:
+                params['syncToken'] = sync_token
+
+            result = self.service.events().list(**params).execute()
+            events.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                calendar_logger.info(
+                    f"Synced {len(events)} events ({'incremental' if sync_token else 'full'})")
+                return events, result.get('nextSyncToken')
+
+    def execute_batch(self, operations: List[Tuple[str, Optional[str], Optional[Dict[str, Any]]]]
+                      ) -> List[Tuple[Optional[Dict[str, Any]], Optional[Exception]]]:
+        """
+        Выполнить несколько изменений batch-запросами (по ``BATCH_SIZE``)
+
+        Args:
+            operations: ``(операция, event_id, тело)``, операция —
+                ``insert`` (без event_id), ``patch`` или ``delete`` (без тела)
+
+        Returns:
+            ``(результат, ошибка)`` для каждой операции в том же порядке;
+            результат ``delete`` — ``{}``
+        """
+        results: List[Tuple[Optional[Dict[str, Any]], Optional[Exception]]] = [(None, None)] * len(operations)
+
+        def on_response(request_id, response, exception):
+            index = int(request_id)
+            results[index] = (None, exception) if exception else (response or {}, None)
+
+        events = self.service.events()
+        for start in range(0, len(operations), BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for index in range(start, min(start + BATCH_SIZE, len(operations))):
+                op, event_id, body = operations[index]
+                if op == 'insert':
+                    request = events.insert(calendarId=self.calendar_id, body=body)
+                elif op == 'patch':
+                    request = events.patch(calendarId=self.calendar_id, eventId=event_id, body=body)
+                elif op == 'delete':
+                    request = events.delete(calendarId=self.calendar_id, eventId=event_id)
+                else:
+                    raise ValueError(f"Unknown calendar operation: {op}")
+                batch.add(request, request_id=str(index))
+            batch.execute()
+
+        calendar_logger.info(f"Executed {len(operations)} calendar operations in batch")
+        return results
+
     def get_event(self, event_id: str) -> Optional[Dict[str, Any]]:
         """
         Получение конкретного события по ID
@@ -451,5 +551,3 @@ class GoogleCalendarManager:
             return False
 
 
-# Создание глобального экземпляра менеджера
-calendar_manager = GoogleCalendarManager()
@@ -0,0 +1,219 @@
+"""
+Локальная замена клиента Google Calendar API (``googleapiclient``) для
+проверок без сети::
+
+    from modules.calendar.calendar_manager import GoogleCalendarManager
+    from modules.calendar.fake_service import FakeCalendarService
+    from modules.calendar import calendar
+
+    service = FakeCalendarService()
+    calendar.use_manager(GoogleCalendarManager(service=service, calendar_id="fake"))
+
+Поддерживаются ``events().list/get/insert/patch/update/delete``
+(постранично, с sync token и удалёнными событиями как в API),
+``calendars().get`` и ``new_batch_http_request``. Число вызовов API
+считается в ``calls``, batch-запросов — в ``batches``.
+:meth:`FakeCalendarService.expire_sync_tokens` имитирует ответ 410.
+"""
+import copy
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+
+class FakeHttpError(Exception):
+    """Ошибка API; ``resp.status`` — как у ``googleapiclient.errors.HttpError``."""
+
+    def __init__(self, status: int, message: str = ""):
+        self.resp = SimpleNamespace(status=status)
+        super().__init__(f"<HttpError {status}: {message}>")
+
+
+class _Request:
+    def __init__(self, func: Callable):
+        self._func = func
+
+    def execute(self):
+        return self._func()
+
+
+class _Batch:
+    def __init__(self, service: "FakeCalendarService", callback: Optional[Callable]):
+        self._service = service
+        self._callback = callback
+        self._items: list[tuple[str, _Request, Optional[Callable]]] = []
+
+    def add(self, request: _Request, callback: Optional[Callable] = None, request_id: Optional[str] = None):
+        self._items.append((request_id or str(len(self._items)), request, callback))
+
+    def execute(self):
+        self._service.batches += 1
+        for request_id, request, callback in self._items:
+            try:
+                response, error = request.execute(), None
+            except Exception as e:
+                response, error = None, e
+            handler = callback or self._callback
+            if handler:
+                handler(request_id, response, error)
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _start_key(event: dict) -> str:
+    start = event.get('start') or {}
+    return start.get('dateTime') or start.get('date') or ''
+
+
+class _Events:
+    def __init__(self, service: "FakeCalendarService"):
+        self._s = service
+
+    def list(self, calendarId: str, syncToken: Optional[str] = None, pageToken: Optional[str] = None,
+             maxResults: int = 250, showDeleted: bool = False, timeMin: Optional[str] = None,
+             timeMax: Optional[str] = None, orderBy: Optional[str] = None, **_):
+        return _Request(lambda: self._s._list(
+            syncToken, pageToken, maxResults, showDeleted, timeMin, timeMax, orderBy))
+
+    def get(self, calendarId: str, eventId: str, **_):
+        return _Request(lambda: copy.deepcopy(self._s._existing(eventId)))
+
+    def insert(self, calendarId: str, body: dict, **_):
+        return _Request(lambda: self._s._insert(body))
+
+    def patch(self, calendarId: str, eventId: str, body: dict, **_):
+        return _Request(lambda: self._s._write(eventId, body, merge=True))
+
+    def update(self, calendarId: str, eventId: str, body: dict, **_):
+        return _Request(lambda: self._s._write(eventId, body, merge=False))
+
+    def delete(self, calendarId: str, eventId: str, **_):
+        return _Request(lambda: self._s._delete(eventId))
+
+
+class FakeCalendarService:
+    """ Календарь в памяти с интерфейсом ``googleapiclient`` Calendar v3.
+    """
+
+    def __init__(self):
+        self.events_by_id: dict[str, dict] = {}
+        self.calls: Counter = Counter()
+        self.batches = 0
+        self._ids = itertools.count(1)
+        self._seq = 0
+        # event_id -> номер последнего изменения
+        self._changed: dict[str, int] = {}
+        # Sync token меньше этого номера считается устаревшим
+        self._min_token = 0
+
+    # ── интерфейс googleapiclient ───────────────────────────────────────
+
+    def events(self) -> _Events:
+        return _Events(self)
+
+    def calendars(self):
+        return SimpleNamespace(get=lambda calendarId, **_: _Request(
+            lambda: {"id": calendarId, "summary": "Fake calendar"}))
+
+    def new_batch_http_request(self, callback: Optional[Callable] = None) -> _Batch:
+        return _Batch(self, callback)
+
+    # ── управление ──────────────────────────────────────────────────────
+
+    def expire_sync_tokens(self) -> None:
+        """Все выданные sync token станут недействительными (ответ 410)."""
+        self._min_token = self._seq + 1
+
+    # ── реализация ──────────────────────────────────────────────────────
+
+    def _touch(self, event: dict) -> None:
+        self._seq += 1
+        event['updated'] = _now_iso()
+        self._changed[event['id']] = self._seq
+
+    def _existing(self, event_id: str) -> dict:
+        event = self.events_by_id.get(event_id)
+        if event is None:
+            raise FakeHttpError(404, "Not Found")
+        if event.get('status') == 'cancelled':
+            raise FakeHttpError(410, "Resource has been deleted")
+        return event
+
+    def _insert(self, body: dict) -> dict:
+        self.calls['insert'] += 1
+        event = copy.deepcopy(body)
+        event['id'] = event.get('id') or f"fake{next(self._ids)}"
+        event['status'] = 'confirmed'
+        self.events_by_id[event['id']] = event
+        self._touch(event)
+        return copy.deepcopy(event)
+
+    def _write(self, event_id: str, body: dict, merge: bool) -> dict:
+        self.calls['patch' if merge else 'update'] += 1
+        event = self._existing(event_id)
+        if not merge:
+            event.clear()
+            event.update(id=event_id, status='confirmed')
+        event.update(copy.deepcopy(body))
+        self._touch(event)
+        return copy.deepcopy(event)
+
+    def _delete(self, event_id: str) -> str:
+        self.calls['delete'] += 1
+        event = self._existing(event_id)
+        event['status'] = 'cancelled'
+        self._touch(event)
+        return ''
+
+    def _list(self, sync_token, page_token, max_results, show_deleted, time_min, time_max, order_by):
+        self.calls['list'] += 1
+        if sync_token is not None:
+            if int(sync_token) < self._min_token:
+                raise FakeHttpError(410, "Sync token is no longer valid, a full sync is required.")
+            items = [
+                self.events_by_id[event_id]
+                for event_id, seq in sorted(self._changed.items(), key=lambda kv: kv[1])
+                if seq > int(sync_token)
+            ]
+        else:
+            items = [
+                event for event in self.events_by_id.values()
+                if show_deleted or event.get('status') != 'cancelled'
+            ]
+            if time_min or time_max:
+                items = [e for e in items if self._overlaps(e, time_min, time_max)]
+            if order_by == 'startTime':
+                items.sort(key=_start_key)
+
+        offset = int(page_token or 0)
+        page = items[offset:offset + max_results]
+        result = {"kind": "calendar#events", "items": copy.deepcopy(page)}
+        if offset + max_results < len(items):
+            result["nextPageToken"] = str(offset + max_results)
+        else:
+            result["nextSyncToken"] = str(self._seq)
+        return result
+
+    @staticmethod
+    def _overlaps(event: dict, time_min: Optional[str], time_max: Optional[str]) -> bool:
+        def parse(value: str) -> datetime:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+        def bound(field: str) -> Optional[datetime]:
+            value = event.get(field) or {}
+            raw = value.get('dateTime') or value.get('date')
+            return parse(raw) if raw else None
+
+        start, end = bound('start'), bound('end')
+        if start is None or end is None:
+            return False
+        if time_max and start >= parse(time_max):
+            return False
+        if time_min and end <= parse(time_min):
+            return False
+        return True
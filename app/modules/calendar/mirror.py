@@ -0,0 +1,203 @@
+"""
+Локальная копия Google Calendar в таблице ``calendar_events``.
+
+Чтение (список событий, проверка занятости, событие по ID) идёт в БД, а не
+в API. Копия поддерживается так:
+
+- :meth:`CalendarMirror.sync` — инкрементальная синхронизация по sync
+  token (при первом запуске и при ответе 410 — полная);
+  :meth:`CalendarMirror.run` повторяет её каждые ``interval`` секунд;
+- изменения из бота (:meth:`CalendarMirror.write`) копятся ``batch_window``
+  секунд, уходят в API одним batch-запросом и сразу записываются в копию.
+
+Вызовы API синхронные и выполняются в потоке (``asyncio.to_thread``).
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from database.connection import session_factory
+from models.CalendarEvent import CalendarEvent
+from models.CalendarSyncState import CalendarSyncState
+from modules.logs import calendar_logger
+
+
+def _http_status(error: Exception) -> Optional[int]:
+    return getattr(getattr(error, 'resp', None), 'status', None)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Время запроса → naive UTC, как в таблице."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class CalendarMirror:
+    """ Копия одного календаря (``manager.calendar_id``).
+
+        - ``batch_window`` — сколько секунд копить изменения перед отправкой;
+        - ``max_batch`` — после скольких изменений отправлять не дожидаясь окна.
+    """
+
+    def __init__(self, manager, batch_window: float = 0.2, max_batch: int = 50):
+        self.manager = manager
+        self.calendar_id = manager.calendar_id
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        self.synced = False
+        self._sync_lock = asyncio.Lock()
+        self._pending: list[tuple[str, Optional[str], Optional[dict], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._full = asyncio.Event()
+
+    # ── синхронизация ──────────────────────────────────────────────────
+
+    async def sync(self, full: bool = False) -> dict:
+        """ Подтянуть изменения календаря в таблицу.
+
+            Returns:
+                {"full": bool, "changed": int, "deleted": int}
+        """
+        async with self._sync_lock:
+            token = None if full else await CalendarSyncState.get_token(self.calendar_id)
+            try:
+                items, next_token = await asyncio.to_thread(self.manager.list_changes, token)
+            except Exception as e:
+                if not token or _http_status(e) != 410:
+                    raise
+                calendar_logger.info("Calendar sync token expired, running full sync")
+                token = None
+                items, next_token = await asyncio.to_thread(self.manager.list_changes, None)
+
+            changed = [event for event in items if event.get('status') != 'cancelled']
+            deleted = [event['id'] for event in items if event.get('status') == 'cancelled']
+
+            async with session_factory() as session:
+                await CalendarEvent.apply_changes(
+                    self.calendar_id, changed, deleted, replace=token is None, session=session
+                )
+                await CalendarSyncState.save_token(self.calendar_id, next_token, session=session)
+                await session.commit()
+
+            self.synced = True
+            return {"full": token is None, "changed": len(changed), "deleted": len(deleted)}
+
+    async def ensure_synced(self) -> None:
+        """Первая синхронизация в этом процессе, если её ещё не было.
+
+        Если API недоступен, но копия уже заполнялась раньше, чтение идёт
+        из неё, а повторную попытку сделает :meth:`run`.
+        """
+        if self.synced:
+            return
+        try:
+            await self.sync()
+        except Exception as e:
+            if await CalendarSyncState.get_token(self.calendar_id) is None:
+                raise
+            calendar_logger.warning(f"Calendar sync failed, serving stale mirror: {e}")
+            self.synced = True
+
+    async def run(self, interval: float = 60) -> None:
+        """ Цикл синхронизации: сразу и далее каждые ``interval`` секунд.
+        """
+        while True:
+            try:
+                stats = await self.sync()
+                if stats["changed"] or stats["deleted"] or stats["full"]:
+                    calendar_logger.info(f"Calendar mirror synced: {stats}")
+            except Exception as e:
+                calendar_logger.error(f"Calendar mirror sync failed: {e}")
+            await asyncio.sleep(interval)
+
+    # ── чтение ─────────────────────────────────────────────────────────
+
+    async def events(self,
+                     time_min: datetime,
+                     time_max: datetime,
+                     max_results: Optional[int] = None,
+                     order_by: str = 'startTime') -> list[dict]:
+        await self.ensure_synced()
+        return await CalendarEvent.between(
+            self.calendar_id, _as_utc(time_min), _as_utc(time_max), max_results, order_by
+        )
+
+    async def is_available(self, start_time: datetime, end_time: datetime) -> bool:
+        await self.ensure_synced()
+        return await CalendarEvent.is_free(self.calendar_id, _as_utc(start_time), _as_utc(end_time))
+
+    async def get(self, event_id: str) -> Optional[dict]:
+        await self.ensure_synced()
+        return await CalendarEvent.get_event(self.calendar_id, event_id)
+
+    # ── запись ─────────────────────────────────────────────────────────
+
+    async def write(self, op: str, event_id: Optional[str] = None,
+                    body: Optional[dict] = None) -> Any:
+        """ Поставить изменение в batch и дождаться его результата.
+
+            Args:
+                op: ``insert``, ``patch`` или ``delete``
+
+            Returns:
+                Событие из API (для ``delete`` — ``{}``)
+
+            Raises:
+                Ошибка API для этой операции
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((op, event_id, body, future))
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.wait_for(self._full.wait(), self.batch_window)
+        except asyncio.TimeoutError:
+            pass
+
+        while self._pending:
+            self._full.clear()
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            await self._flush(batch)
+
+    async def _flush(self, batch: list) -> None:
+        operations = [(op, event_id, body) for op, event_id, body, _ in batch]
+        try:
+            results = await asyncio.to_thread(self.manager.execute_batch, operations)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        changed, deleted = [], []
+        for (op, event_id, _body, _future), (response, error) in zip(batch, results):
+            if error is None:
+                if op == 'delete':
+                    deleted.append(event_id)
+                elif response:
+                    changed.append(response)
+            elif op == 'delete' and _http_status(error) in (404, 410):
+                # Уже удалено в календаре
+                deleted.append(event_id)
+
+        try:
+            if changed or deleted:
+                await CalendarEvent.apply_changes(self.calendar_id, changed, deleted)
+        except Exception as e:
+            # Копию поправит следующая синхронизация
+            calendar_logger.error(f"Failed to apply calendar batch to mirror: {e}")
+
+        for (_op, _event_id, _body, future), (response, error) in zip(batch, results):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(response)
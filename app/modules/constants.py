@@ -1,37 +1,12 @@
-import json
 from typing import Any
-from concurrent.futures import ThreadPoolExecutor
 
-# Константы
-CLIENTS: dict[str, Any]
-EXECUTORS: dict[str, Any]
-SETTINGS: dict[str, Any]
+from modules.json_utils import config_registry
 
-# Пути к JSON файлам
-files = {
-    'CLIENTS': 'json/clients.json',
-    'EXECUTORS': 'json/executors.json',
-    'SETTINGS': 'json/settings.json',
-}
-
-def load_json(filepath):
-    """Загрузка JSON файла"""
-
-    with open(filepath, 'rb') as f:
-        return json.loads(f.read())
-
-def load_constants():
-    """Параллельная загрузка констант"""
-
-    with ThreadPoolExecutor() as executor:
-        results = list(
-            executor.map(
-                load_json, files.values())
-            )
-    return dict(zip(files.keys(), results))
-
-constants = load_constants()
-globals().update(constants) # Обновляем переменные констант
+# Константы — словари из реестра конфигураций (modules.json_utils.config_registry):
+# при изменении файла содержимое обновляется на месте, ссылки остаются прежними
+CLIENTS: dict[str, Any] = config_registry.get('clients.json')
+EXECUTORS: dict[str, Any] = config_registry.get('executors.json')
+SETTINGS: dict[str, Any] = config_registry.get('settings.json')
 
 
 class SceneNames:
@@ -2,11 +2,14 @@
 Клиент для взаимодействия brain-модулей с executor-ами.
 Реализует все операции напрямую, без промежуточного executor_bridge.
 """
+import asyncio
 from typing import Optional
 from uuid import UUID as _UUID
 
 from modules.constants import SceneNames
 from modules.logs import logger
+from modules.exec.notify_dispatcher import notify_dispatcher
+from modules.utils import get_bot_me
 from models.CardMessage import CardMessage
 
 from typing import TYPE_CHECKING
@@ -14,6 +17,10 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from models.Card import Card
 
+# Сколько сцен обновлять одновременно при рассылке обновлений
+SCENE_UPDATE_CONCURRENCY = 8
+
+
 def _get_tg():
     from modules.exec.executors_manager import manager
     return manager.get("telegram_executor")
@@ -165,20 +172,36 @@ async def notify_user(
 
         if card_id:
             try:
-                bot_info = await tg.bot.get_me()
+                bot_info = await get_bot_me(tg.bot)
                 view_link = f'https://t.me/{bot_info.username}?start=type-open-view_id-{card_id}'
                 list_markup.insert(0, {'text': "👁 Просмотреть задачу", 'url': view_link})
             except Exception as e:
                 logger.warning(f"Не удалось добавить кнопку просмотра задачи: {e}")
 
-        result = await tg.send_message(
-            chat_id=str(telegram_id),
-            text=message,
-            reply_to_message_id=reply_to,
-            parse_mode=parse_mode,
-            list_markup=list_markup,
+        result = await notify_dispatcher.send(
+            telegram_id,
+            lambda: tg.send_message(
+                chat_id=str(telegram_id),
+                text=message,
+                reply_to_message_id=reply_to,
+                parse_mode=parse_mode,
+                list_markup=list_markup,
+            ),
         )
 
+        if result.get("retry_after"):
+            # Telegram попросил подождать дольше, чем ждёт диспетчер — переносим отправку
+            await _reschedule_notification(
+                result["retry_after"],
+                telegram_id=telegram_id,
+                message=message,
+                reply_to=reply_to,
+                parse_mode=parse_mode,
+                card_id=card_id,
+                action=action,
+            )
+            return False
+
         if action:
             try:
                 await update_scenes(page_name=action, action="update")
@@ -191,31 +214,81 @@ async def notify_user(
         return False
 
 
+async def _reschedule_notification(retry_after: float, **kwargs) -> None:
+    """Повторить notify_user через планировщик задач спустя retry_after секунд."""
+    from datetime import timedelta
+    from database.connection import session_factory
+    from modules.tasks.scheduler import create_scheduled_task
+    from modules.timezone import now_naive as moscow_now
+
+    execute_at = moscow_now() + timedelta(seconds=retry_after + 1)
+    async with session_factory() as session:
+        await create_scheduled_task(
+            session=session,
+            function_path="modules.exec.executors_client.notify_user",
+            execute_at=execute_at,
+            **kwargs,
+        )
+    logger.warning(
+        f"Уведомление пользователю {kwargs.get('telegram_id')} отложено "
+        f"до {execute_at} из-за флуд-контроля Telegram"
+    )
+
+
 async def notify_users(
     user_ids,
     message: str,
     action: Optional[str] = None,
     card_id: Optional[str] = None,
+    parse_mode: Optional[str] = None,
 ) -> None:
-    """Send notifications to multiple users. Accepts telegram_id (int) or user_id (UUID)."""
+    """Send notifications to multiple users. Accepts telegram_id (int) or user_id (UUID).
+
+    UUID получателей разрешаются одним запросом, отправка идёт
+    параллельно через notify_dispatcher.
+    """
     from models.User import User
 
-    user_ids = list(set(user_ids))
+    telegram_ids: set[int] = set()
+    uuids = []
 
-    for uid in user_ids:
+    for uid in set(user_ids):
         if uid is None:
             continue
         try:
-            # UUID — ищем telegram_id
             if isinstance(uid, _UUID) or (isinstance(uid, str) and '-' in str(uid)):
-                users = await User.find(user_id=_UUID(str(uid)))
-                if users and users[0].telegram_id:
-                    await notify_user(users[0].telegram_id, message, card_id=card_id, action=action)
+                uuids.append(_UUID(str(uid)))
             else:
-                await notify_user(int(uid), message, card_id=card_id, action=action)
+                telegram_ids.add(int(uid))
         except Exception as e:
             logger.error(f"Ошибка уведомления пользователя {uid}: {e}")
 
+    if uuids:
+        try:
+            resolved = await User.telegram_ids_for(uuids)
+            telegram_ids.update(tid for tid in resolved.values() if tid)
+        except Exception as e:
+            logger.error(f"Ошибка поиска получателей уведомления: {e}")
+
+    if not telegram_ids:
+        return
+
+    recipients = list(telegram_ids)
+    results = await asyncio.gather(*(
+        notify_user(tid, message, parse_mode=parse_mode, card_id=card_id)
+        for tid in recipients
+    ), return_exceptions=True)
+
+    for tid, res in zip(recipients, results):
+        if isinstance(res, Exception):
+            logger.error(f"Ошибка уведомления пользователя {tid}: {res}")
+
+    if action:
+        try:
+            await update_scenes(page_name=action, action="update")
+        except Exception as e:
+            logger.warning(f"Не удалось обновить сцены по action={action}: {e}")
+
 
 async def update_task_scenes(card_id: str) -> int:
     return await update_scenes(
@@ -239,35 +312,35 @@ async def update_scenes(
     users_id: Optional[list] = None,
 ) -> int:
     from tg.oms.manager import scene_manager
-    active_scenes = list(scene_manager._instances.values())
-    updated_count = 0
     users = list(set(users_id)) if users_id else None
 
-    for scene in active_scenes:
-        match = True
-        if scene_name and scene.__scene_name__ != scene_name:
-            match = False
-        if page_name and scene.current_page.__page_name__ != page_name:
-            match = False
-        if data_key and data_value:
-            scene_value = scene.data.get('scene', {}).get(data_key)
-            if str(scene_value) != str(data_value):
-                match = False
-        if users and scene.user_id not in users:
-            match = False
-
-        if match:
+    # Индексы менеджера сразу отбирают только подходящие сцены
+    matched = scene_manager.find_scenes(
+        scene_name=scene_name,
+        page_name=page_name,
+        data_key=data_key,
+        data_value=data_value,
+        users_id=users,
+    )
+    if not matched:
+        return 0
+
+    semaphore = asyncio.Semaphore(SCENE_UPDATE_CONCURRENCY)
+
+    async def apply(scene) -> bool:
+        async with semaphore:
             try:
                 if action == "close":
                     await scene.end()
                 else:
                     await scene.update_message()
-                updated_count += 1
+                return True
             except Exception as e:
-                from modules.logs import executors_logger
-                executors_logger.warning(f"Failed to update scene for user {scene.user_id}: {e}")
+                logger.warning(f"Failed to update scene for user {scene.user_id}: {e}")
+                return False
 
-    return updated_count
+    results = await asyncio.gather(*(apply(scene) for scene in matched))
+    return sum(results)
 
 
 # ==================== Дополнительно ====================
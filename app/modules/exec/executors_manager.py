@@ -51,9 +51,9 @@ async def executors_start():
 
         try:
             executor = base_class(
-                config=check_env_config(
-                    executor_data['config'] # Заменяем данные на переменные из окружения
-                    ),
+                # Заменяем данные на переменные из окружения — в копии,
+                # общий конфиг из config_registry не меняем
+                config=check_env_config(dict(executor_data['config'])),
                 executor_name=exe_name
             )
         except Exception as e:
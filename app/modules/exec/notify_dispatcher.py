@@ -0,0 +1,152 @@
+"""
+Диспетчер исходящих уведомлений Telegram.
+
+Ограничивает скорость отправки общим token bucket (лимит бота) и
+интервалом между сообщениями в один чат. Ответ ``RetryAfter`` не
+теряет сообщение: короткие паузы выжидаются здесь же, длинные
+возвращаются вызывающему коду для переноса отправки. На время
+``RetryAfter`` приостанавливается и общий bucket — продолжение рассылки
+в другие чаты Telegram продлевает флуд-контроль для всего бота.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from modules.logs import logger
+
+
+class TokenBucket:
+    """ Token bucket: ``rate`` токенов в секунду, не больше ``capacity``.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if now <= self._updated:
+            # Bucket на паузе (см. pause)
+            return
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep(self._wait())
+
+    def try_acquire(self) -> float:
+        """ Взять токен без ожидания.
+            Возвращает 0, если токен взят, иначе — через сколько секунд он появится.
+        """
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return self._wait()
+
+    def _wait(self) -> float:
+        """Через сколько секунд появится токен (с учётом паузы)."""
+        paused = max(self._updated - time.monotonic(), 0.0)
+        return paused + (1 - self._tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """ Не выдавать токены ``seconds`` секунд; после паузы
+            bucket наполняется с нуля, без накопленного запаса.
+        """
+        until = time.monotonic() + seconds
+        if until > self._updated:
+            self._tokens = 0
+            self._updated = until
+
+
+class NotificationDispatcher:
+    """ Отправка сообщений с учётом лимитов Telegram.
+
+        - ``global_rate`` — сообщений в секунду на весь бот (Telegram: ~30);
+        - ``per_chat_interval`` — минимальный интервал между сообщениями
+          в один чат (Telegram: ~1 в секунду);
+        - ``max_inline_wait`` — до скольких секунд ``RetryAfter``
+          выжидается внутри :meth:`send`; более длинные паузы
+          возвращаются в результате (``retry_after``).
+    """
+
+    # После скольких записей чистить устаревшие слоты чатов
+    CHAT_SLOTS_LIMIT = 10000
+
+    def __init__(
+        self,
+        global_rate: float = 25,
+        per_chat_interval: float = 1.0,
+        max_inline_wait: float = 30,
+        max_attempts: int = 3,
+    ):
+        self.per_chat_interval = per_chat_interval
+        self.max_inline_wait = max_inline_wait
+        self.max_attempts = max_attempts
+        self._bucket = TokenBucket(global_rate)
+        self._chat_next: dict[str, float] = {}
+
+    def _reserve_chat_slot(self, chat_id: str) -> float:
+        """ Занять ближайший свободный слот чата, вернуть время ожидания.
+        """
+        now = time.monotonic()
+        if len(self._chat_next) > self.CHAT_SLOTS_LIMIT:
+            self._chat_next = {
+                k: v for k, v in self._chat_next.items() if v > now}
+
+        slot = max(now, self._chat_next.get(chat_id, 0))
+        self._chat_next[chat_id] = slot + self.per_chat_interval
+        return slot - now
+
+    def _defer_chat(self, chat_id: str, seconds: float) -> None:
+        until = time.monotonic() + seconds
+        self._chat_next[chat_id] = max(self._chat_next.get(chat_id, 0), until)
+
+    async def send(
+        self,
+        chat_id,
+        send: Callable[[], Awaitable[dict]],
+    ) -> dict:
+        """ Выполнить ``send()`` с соблюдением лимитов.
+
+            ``send`` возвращает словарь в формате методов
+            TelegramExecutor; при флуд-контроле в нём есть ``retry_after``.
+        """
+        chat_id = str(chat_id)
+        result: dict = {"success": False}
+
+        for attempt in range(1, self.max_attempts + 1):
+            delay = self._reserve_chat_slot(chat_id)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._bucket.acquire()
+
+            result = await send()
+            retry_after = result.get("retry_after")
+            if not retry_after:
+                return result
+
+            self._defer_chat(chat_id, retry_after)
+            self._bucket.pause(retry_after)
+            if retry_after > self.max_inline_wait:
+                break
+
+            logger.warning(
+                f"Флуд-контроль Telegram для чата {chat_id}: "
+                f"повтор через {retry_after} с (попытка {attempt})"
+            )
+
+        return result
+
+
+notify_dispatcher = NotificationDispatcher()
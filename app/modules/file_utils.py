@@ -3,8 +3,9 @@
 Используется в Telegram боте и VK executor.
 """
 import io
-from typing import Optional, Tuple, Set, BinaryIO
-from PIL import Image
+from pathlib import Path
+from typing import Optional, Tuple, Set, BinaryIO, Union
+from PIL import Image, ImageOps
 
 
 # Поддерживаемые типы файлов
@@ -13,6 +14,23 @@ IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.tiff', '
 VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v']
 VIDEO_MIMES = ['video/mp4', 'video/avi', 'video/quicktime', 'video/x-matroska', 'video/webm']
 
+# Ограничение декодирования: изображения больше этого числа пикселей не открываются
+MAX_IMAGE_PIXELS = 50_000_000
+# Telegram и VK показывают фото не больше 2560 px по длинной стороне
+MAX_IMAGE_SIDE = 2560
+# Длинная сторона превью
+PREVIEW_SIDE = 1280
+
+IMAGE_FORMATS = {
+    'png': ('PNG', 'image/png', '.png'),
+    'jpeg': ('JPEG', 'image/jpeg', '.jpg'),
+    'webp': ('WEBP', 'image/webp', '.webp'),
+}
+
+
+class ImageTooLarge(ValueError):
+    """Размер изображения превышает MAX_IMAGE_PIXELS."""
+
 
 def detect_file_type_by_bytes(data: bytes) -> Tuple[str, str, str]:
     """
@@ -106,10 +124,102 @@ def is_video_by_mime_or_extension(mime_type: Optional[str], filename: Optional[s
     return False
 
 
+def open_image(
+    source: Union[bytes, str, Path],
+    max_pixels: int = MAX_IMAGE_PIXELS,
+    draft_side: Optional[int] = None,
+) -> Image.Image:
+    """
+    Открывает изображение с проверкой размера до декодирования.
+
+    Args:
+        source: Бинарные данные или путь к файлу
+        max_pixels: Максимальное число пикселей
+        draft_side: Если задан, JPEG декодируется сразу в уменьшенном виде (не меньше этого размера)
+
+    Raises:
+        ImageTooLarge: изображение больше ``max_pixels``
+    """
+    image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    width, height = image.size
+    if width * height > max_pixels:
+        raise ImageTooLarge(f"{width}x{height} больше {max_pixels} пикселей")
+    if draft_side:
+        image.draft('RGB', (draft_side, draft_side))
+    # Поворот по EXIF, чтобы после перекодирования фото не «ложились набок»
+    return ImageOps.exif_transpose(image)
+
+
+def _to_mode(image: Image.Image, image_format: str) -> Image.Image:
+    if image_format == 'JPEG':
+        # JPEG без прозрачности: альфа-канал накладываем на белый фон
+        if image.mode in ('RGBA', 'LA', 'P'):
+            rgba = image.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            return background
+        return image.convert('RGB') if image.mode != 'RGB' else image
+
+    # Конвертируем в RGBA для поддержки прозрачности
+    if image.mode not in ('RGBA', 'RGB'):
+        return image.convert('RGBA')
+    return image
+
+
+def prepare_image(
+    source: Union[bytes, str, Path],
+    max_side: Optional[int] = MAX_IMAGE_SIDE,
+    fmt: str = 'png',
+    quality: int = 90,
+) -> Tuple[bytes, str, str]:
+    """
+    Декодирует, уменьшает и перекодирует изображение.
+
+    Args:
+        source: Бинарные данные или путь к файлу
+        max_side: Максимальная длинная сторона (None — без уменьшения)
+        fmt: Формат результата: 'png', 'jpeg' или 'webp'
+        quality: Качество для JPEG/WebP
+
+    Returns:
+        Tuple[data, mime_type, extension]
+    """
+    image_format, mime_type, extension = IMAGE_FORMATS[fmt]
+    image = open_image(source, draft_side=max_side)
+
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    image = _to_mode(image, image_format)
+
+    output = io.BytesIO()
+    if image_format == 'PNG':
+        image.save(output, format='PNG', optimize=True)
+    else:
+        image.save(output, format=image_format, quality=quality, optimize=True)
+    return output.getvalue(), mime_type, extension
+
+
+def make_thumbnail(source: Union[bytes, str, Path], side: int = PREVIEW_SIDE) -> bytes:
+    """
+    Превью изображения в JPEG.
+
+    Args:
+        source: Бинарные данные или путь к файлу
+        side: Длинная сторона превью
+    """
+    image = open_image(source, draft_side=side)
+    image.thumbnail((side, side), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    _to_mode(image, 'JPEG').save(output, format='JPEG', quality=85)
+    return output.getvalue()
+
+
 def convert_image_to_png(file_data: bytes) -> bytes:
     """
     Конвертирует изображение в PNG формат.
     Поддерживает RGBA, прозрачность сохраняется.
+    Размер не меняется; для обработки вне цикла событий см. ``modules.image_pool``.
     
     Args:
         file_data: Бинарные данные исходного изображения
@@ -117,23 +227,8 @@ def convert_image_to_png(file_data: bytes) -> bytes:
     Returns:
         bytes: PNG данные изображения
     """
-    image = Image.open(io.BytesIO(file_data))
-    
-    # Конвертируем в RGBA для поддержки прозрачности
-    if image.mode not in ('RGBA', 'RGB'):
-        if image.mode == 'P':
-            # Палитровый режим может иметь прозрачность
-            image = image.convert('RGBA')
-        elif image.mode in ('LA', 'L'):
-            # Grayscale с альфа-каналом или без
-            image = image.convert('RGBA')
-        else:
-            image = image.convert('RGBA')
-    
-    output = io.BytesIO()
-    image.save(output, format='PNG', optimize=True)
-    return output.getvalue()
-
+    data, _mime, _ext = prepare_image(file_data, max_side=None)
+    return data
 
 
 def generate_unique_filename(
@@ -378,3 +473,24 @@ def process_image_for_storage(
         # Оставляем в исходном формате
         filename = get_filename_with_extension(original_name, file_data, 'png')
         return file_data, filename, mime_type
+
+
+async def stream_telegram_file(bot, file_id: str, chunk_size: int = 65536):
+    """
+    Читает файл из Telegram по частям, не загружая его в память целиком.
+
+    Args:
+        bot: Объект Bot из aiogram
+        file_id: ID файла в Telegram
+        chunk_size: Размер блока
+
+    Yields:
+        bytes: Очередной блок данных
+    """
+    file = await bot.get_file(file_id)
+    if not file.file_path:
+        return
+
+    url = bot.session.api.file_url(bot.token, file.file_path)
+    async for chunk in bot.session.stream_content(url=url, chunk_size=chunk_size, timeout=300):
+        yield chunk
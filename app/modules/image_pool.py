@@ -0,0 +1,100 @@
+"""
+Обработка изображений в отдельных процессах.
+
+Декодирование и кодирование Pillow занимают сотни миллисекунд на больших
+фото и держат GIL, поэтому выполняются в ``ProcessPoolExecutor``, а
+обработчики только ждут результат::
+
+    data, mime, ext = await image_pool.prepare(raw)
+    preview = await image_pool.thumbnail(path)
+
+Сами преобразования — в :mod:`modules.file_utils`.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Union
+
+from modules import file_utils
+from modules.logs import logger
+
+
+class ImagePool:
+    """ Пул процессов для Pillow.
+
+        - ``max_workers`` — число процессов (по умолчанию до 4, но не больше CPU);
+        - ``max_pending`` — сколько задач может ждать в очереди пула; остальные
+          ждут на семафоре, не занимая память пула.
+
+        Пул создаётся при первом обращении. Если процесс-обработчик упал
+        (например, по OOM), пул пересоздаётся, а задача повторяется один раз.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 16):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._semaphore = asyncio.Semaphore(max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: дочерние процессы не наследуют цикл событий и соединения родителя
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, func: Callable, *args):
+        """ Выполнить ``func(*args)`` в пуле. Функция и аргументы должны сериализоваться pickle.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            try:
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+            except BrokenProcessPool:
+                logger.warning("ImagePool: пул процессов сломан, пересоздаём")
+                self._reset()
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    def _reset(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    async def prepare(
+        self,
+        source: Union[bytes, str, Path],
+        max_side: Optional[int] = file_utils.MAX_IMAGE_SIDE,
+        fmt: str = 'png',
+        quality: int = 90,
+    ) -> Tuple[bytes, str, str]:
+        """ См. :func:`modules.file_utils.prepare_image`.
+        """
+        return await self.run(file_utils.prepare_image, source, max_side, fmt, quality)
+
+    async def convert_to_png(self, file_data: bytes) -> bytes:
+        """ PNG, уменьшенный до ``MAX_IMAGE_SIDE``.
+        """
+        data, _mime, _ext = await self.prepare(file_data)
+        return data
+
+    async def thumbnail(
+        self,
+        source: Union[bytes, str, Path],
+        side: int = file_utils.PREVIEW_SIDE,
+    ) -> bytes:
+        """ JPEG-превью. Для файлов хранилища лучше передавать путь —
+            тогда данные читает процесс пула, а не основной процесс.
+        """
+        return await self.run(file_utils.make_thumbnail, source, side)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+image_pool = ImagePool()
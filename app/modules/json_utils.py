@@ -3,10 +3,12 @@
 Заменяет json_get.py и json_format.py, убирая дублирование.
 """
 
+import asyncio
 import json
+import time
 from pathlib import Path
 from os import getenv
-from typing import Any, Dict, Union
+from typing import Any, Callable, Dict, Optional, Union
 
 BASE_PATH = Path('json/')
 
@@ -35,14 +37,120 @@ def open_json_file(filepath: str) -> dict:
         return {}
 
 
+# -------------------------------------------------------------
+# Кэш конфигураций с перезагрузкой
+# -------------------------------------------------------------
+
+class ConfigRegistry:
+    """Разобранные JSON-конфигурации из ``json/`` в памяти.
+
+    Файл читается при первом обращении. Не чаще раза в
+    ``check_interval`` секунд проверяется mtime, и при изменении файл
+    перечитывается. Словарь конфигурации один и тот же на всё время
+    работы: новое содержимое подменяется в нём целиком, без ``await``,
+    поэтому ``CLIENTS``/``SETTINGS`` из :mod:`modules.constants` и
+    :func:`open_settings`/:func:`open_clients` всегда совпадают.
+    Невалидный файл не применяется — остаётся прежняя версия.
+
+    Подписчики (``subscribe``) вызываются после применения новой версии.
+    """
+
+    def __init__(self, base_path: Path = BASE_PATH, check_interval: float = 2.0):
+        self.base_path = base_path
+        self.check_interval = check_interval
+        self._data: Dict[str, dict] = {}
+        self._mtime: Dict[str, float] = {}
+        self._checked: Dict[str, float] = {}
+        self._subscribers: Dict[str, list[Callable[[dict], Any]]] = {}
+
+    def get(self, filename: str) -> dict:
+        """Конфигурация ``filename`` (перечитывается, если файл изменился)."""
+        now = time.monotonic()
+        if filename not in self._data or now - self._checked.get(filename, 0) >= self.check_interval:
+            self._checked[filename] = now
+            self._refresh(filename)
+        return self._data[filename]
+
+    def reload(self, filename: Optional[str] = None) -> list[str]:
+        """Перечитать файл (или все загруженные) независимо от mtime.
+
+        Returns:
+            Имена файлов, содержимое которых изменилось.
+        """
+        names = [filename] if filename else list(self._data)
+        return [name for name in names if self._refresh(name, force=True)]
+
+    async def watch(self, interval: Optional[float] = None) -> None:
+        """Цикл проверки загруженных файлов — чтобы словари обновлялись,
+        даже если их читают напрямую (``SETTINGS.get(...)``), а не через :meth:`get`.
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval or self.check_interval)
+                for filename in list(self._data):
+                    self.get(filename)
+        except asyncio.CancelledError:
+            pass
+
+    def subscribe(self, filename: str, callback: Callable[[dict], Any]) -> None:
+        """Вызывать ``callback(config)`` после каждой перезагрузки ``filename``."""
+        self._subscribers.setdefault(filename, []).append(callback)
+
+    def _refresh(self, filename: str, force: bool = False) -> bool:
+        path = self.base_path / filename
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            mtime = None
+
+        first = filename not in self._data
+        if not first and not force and mtime == self._mtime.get(filename):
+            return False
+        self._mtime[filename] = mtime
+
+        new = None
+        if mtime is None:
+            print(f"Error: File not found at {filename}")
+        else:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    new = json.load(f)
+            except json.JSONDecodeError:
+                print(f"Error: Invalid JSON format in {filename}")
+            except Exception as e:
+                print(f"An unexpected error occurred: {e}")
+
+        if new is None:
+            # При перезагрузке оставляем последнюю рабочую версию
+            self._data.setdefault(filename, {})
+            return False
+
+        current = self._data.setdefault(filename, {})
+        if current == new:
+            return False
+
+        current.clear()
+        current.update(new)
+        if not first:
+            for callback in self._subscribers.get(filename, []):
+                try:
+                    callback(current)
+                except Exception as e:
+                    print(f"Config subscriber error for {filename}: {e}")
+        return True
+
+
+config_registry = ConfigRegistry()
+
+
 def open_settings() -> dict:
-    """Возвращает словарь из ``json/settings.json``"""
-    return open_json_file('settings.json')
+    """Возвращает словарь из ``json/settings.json`` (общий, только для чтения)"""
+    return config_registry.get('settings.json')
 
 
 def open_clients() -> dict:
-    """Возвращает словарь из ``json/clients.json``"""
-    return open_json_file('clients.json')
+    """Возвращает словарь из ``json/clients.json`` (общий, только для чтения)"""
+    return config_registry.get('clients.json')
 
 
 # -------------------------------------------------------------
@@ -128,4 +128,5 @@ class Logger:
         """Логировать critical сообщение"""
         cls.get_logger(app_name).critical(message)
 
-logger = Logger.get_logger("smm_app")
\ No newline at end of file
+logger = Logger.get_logger("smm_app")
+calendar_logger = Logger.get_logger("calendar")
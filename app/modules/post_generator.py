@@ -1,10 +1,22 @@
 """
 Модуль для генерации постов с форматированием для различных платформ
+
+Готовый текст поста зависит только от контента, тегов, клиента и
+справочника тегов, поэтому :func:`generate_post` запоминает результат
+в LRU-кэше :data:`render_cache`: повторные превью одной карточки и
+публикация не пересобирают хештеги и не гоняют регулярные выражения VK.
 """
+import hashlib
 import re
+from collections import OrderedDict
 from typing import Optional
 from modules.constants import CLIENTS
 
+# Регулярные выражения компилируются один раз при импорте
+_HTML_TAG_RE = re.compile('<.*?>')
+# <a href="...">текст</a>
+_HYPERLINK_RE = re.compile(r'<a\s+href=["\']([^"\']+)["\'][^>]*>([^<]+)</a>', re.IGNORECASE)
+
 
 def clean_html(text: str) -> str:
     """
@@ -16,8 +28,19 @@ def clean_html(text: str) -> str:
     Returns:
         Очищенный текст без HTML тегов
     """
-    clean = re.compile('<.*?>')
-    return re.sub(clean, '', text)
+    return _HTML_TAG_RE.sub('', text)
+
+
+def _replace_link(match: re.Match) -> str:
+    url = match.group(1)
+    link_text = match.group(2)
+
+    # Если ссылка на vk.com, конвертируем в VK формат
+    if 'vk.com' in url:
+        return f'[{url}|{link_text}]'
+    else:
+        # Для остальных ссылок просто оставляем текст и URL
+        return f'{link_text} ({url})'
 
 
 def convert_hyperlinks_to_vk(text: str) -> str:
@@ -32,44 +55,58 @@ def convert_hyperlinks_to_vk(text: str) -> str:
     Returns:
         Текст с конвертированными ссылками
     """
-    # Паттерн для поиска <a href="...">текст</a>
-    pattern = r'<a\s+href=["\']([^"\']+)["\'][^>]*>([^<]+)</a>'
-    
-    def replace_link(match):
-        url = match.group(1)
-        link_text = match.group(2)
-        
-        # Если ссылка на vk.com, конвертируем в VK формат
-        if 'vk.com' in url:
-            return f'[{url}|{link_text}]'
-        else:
-            # Для остальных ссылок просто оставляем текст и URL
-            return f'{link_text} ({url})'
-    
-    return re.sub(pattern, replace_link, text, flags=re.IGNORECASE)
+    return _HYPERLINK_RE.sub(_replace_link, text)
 
 
-async def generate_post(
-    content: str,
-    tags: Optional[list[str]] = None,
-    client_key: Optional[str] = None
-) -> str:
+class RenderCache:
+    """ LRU-кэш готовых текстов постов.
+
+        Ключ — SHA-256 от (контент, теги, клиент, суффикс тегов клиента,
+        версия снимка тегов), так что правка любого из них даёт новый ключ,
+        а старые варианты вытесняются по LRU. Счётчики ``hits`` / ``misses``.
     """
-    Асинхронно генерирует пост с форматированием для указанной платформы.
 
-    Функция автоматически сортирует список ключей тегов по значению
-    ``order`` из базы данных, затем формирует хештеги с учётом суффикса
-    клиента. Это избавляет вызывающий код от необходимости заботиться об
-    порядке.
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[str, str] = OrderedDict()
 
-    Args:
-        content: Основной текст поста
-        tags: Список хештегов (ключи)
-        client_key: Ключ клиента из clients.json для добавления tag_suffix
+    @staticmethod
+    def make_key(*parts) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(repr(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
 
-    Returns:
-        Отформатированный текст поста
-    """
+    def get(self, key: str) -> Optional[str]:
+        text = self._items.get(key)
+        if text is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        self._items[key] = text
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._items)}
+
+
+render_cache = RenderCache()
+
+
+def _render(content: str, tags: list[str], client_key: Optional[str],
+            tag_suffix: str, snapshot) -> str:
     post_text = content.strip()
 
     if 'vk' in (client_key or '').lower():
@@ -79,22 +116,9 @@ async def generate_post(
 
     # Добавляем хештеги с суффиксом клиента
     if tags:
-        # сортируем по order
-        from modules.utils import sort_tags
-        tags = await sort_tags(tags)
-
-        tag_suffix = ""
-        if client_key and client_key in CLIENTS:
-            tag_suffix = CLIENTS[client_key].get('tag_suffix', '')
-
         hashtags_list = []
-        # получаем карту тегов из БД, чтобы найти поле 'tag'
-        from modules.utils import get_tags_map
-        tag_map = await get_tags_map()
-        for tag in tags:
-            tag_name = tag_map.get(tag, {}).get('tag', tag)
-            # Добавляем # если его нет
-            formatted_tag = tag_name if tag_name.startswith("#") else f"#{tag_name}"
+        for tag in snapshot.sort(tags):
+            formatted_tag = snapshot.hashtag(tag)
             # Добавляем суффикс к каждому хештегу
             if tag_suffix:
                 formatted_tag = f"{formatted_tag}{tag_suffix}"
@@ -105,12 +129,12 @@ async def generate_post(
         post_text = f"{post_text}\n\n{hashtags}"
 
     # Форматирование в зависимости от платформы
-    if platform.lower() == "telegram":
+    if platform == "telegram":
         # Telegram поддерживает HTML и Markdown
         # Оставляем как есть
         pass
 
-    elif platform.lower() == "vk":
+    elif platform == "vk":
         # VK имеет свои особенности форматирования
         # Конвертируем гиперссылки vk.com в VK формат
         post_text = convert_hyperlinks_to_vk(post_text)
@@ -120,6 +144,47 @@ async def generate_post(
     return post_text
 
 
+async def generate_post(
+    content: str,
+    tags: Optional[list[str]] = None,
+    client_key: Optional[str] = None
+) -> str:
+    """
+    Асинхронно генерирует пост с форматированием для указанной платформы.
+
+    Функция автоматически сортирует список ключей тегов по значению
+    ``order`` из базы данных, затем формирует хештеги с учётом суффикса
+    клиента. Это избавляет вызывающий код от необходимости заботиться об
+    порядке. Результат кэшируется в :data:`render_cache`.
+
+    Args:
+        content: Основной текст поста
+        tags: Список хештегов (ключи)
+        client_key: Ключ клиента из clients.json для добавления tag_suffix
+
+    Returns:
+        Отформатированный текст поста
+    """
+    tags = list(tags or [])
+
+    # порядок и хештеги — из кэша справочника тегов
+    from modules.tag_cache import tag_cache
+    snapshot = await tag_cache.get()
+
+    tag_suffix = ""
+    if client_key and client_key in CLIENTS:
+        tag_suffix = CLIENTS[client_key].get('tag_suffix', '')
+
+    key = render_cache.make_key(
+        content, tags, client_key, tag_suffix, snapshot.version, snapshot.loaded_at
+    )
+    post_text = render_cache.get(key)
+    if post_text is None:
+        post_text = _render(content, tags, client_key, tag_suffix, snapshot)
+        render_cache.put(key, post_text)
+    return post_text
+
+
 async def format_hashtags(tags: list[str]) -> str:
     """
     Форматирует список тегов в строку хештегов с учётом порядка из БД.
@@ -3,10 +3,12 @@
 Используется в preview_page, post.py и других местах.
 Поддерживает фото, видео и media group.
 """
+import asyncio
 from typing import Optional, Union
 from aiogram import Bot
 from aiogram.types import (
     BufferedInputFile, 
+    FSInputFile,
     InputMediaPhoto, 
     InputMediaVideo,
     InlineKeyboardMarkup,
@@ -14,12 +16,12 @@ from aiogram.types import (
     Message
 )
 from modules.entities_sender import get_entities_for_client, send_poll_preview
-from uuid import UUID as _UUID
 from models.CardFile import CardFile
-from modules.storage import download_file as _storage_download_file
+from modules.storage import download_file as _storage_download_file, get_file_path, read_header
 from modules.post_generator import generate_post, render_post_from_card
 from modules.logs import logger
 from modules.utils import is_valid_telegram_url
+from modules.file_utils import extract_file_info_from_telegram_message
 
 
 def detect_media_type(file_data: bytes, file_name: str = '') -> str:
@@ -60,108 +62,220 @@ def detect_media_type(file_data: bytes, file_name: str = '') -> str:
     return 'unknown'
 
 
-async def download_files(file_ids: list[str]) -> list[dict]:
+# Сколько файлов читать из хранилища одновременно
+DOWNLOAD_CONCURRENCY = 4
+# Предел суммарного размера файлов, загружаемых в память одним вызовом
+DOWNLOAD_MEMORY_LIMIT = 300 * 1024 * 1024
+# Файлы крупнее не читаются в память — отдаются путём в хранилище
+INLINE_FILE_LIMIT = 5 * 1024 * 1024
+
+
+async def download_files(
+    file_ids: list[str],
+    max_total_bytes: Optional[int] = DOWNLOAD_MEMORY_LIMIT,
+    inline_limit: Optional[int] = INLINE_FILE_LIMIT,
+    records: Optional[list[CardFile]] = None,
+) -> list[dict]:
     """
-    Скачать файлы по их ID из БД (через brain_client).
+    Скачать файлы по их ID из БД.
+
+    Записи загружаются одним запросом (или берутся из ``records``, если
+    они уже загружены вместе с карточкой), файлы читаются из хранилища
+    параллельно. Порядок результата совпадает с ``file_ids``.
+
+    Файлы крупнее ``inline_limit`` не читаются: вместо ``data`` в словаре
+    будет ``path`` — путь в хранилище для потоковой отправки. Так же
+    отдаются файлы, не помещающиеся в ``max_total_bytes`` (по размеру из
+    записи): пост отправляется целиком, а память остаётся в пределах бюджета.
 
     Args:
         file_ids: Список идентификаторов файлов (ID в БД)
+        max_total_bytes: Предел суммарного размера в памяти; ``None`` — без ограничения
+        inline_limit: Предел размера файла для чтения в память; ``None`` — читать все
+        records: Уже загруженные записи CardFile (например, из :meth:`Card.load_aggregate`)
 
     Returns:
-        Список словарей: [{'id': str, 'data': bytes, 'name': str, 'type': str, 'hide': bool}, ...]
+        Список словарей: [{'id': str, 'data': bytes | None, 'path': str | None, 'name': str,
+                           'type': str, 'hide': bool, 'tg_file_id': str | None}, ...]
     """
     if not file_ids:
         return []
 
-    downloaded_files: list[dict] = []
-
-    for file_ref in file_ids:
+    if records is not None:
+        by_id = {str(cf.id): cf for cf in records}
+        records = [by_id[str(i)] for i in file_ids if str(i) in by_id]
+    else:
         try:
-            file_id = str(file_ref)
+            records = await CardFile.get_many(file_ids)
+        except Exception as e:
+            logger.error(f"Error loading file records: {e}", exc_info=True)
+            return []
 
-            cf = await CardFile.get_by_id(_UUID(file_id))
-            if not cf:
-                logger.warning(f"File record not found: {file_id}")
+    found = {str(cf.id) for cf in records}
+    for file_ref in file_ids:
+        if str(file_ref) not in found:
+            logger.warning(f"File record not found: {file_ref}")
+
+    # Отбор по бюджету памяти — до чтения, по размерам из БД
+    by_path: set[str] = set()
+    budget = max_total_bytes
+    for cf in records:
+        if inline_limit is not None and cf.size > inline_limit:
+            by_path.add(str(cf.id))
+            continue
+        if budget is not None:
+            if cf.size > budget:
+                logger.info(
+                    f"File {cf.id} ({cf.size} bytes) is sent from storage path: "
+                    f"memory limit of {max_total_bytes} bytes per download reached"
+                )
+                by_path.add(str(cf.id))
                 continue
+            budget -= cf.size
+
+    semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+
+    async def load_path(cf: CardFile) -> Optional[dict]:
+        file_path, status = get_file_path(cf.filename)
+        if status != 200:
+            logger.warning(f"Failed to locate file {cf.id}: status={status}")
+            return None
 
-            file_data, status = await _storage_download_file(cf.filename)
+        file_name = cf.original_filename or cf.filename
+        media_type = detect_media_type(await read_header(cf.filename), file_name)
+        return {'id': str(cf.id), 'data': None, 'path': str(file_path), 'name': file_name,
+                'type': media_type, 'hide': cf.hide,
+                'tg_file_id': cf.telegram_file_id(media_type)}
+
+    async def load(cf: CardFile) -> Optional[dict]:
+        try:
+            if str(cf.id) in by_path:
+                return await load_path(cf)
+
+            async with semaphore:
+                file_data, status = await _storage_download_file(cf.filename)
             if status == 200 and isinstance(file_data, (bytes, bytearray)):
                 file_name = cf.original_filename or cf.filename
                 media_type = detect_media_type(file_data, file_name)
-                downloaded_files.append({'id': file_id, 'data': file_data, 'name': file_name,
-                                         'type': media_type, 'hide': cf.hide})
                 logger.info(f"Downloaded file '{file_name}' ({len(file_data)} bytes, type: {media_type})")
-            else:
-                logger.warning(f"Failed to download file {file_ref}: status={status}")
+                return {'id': str(cf.id), 'data': file_data, 'path': None, 'name': file_name,
+                        'type': media_type, 'hide': cf.hide,
+                        'tg_file_id': cf.telegram_file_id(media_type)}
+            logger.warning(f"Failed to download file {cf.id}: status={status}")
         except Exception as e:
-            logger.error(f"Error downloading file {file_ref}: {e}", exc_info=True)
+            logger.error(f"Error downloading file {cf.id}: {e}", exc_info=True)
+        return None
 
-    return downloaded_files
+    results = await asyncio.gather(*(load(cf) for cf in records))
+    return [r for r in results if r is not None]
 
 
-async def send_post_preview(
+# ---------------------------------------------------------------------------
+# Кэш file_id Telegram
+# ---------------------------------------------------------------------------
+
+def _tg_media(file_info, file_data: Optional[bytes], file_name: str):
+    """file_id уже загруженного в Telegram файла, файл с диска или байты для загрузки."""
+    if isinstance(file_info, dict):
+        if file_info.get('tg_file_id'):
+            return file_info['tg_file_id']
+        if file_data is None and file_info.get('path'):
+            return FSInputFile(file_info['path'], filename=file_name)
+    return BufferedInputFile(file_data, filename=file_name)
+
+
+def tg_media_source(file_info: dict):
+    """Источник медиа для методов TelegramExecutor: file_id, FSInputFile или bytes."""
+    if file_info.get('tg_file_id'):
+        return file_info['tg_file_id']
+    if file_info.get('data') is None and file_info.get('path'):
+        return FSInputFile(file_info['path'], filename=file_info.get('name'))
+    return file_info['data']
+
+
+def _has_tg_file_ids(files: list) -> bool:
+    return any(isinstance(f, dict) and f.get('tg_file_id') for f in files or [])
+
+
+async def _remember_tg_file_ids(files: list, file_ids: list) -> None:
+    """Сохранить file_id, выданные Telegram, в CardFile и в самих словарях файлов."""
+    for f, tg_file_id in zip(files, file_ids):
+        if not isinstance(f, dict) or not f.get('id') or not tg_file_id:
+            continue
+        if f.get('tg_file_id') == tg_file_id:
+            continue
+        f['tg_file_id'] = tg_file_id
+        try:
+            await CardFile.set_telegram_file_id(f['id'], tg_file_id, f.get('type'))
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить file_id для файла {f['id']}: {e}")
+
+
+async def _forget_tg_file_ids(files: list) -> None:
+    """Сбросить file_id, которые Telegram не принял."""
+    for f in files:
+        if isinstance(f, dict) and f.pop('tg_file_id', None) and f.get('id'):
+            try:
+                await CardFile.set_telegram_file_id(f['id'], None)
+            except Exception as e:
+                logger.warning(f"Не удалось сбросить file_id для файла {f['id']}: {e}")
+
+
+# Фрагменты ответа Telegram (Bad Request), когда не принят сам file_id
+_TG_FILE_ID_ERRORS = ('file identifier', 'file_id', 'file_reference')
+
+
+def _is_tg_file_id_error(error) -> bool:
+    """Telegram отверг file_id (а не подпись, лимит или сеть)."""
+    text = str(error or '').lower()
+    return 'bad request' in text and any(marker in text for marker in _TG_FILE_ID_ERRORS)
+
+
+async def send_with_tg_file_cache(send, files: list) -> dict:
+    """
+    Отправить файлы, используя закэшированные file_id Telegram.
+
+    ``send(files)`` возвращает dict с ``success`` и ``file_ids`` (или ``file_id``)
+    в порядке ``files``. Если Telegram отверг сохранённый file_id (Bad Request
+    о неверном идентификаторе файла), отправка повторяется с байтами, после
+    успеха file_id запоминаются. Остальные ошибки (RetryAfter, таймауты,
+    ошибки подписи) возвращаются как есть: сообщение могло уже уйти.
+    """
+    result = await send(files)
+
+    if (not result.get('success') and _has_tg_file_ids(files)
+            and _is_tg_file_id_error(result.get('error'))):
+        logger.warning(f"Отправка по file_id не удалась ({result.get('error')}), загружаем файлы заново")
+        await _forget_tg_file_ids(files)
+        result = await send(files)
+
+    if result.get('success'):
+        file_ids = result.get('file_ids') or [result.get('file_id')]
+        await _remember_tg_file_ids(files, file_ids)
+
+    return result
+
+
+async def _send_preview_media(
     bot: Bot,
     chat_id: int,
     text: str,
-    media_files: Optional[list[dict]] = None,
-    parse_mode: str = "html",
-    entities: Optional[list] = None
+    media_files: list,
+    parse_mode: str,
+    reply_markup: Optional[InlineKeyboardMarkup],
 ) -> dict:
     """
-    Отправляет пост (превью) в чат с поддержкой фото, видео и media group.
-    
-    Args:
-        bot: Telegram Bot instance
-        chat_id: ID чата для отправки
-        text: Текст поста
-        media_files: Список файлов [{'data': bytes, 'name': str, 'type': str}, ...]
-        parse_mode: Режим парсинга текста
-        with_delete_button: Добавить кнопку удаления сообщения
-    
+    Отправляет медиа превью: один файл или media group.
+
     Returns:
-        {'success': bool, 'message_ids': list[int], 'error': str | None}
+        {'success': bool, 'message_ids': list[int], 'file_ids': list, 'error': str | None}
     """
     try:
         message_ids = []
-
-        # Формируем inline клавиатуру из entities типа inline_keyboard
-        reply_markup = None
-        if entities:
-            keyboard_buttons = []
-            for entity in entities:
-                if entity.get('type') == 'inline_keyboard':
-                    entity_data = entity.get('data', {})
-                    buttons = entity_data.get('buttons', [])
-                    # Все кнопки из одного entity в одну строку
-                    row = []
-                    for btn in buttons:
-                        text_btn = btn.get('text')
-                        url = btn.get('url')
-                        style = btn.get('style', None)
-                        if text_btn and url:
-                            if not is_valid_telegram_url(url):
-                                logger.warning(f"Кнопка пропущена — невалидный URL: {url}")
-                                continue
-                            row.append(InlineKeyboardButton(
-                                text=text_btn, url=url, style=style))
-                    if row:
-                        keyboard_buttons.append(row)
-
-            if keyboard_buttons:
-                reply_markup = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
-
-        # Если нет медиа - просто текст
-        if not media_files:
-            msg = await bot.send_message(
-                chat_id=chat_id,
-                text=text,
-                parse_mode=parse_mode,
-                reply_markup=reply_markup
-            )
-            message_ids.append(msg.message_id)
+        file_ids = [None] * len(media_files)
 
         # Одиночный файл
-        elif len(media_files) == 1:
+        if len(media_files) == 1:
             file_info = media_files[0]
 
             # Нормализуем вход — поддерживаем dict {'data','name','type'} и raw bytes
@@ -181,11 +295,12 @@ async def send_post_preview(
                 logger.warning(f"Unsupported file_info type for single file: {type(file_info)}")
                 raise ValueError("Unsupported media file format")
 
-            if not isinstance(file_data, (bytes, bytearray)):
+            has_path = isinstance(file_info, dict) and bool(file_info.get('path'))
+            if not isinstance(file_data, (bytes, bytearray)) and not has_path:
                 logger.error("File data is not bytes for single file")
                 raise ValueError("File data is not bytes")
 
-            input_file = BufferedInputFile(file_data, filename=file_name)
+            input_file = _tg_media(file_info, file_data, file_name)
 
             if file_type == 'video':
                 msg = await bot.send_video(
@@ -207,9 +322,11 @@ async def send_post_preview(
                 )
 
             message_ids.append(msg.message_id)
+            file_ids[0] = _sent_file_id(msg)
         else:
             # Media group (несколько файлов)
             media_group = []
+            sent_indexes = []
 
             for idx, file_info in enumerate(media_files):
                 # Нормализация формата
@@ -229,11 +346,12 @@ async def send_post_preview(
                     logger.warning(f"Unsupported file_info type in media group: {type(file_info)}")
                     continue
 
-                if not isinstance(file_data, (bytes, bytearray)):
+                has_path = isinstance(file_info, dict) and bool(file_info.get('path'))
+                if not isinstance(file_data, (bytes, bytearray)) and not has_path:
                     logger.warning(f"Skipping file {file_name or idx}: data is not bytes")
                     continue
 
-                input_file = BufferedInputFile(file_data, filename=file_name)
+                input_file = _tg_media(file_info, file_data, file_name)
 
                 # Caption только для первого элемента
                 caption = text if idx == 0 else None
@@ -253,6 +371,7 @@ async def send_post_preview(
                         parse_mode=pm,
                         has_spoiler=file_hide
                     ))
+                sent_indexes.append(idx)
 
             # Отправляем media group
             if media_group:
@@ -261,6 +380,8 @@ async def send_post_preview(
                     media=media_group
                 )
                 message_ids = [m.message_id for m in messages]
+                for idx, m in zip(sent_indexes, messages):
+                    file_ids[idx] = _sent_file_id(m)
 
                 # Для media group добавляем клавиатуру отдельным невидимым сообщением
                 if reply_markup:
@@ -273,6 +394,87 @@ async def send_post_preview(
             else:
                 logger.warning("No valid media to send in media group")
 
+        return {'success': True, 'message_ids': message_ids, 'file_ids': file_ids}
+    except Exception as e:
+        return {'success': False, 'message_ids': [], 'error': str(e)}
+
+
+def _sent_file_id(message: Message) -> Optional[str]:
+    info = extract_file_info_from_telegram_message(message)
+    return info['file_id'] if info else None
+
+
+async def send_post_preview(
+    bot: Bot,
+    chat_id: int,
+    text: str,
+    media_files: Optional[list[dict]] = None,
+    parse_mode: str = "html",
+    entities: Optional[list] = None
+) -> dict:
+    """
+    Отправляет пост (превью) в чат с поддержкой фото, видео и media group.
+    
+    Args:
+        bot: Telegram Bot instance
+        chat_id: ID чата для отправки
+        text: Текст поста
+        media_files: Список файлов [{'data': bytes, 'name': str, 'type': str}, ...]
+        parse_mode: Режим парсинга текста
+        with_delete_button: Добавить кнопку удаления сообщения
+    
+    Returns:
+        {'success': bool, 'message_ids': list[int], 'error': str | None}
+    """
+    try:
+        message_ids = []
+
+        # Формируем inline клавиатуру из entities типа inline_keyboard
+        reply_markup = None
+        if entities:
+            keyboard_buttons = []
+            for entity in entities:
+                if entity.get('type') == 'inline_keyboard':
+                    entity_data = entity.get('data', {})
+                    buttons = entity_data.get('buttons', [])
+                    # Все кнопки из одного entity в одну строку
+                    row = []
+                    for btn in buttons:
+                        text_btn = btn.get('text')
+                        url = btn.get('url')
+                        style = btn.get('style', None)
+                        if text_btn and url:
+                            if not is_valid_telegram_url(url):
+                                logger.warning(f"Кнопка пропущена — невалидный URL: {url}")
+                                continue
+                            row.append(InlineKeyboardButton(
+                                text=text_btn, url=url, style=style))
+                    if row:
+                        keyboard_buttons.append(row)
+
+            if keyboard_buttons:
+                reply_markup = InlineKeyboardMarkup(inline_keyboard=keyboard_buttons)
+
+        # Если нет медиа - просто текст
+        if not media_files:
+            msg = await bot.send_message(
+                chat_id=chat_id,
+                text=text,
+                parse_mode=parse_mode,
+                reply_markup=reply_markup
+            )
+            message_ids.append(msg.message_id)
+
+        else:
+            result = await send_with_tg_file_cache(
+                lambda files: _send_preview_media(
+                    bot, chat_id, text, files, parse_mode, reply_markup),
+                media_files
+            )
+            if not result.get('success'):
+                raise RuntimeError(result.get('error'))
+            message_ids.extend(result.get('message_ids', []))
+
 
         for entity in entities or []:
             entity_type = entity.get('type')
@@ -343,32 +545,18 @@ async def prepare_and_send_preview(
 
     media_files = []
     if post_images:
-        # Скачиваем файлы
+        # Скачиваем недостающие файлы, порядок — как в post_images
         files_to_download = [
             f for f in post_images if not cached_files or f not in cached_files
         ]
-        for file_id in files_to_download:
-            try:
-                cf = await CardFile.get_by_id(_UUID(str(file_id)))
-                if not cf:
-                    logger.error(f"File record not found: {file_id}")
-                    continue
-
-                file_data, status = await _storage_download_file(cf.filename)
-                if status == 200 and isinstance(file_data, (bytes, bytearray)):
-                    file_name = cf.original_filename or cf.filename
-                    media_type = detect_media_type(file_data, file_name)
-                    media_files.append({'data': file_data, 'name': file_name, 'type': media_type,
-                                        'hide': cf.hide})
-                else:
-                    logger.error(f"Failed to download file {file_id}: status={status}")
-            except Exception as e:
-                logger.error(f"Error downloading file {file_id}: {e}", exc_info=True)
-
-        # Собираем все файлы в media_files (cached)
+        downloaded = {
+            fi['id']: fi for fi in await download_files(files_to_download)
+        }
         for f in post_images:
             if cached_files and f in cached_files:
                 media_files.append(cached_files[f])
+            elif str(f) in downloaded:
+                media_files.append(downloaded[str(f)])
 
     entities = None
     if card_id and client_key:
@@ -398,7 +586,13 @@ async def _send_post_tg(
     entities: list,
     settings: dict,
 ) -> dict:
-    """Отправка поста через TelegramExecutor."""
+    """Отправка поста через TelegramExecutor.
+
+    ``sent_message_ids`` результата разбит на ``send_main`` (сам пост),
+    ``send_other`` (сообщение с кнопками) и ``send_entity`` (опросы).
+    Если пост отправлен, а дополнительные сообщения — нет, результат
+    неуспешный, но содержит ID уже доставленных сообщений.
+    """
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
     # Строим reply_markup из entities типа inline_keyboard
@@ -420,6 +614,9 @@ async def _send_post_tg(
 
     chat_id = str(client_id)
     message_ids: list[int] = []
+    other_ids: list[int] = []
+    entity_ids: list[int] = []
+    errors: list[str] = []
     result: dict = {}
 
     if not files:
@@ -430,49 +627,75 @@ async def _send_post_tg(
             message_ids = [result['message_id']]
 
     elif len(files) == 1:
-        f = files[0]
-        if f.get('type') == 'video':
-            result = await executor.send_video(
-                chat_id=chat_id, video=f['data'], caption=text, parse_mode='HTML',
-                has_spoiler=f.get('hide', False), reply_markup=reply_markup
-            )
-        else:
-            result = await executor.send_photo(
-                chat_id=chat_id, photo=f['data'], caption=text, parse_mode='HTML',
-                has_spoiler=f.get('hide', False), reply_markup=reply_markup
+        async def send_single(files: list) -> dict:
+            f = files[0]
+            if f.get('type') == 'video':
+                return await executor.send_video(
+                    chat_id=chat_id, video=tg_media_source(f), caption=text,
+                    parse_mode='HTML', has_spoiler=f.get('hide', False), reply_markup=reply_markup
+                )
+            return await executor.send_photo(
+                chat_id=chat_id, photo=tg_media_source(f), caption=text,
+                parse_mode='HTML', has_spoiler=f.get('hide', False), reply_markup=reply_markup
             )
+
+        result = await send_with_tg_file_cache(send_single, files)
         if result.get('success'):
             message_ids = [result['message_id']]
 
     else:
-        result = await executor.send_media_group(
-            chat_id=chat_id, media=files, caption=text, parse_mode='HTML'
+        result = await send_with_tg_file_cache(
+            lambda files: executor.send_media_group(
+                chat_id=chat_id, media=files, caption=text, parse_mode='HTML'
+            ),
+            files
         )
         if result.get('success'):
             message_ids = result.get('message_ids', [result.get('message_id')])
             if reply_markup:
-                km = await executor.send_message(
-                    chat_id=chat_id, text='🔗', reply_markup=reply_markup
-                )
+                try:
+                    km = await executor.send_message(
+                        chat_id=chat_id, text='🔗', reply_markup=reply_markup
+                    )
+                except Exception as e:
+                    km = {'success': False, 'error': str(e)}
                 if km.get('success'):
-                    message_ids.append(km['message_id'])
+                    other_ids.append(km['message_id'])
+                else:
+                    errors.append(f"кнопки: {km.get('error')}")
 
     if not result.get('success'):
         return result
 
-    # Опросы и прочие entities
+    # Опросы и прочие entities: пост уже отправлен, ошибки только собираем
     for entity in entities:
         if entity.get('type') == 'poll':
             from modules.entities_sender import send_poll_preview
-            poll_result = await send_poll_preview(
-                bot=executor.bot,
-                chat_id=int(client_id),
-                entity_data=entity.get('data', {})
-            )
+            try:
+                poll_result = await send_poll_preview(
+                    bot=executor.bot,
+                    chat_id=int(client_id),
+                    entity_data=entity.get('data', {})
+                )
+            except Exception as e:
+                poll_result = {'success': False, 'error': str(e)}
             if poll_result.get('success') and poll_result.get('message_id'):
-                message_ids.append(poll_result['message_id'])
-
-    return {'success': True, 'message_ids': message_ids}
+                entity_ids.append(poll_result['message_id'])
+            else:
+                errors.append(f"опрос: {poll_result.get('error')}")
+
+    response = {
+        'success': not errors,
+        'message_ids': message_ids + other_ids + entity_ids,
+        'sent_message_ids': {
+            'send_main': message_ids,
+            'send_other': other_ids,
+            'send_entity': entity_ids,
+        },
+    }
+    if errors:
+        response['error'] = '; '.join(errors)
+    return response
 
 
 async def _send_post_vk(
@@ -481,39 +704,39 @@ async def _send_post_vk(
     files: list,
     settings: dict,
 ) -> dict:
-    """Отправка поста через VKExecutor."""
-    import tempfile
-    import os
+    """Отправка поста через VKExecutor.
 
+    ID созданного поста возвращается в ``sent_message_ids['send_main']``.
+    Если пост создан без части файлов, результат неуспешный, но с этим ID.
+    """
     attachments: list[str] = []
-    for f in files:
-        file_data = f.get('data')
-        file_name = f.get('name', 'file')
-        file_type = f.get('type', 'photo')
-        if not isinstance(file_data, (bytes, bytearray)):
-            continue
-        suffix = os.path.splitext(file_name)[1] or ('.mp4' if file_type == 'video' else '.jpg')
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-            tmp.write(file_data)
-            tmp_path = tmp.name
-        try:
-            if file_type == 'video':
-                upload_result = await executor.upload_video_to_wall(tmp_path)
-            else:
-                upload_result = await executor.upload_photo_to_wall(tmp_path)
-            if upload_result.get('success'):
-                attachments.append(upload_result['attachment'])
-            else:
-                logger.warning(f"VK file upload failed: {upload_result.get('error')}")
-        finally:
-            os.unlink(tmp_path)
+    errors: list[str] = []
+    # Загрузка параллельная, порядок результатов совпадает с порядком файлов
+    for upload_result in await executor.upload_wall_media(files):
+        if upload_result.get('success'):
+            attachments.append(upload_result['attachment'])
+        else:
+            logger.warning(f"VK file upload failed: {upload_result.get('error')}")
+            errors.append(f"файл: {upload_result.get('error')}")
 
     primary_attachments_mode = settings.get('primary_attachments_mode', 'grid')
-    return await executor.create_wall_post(
+    result = await executor.create_wall_post(
         text=text,
         attachments=attachments or None,
         primary_attachments_mode=primary_attachments_mode
     )
+    if not result.get('success'):
+        return result
+
+    response = {
+        'success': not errors,
+        'post_id': result['post_id'],
+        'message_ids': [result['post_id']],
+        'sent_message_ids': {'send_main': [result['post_id']]},
+    }
+    if errors:
+        response['error'] = '; '.join(errors)
+    return response
 
 
 async def send_post(
@@ -524,12 +747,14 @@ async def send_post(
     post_images: Optional[list[str]] = None,
     settings: Optional[dict] = None,
     entities: Optional[list] = None,
+    file_records: Optional[list[CardFile]] = None,
 ) -> dict:
     """Универсальная обёртка для немедленной отправки поста через исполнителя.
 
     Если ``content`` или ``tags`` не переданы, функция самостоятельно подгрузит
-    карточку из базы. Текст генерируется через :func:`modules.post_generator.generate_post`,
-    файлы скачиваются через :func:`download_files`.
+    карточку из базы (:meth:`Card.load_aggregate`). Текст генерируется через
+    :func:`modules.post_generator.generate_post`, файлы скачиваются через
+    :func:`download_files`; ``file_records`` — уже загруженные записи файлов.
     Отправка производится напрямую через методы нужного executor-а.
     """
     from modules.exec.executors_manager import manager
@@ -538,11 +763,12 @@ async def send_post(
 
     if content is None or tags is None:
         from models.Card import Card
-        cards = await Card.find(card_id=card_id)
-        if cards:
-            card = cards[0].to_full_dict()
-        else:
+        card_obj = await Card.load_aggregate(card_id)
+        if not card_obj:
             return {"success": False, "error": "Card not found"}
+        card = card_obj.to_full_dict()
+        if file_records is None:
+            file_records = list(card_obj.files or [])
     else:
         card = None
 
@@ -551,7 +777,7 @@ async def send_post(
     else:
         text = await generate_post(content or '', tags or [], client_key)
 
-    files = await download_files(post_images or [])
+    files = await download_files(post_images or [], records=file_records)
 
     client_config = CLIENTS.get(client_key)
     if not client_config:
@@ -4,45 +4,148 @@
 В монолите заменяет HTTP-вызовы к storage-api прямыми файловыми операциями.
 Путь к хранилищу настраивается через переменную окружения STORAGE_PATH.
 """
+import os
+import re
 import uuid
 import asyncio
+import hashlib
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Optional
 
 from modules.logs import logger
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
 
 STORAGE_PATH = Path('/storage_data')
 STORAGE_PATH.mkdir(parents=True, exist_ok=True)
 
+# Размер блока при потоковой записи и чтении
+CHUNK_SIZE = 1024 * 1024
+
+
+# Хранилище адресуется содержимым: ключ файла — SHA-256 его байтов,
+# лежит в STORAGE_PATH/<ab>/<cd>/<ключ>. Одинаковые файлы хранятся один раз,
+# на блоб может ссылаться несколько записей CardFile (filename == ключ).
+# Файлы со старыми uuid-именами лежат в корне и продолжают читаться.
+TMP_DIR = STORAGE_PATH / ".tmp"
+TMP_DIR.mkdir(parents=True, exist_ok=True)
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_content_key(filename: str) -> bool:
+    """Имя файла — ключ по содержимому (а не старое uuid-имя)."""
+    return bool(_KEY_RE.match(filename or ""))
+
+
+def content_key(data: bytes) -> str:
+    """Ключ блоба для данных."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def blob_path(filename: str) -> Path:
+    """Путь к файлу в хранилище: шардированный для ключей, плоский для старых имён."""
+    if is_content_key(filename):
+        return STORAGE_PATH / filename[:2] / filename[2:4] / filename
+    return STORAGE_PATH / filename
+
+
+@asynccontextmanager
+async def blob_lock(filename: str) -> AsyncIterator["AsyncSession"]:
+    """
+    Блокировка блоба — держится на время записи блоба и изменения ссылок на него.
+
+    Берётся в БД (``pg_advisory_xact_lock``), поэтому действует для всех
+    реплик. Отдаёт сессию, в транзакции которой взята блокировка: ссылки
+    (записи CardFile) создаются и считаются в ней и коммитятся вместе со
+    снятием блокировки.
+    """
+    from sqlalchemy import func, select
+    from database.connection import session_factory
+
+    async with session_factory() as session:
+        async with session.begin():
+            await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(filename))))
+            yield session
+
+
+async def _store_blob(
+    key: str,
+    write: Callable[[Path], None],
+    on_stored: Optional[Callable[[str, "AsyncSession"], Awaitable[Any]]] = None,
+) -> tuple[bool, Any]:
+    """
+    Положить блоб под ключом ``key``, если его ещё нет.
+    ``write(path)`` записывает данные во временный файл.
+    ``on_stored(key, session)`` вызывается под той же блокировкой и в её
+    транзакции — там создаётся ссылка (запись CardFile), чтобы блоб не
+    освободили между записью и ссылкой.
+
+    Returns:
+        (был ли блоб уже в хранилище, результат on_stored)
+    """
+    loop = asyncio.get_event_loop()
+    path = blob_path(key)
+
+    async with blob_lock(key) as session:
+        existed = path.exists()
+        if not existed:
+            await loop.run_in_executor(None, write, path)
+        record = await on_stored(key, session) if on_stored else None
+    return existed, record
+
+
+def _move_into_place(tmp_path: Path, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, path)
+
 
 async def upload_file(
     file_data: bytes,
     filename: str,
-    content_type: Optional[str] = None
+    content_type: Optional[str] = None,
+    on_stored: Optional[Callable[[str, "AsyncSession"], Awaitable[Any]]] = None,
 ) -> dict:
     """
     Сохранить файл в хранилище.
     Заменяет: storage_api.post("/upload", multipart)
 
+    Если такой файл уже есть, повторно он не пишется (``deduplicated``).
+    ``on_stored(key, session)`` — см. :func:`_store_blob`, результат в ``record``.
+
     Returns:
-        {"status": "success", "filename": unique_name, "original_filename": filename, "size": int}
+        {"status": "success", "filename": key, "original_filename": filename, "size": int,
+         "deduplicated": bool, "record": Any}
         или {"status": "error", "error": str}
     """
     try:
-        file_extension = Path(filename).suffix if filename else ""
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = STORAGE_PATH / unique_filename
-
         loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, _write_file, file_path, file_data)
+        key = await loop.run_in_executor(None, content_key, file_data)
+
+        def write(path: Path) -> None:
+            tmp_path = TMP_DIR / f"{uuid.uuid4()}.part"
+            try:
+                _write_file(tmp_path, file_data)
+                _move_into_place(tmp_path, path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
 
-        logger.info(f"File saved: {unique_filename} (original: {filename}, size: {len(file_data)} bytes)")
+        existed, record = await _store_blob(key, write, on_stored)
+
+        logger.info(
+            f"File {'deduplicated' if existed else 'saved'}: {key} "
+            f"(original: {filename}, size: {len(file_data)} bytes)"
+        )
         return {
             "status": "success",
-            "filename": unique_filename,
+            "filename": key,
             "original_filename": filename,
             "size": len(file_data),
+            "deduplicated": existed,
+            "record": record,
         }
     except Exception as e:
         logger.error(f"Ошибка сохранения файла {filename}: {e}")
@@ -54,6 +157,118 @@ def _write_file(path: Path, data: bytes) -> None:
         f.write(data)
 
 
+async def upload_stream(
+    chunks: AsyncIterable[bytes],
+    filename: str,
+    content_type: Optional[str] = None,
+    on_stored: Optional[Callable[[str, "AsyncSession"], Awaitable[Any]]] = None,
+) -> dict:
+    """
+    Сохранить файл в хранилище по частям, не держа его целиком в памяти.
+    Данные пишутся во временный файл с подсчётом SHA-256, затем файл
+    переносится под ключ (или удаляется, если такой блоб уже есть).
+
+    Returns:
+        Как у :func:`upload_file`.
+    """
+    tmp_path = TMP_DIR / f"{uuid.uuid4()}.part"
+
+    loop = asyncio.get_event_loop()
+    digest = hashlib.sha256()
+    size = 0
+    f = None
+    try:
+        f = await loop.run_in_executor(None, open, tmp_path, "wb")
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            await loop.run_in_executor(None, f.write, chunk)
+            digest.update(chunk)
+            size += len(chunk)
+        await loop.run_in_executor(None, f.close)
+        if not size:
+            raise ValueError("пустой файл")
+
+        key = digest.hexdigest()
+        existed, record = await _store_blob(
+            key, lambda path: _move_into_place(tmp_path, path), on_stored)
+
+        logger.info(
+            f"File {'deduplicated' if existed else 'saved'}: {key} "
+            f"(original: {filename}, size: {size} bytes)"
+        )
+        return {
+            "status": "success",
+            "filename": key,
+            "original_filename": filename,
+            "size": size,
+            "deduplicated": existed,
+            "record": record,
+        }
+    except Exception as e:
+        logger.error(f"Ошибка сохранения файла {filename}: {e}")
+        return {"status": "error", "error": str(e)}
+    finally:
+        if f is not None and not f.closed:
+            f.close()
+        tmp_path.unlink(missing_ok=True)
+
+
+def _resolve(filename: str) -> tuple[Path | None, int]:
+    """Путь к файлу хранилища с проверкой выхода за STORAGE_PATH."""
+    file_path = blob_path(filename).resolve()
+    if not str(file_path).startswith(str(STORAGE_PATH.resolve())):
+        logger.error(f"Path traversal attempt: {filename}")
+        return None, 403
+    if not file_path.exists():
+        logger.warning(f"File not found: {filename}")
+        return None, 404
+    return file_path, 200
+
+
+def get_file_path(filename: str) -> tuple[Path | None, int]:
+    """
+    Путь к файлу в хранилище — для отправки без чтения в память
+    (``FSInputFile``, потоковый multipart).
+
+    Returns:
+        (Path, 200) или (None, 403/404)
+    """
+    return _resolve(filename)
+
+
+async def read_header(filename: str, size: int = 64) -> bytes:
+    """Первые ``size`` байт файла — для определения типа по magic bytes."""
+    file_path, status = _resolve(filename)
+    if status != 200:
+        return b""
+
+    def _read() -> bytes:
+        with open(file_path, "rb") as f:
+            return f.read(size)
+
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, _read)
+
+
+async def iter_file(filename: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Читать файл из хранилища блоками по ``chunk_size`` байт."""
+    file_path, status = _resolve(filename)
+    if status != 200:
+        return
+
+    loop = asyncio.get_event_loop()
+    f = await loop.run_in_executor(None, open, file_path, "rb")
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, f.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+
 async def download_file(filename: str) -> tuple[bytes | None, int]:
     """
     Скачать файл из хранилища по имени.
@@ -63,16 +278,10 @@ async def download_file(filename: str) -> tuple[bytes | None, int]:
         (bytes, 200) или (None, 404/500)
     """
     try:
-        file_path = STORAGE_PATH / filename
-        if not file_path.exists():
-            logger.warning(f"File not found: {filename}")
-            return None, 404
-
-        # Security: ensure we stay within STORAGE_PATH
-        file_path = file_path.resolve()
-        if not str(file_path).startswith(str(STORAGE_PATH.resolve())):
-            logger.error(f"Path traversal attempt: {filename}")
-            return None, 403
+        # Security: _resolve проверяет выход за STORAGE_PATH
+        file_path, status = _resolve(filename)
+        if status != 200:
+            return None, status
 
         loop = asyncio.get_event_loop()
         data = await loop.run_in_executor(None, file_path.read_bytes)
@@ -84,11 +293,14 @@ async def download_file(filename: str) -> tuple[bytes | None, int]:
 
 async def delete_file(filename: str) -> bool:
     """
-    Удалить файл из хранилища.
+    Удалить файл из хранилища без проверки ссылок.
     Заменяет: storage_api.delete(f'/delete/{filename}')
+
+    Для файлов, на которые ссылаются записи CardFile, используйте
+    :func:`release_file`.
     """
     try:
-        file_path = (STORAGE_PATH / filename).resolve()
+        file_path = blob_path(filename).resolve()
         if not str(file_path).startswith(str(STORAGE_PATH.resolve())):
             logger.error(f"Path traversal attempt on delete: {filename}")
             return False
@@ -104,9 +316,27 @@ async def delete_file(filename: str) -> bool:
         return False
 
 
+async def release_file(
+    filename: str,
+    count_refs: Callable[..., Awaitable[int]],
+) -> bool:
+    """
+    Освободить блоб после удаления ссылки на него.
+    Файл удаляется, только если ``count_refs(filename, session=session)``
+    (в транзакции блокировки) вернул 0.
+
+    Returns:
+        True, если файл удалён.
+    """
+    async with blob_lock(filename) as session:
+        if await count_refs(filename, session=session) > 0:
+            return False
+        return await delete_file(filename)
+
+
 def file_exists(filename: str) -> bool:
     """Проверить наличие файла в хранилище."""
-    return (STORAGE_PATH / filename).exists()
+    return blob_path(filename).exists()
 
 
 def get_storage_path() -> Path:
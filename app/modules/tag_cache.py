@@ -0,0 +1,163 @@
+"""
+Кэш справочника тегов.
+
+Теги читаются почти в каждом тексте (сортировка, хештеги поста, описание
+задачи), а меняются редко и только через ``Tag.create`` / ``update`` /
+``delete``. Поэтому весь справочник держится в памяти в виде
+неизменяемого снимка :class:`TagsSnapshot` с уже посчитанными порядком
+ключей и хештегами::
+
+    snapshot = await tag_cache.get()
+    keys = snapshot.sort(card_tags)
+    lines = [snapshot.hashtag(k) for k in keys]
+
+Инвалидация — по версии: запись в модели ``Tag`` вызывает
+:meth:`TagCache.invalidate`, версия растёт, и следующий ``get()``
+перечитывает таблицу. Снимок, загрузка которого началась до
+инвалидации, считается устаревшим сразу. Правки мимо модели (SQL
+вручную) подхватываются через ``max_age``.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from modules.logs import logger
+
+
+def _hashtag(tag: str) -> str:
+    return tag if tag.startswith("#") else f"#{tag}"
+
+
+@dataclass(frozen=True)
+class TagsSnapshot:
+    """ Неизменяемый снимок таблицы tags.
+
+        - ``records`` — ``{key: {"key", "name", "tag", "order", "forward_to_topic"}}``
+          в порядке ``order``;
+        - ``ordered_keys`` — ключи в порядке ``order``;
+        - ``hashtags`` — ``{key: "#tag"}``;
+        - ``names`` — ``{key: name}``.
+    """
+    version: int
+    loaded_at: float
+    records: dict[str, dict] = field(default_factory=dict)
+    ordered_keys: tuple[str, ...] = ()
+    hashtags: dict[str, str] = field(default_factory=dict)
+    names: dict[str, str] = field(default_factory=dict)
+    orders: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, version: int, tags: Iterable) -> "TagsSnapshot":
+        records = {
+            t.key: {
+                "key": t.key,
+                "name": t.name,
+                "tag": t.tag,
+                "order": t.order,
+                "forward_to_topic": t.forward_to_topic,
+            }
+            for t in sorted(tags, key=lambda t: t.order)
+        }
+        return cls(
+            version=version,
+            loaded_at=time.monotonic(),
+            records=records,
+            ordered_keys=tuple(records),
+            hashtags={k: _hashtag(r["tag"]) for k, r in records.items()},
+            names={k: r["name"] for k, r in records.items()},
+            orders={k: r["order"] for k, r in records.items()},
+        )
+
+    def sort(self, keys: Iterable[str]) -> list[str]:
+        """ Ключи по ``order``; неизвестные ключи — с порядком 0, как раньше.
+        """
+        return sorted(keys, key=lambda k: self.orders.get(k, 0))
+
+    def hashtag(self, key: str) -> str:
+        """ ``#tag`` для ключа; для неизвестного ключа — ``#key``.
+        """
+        return self.hashtags.get(key) or _hashtag(key)
+
+    def name(self, key: str) -> str:
+        return self.names.get(key, key)
+
+
+class TagCache:
+    """ Кэш справочника тегов с версионной инвалидацией.
+
+        - ``max_age`` — через сколько секунд снимок перечитывается
+          даже без инвалидации (правки в обход модели).
+
+        Одновременные промахи загружают таблицу один раз.
+        Счётчики ``hits`` / ``misses`` / ``invalidations`` — в :meth:`stats`.
+    """
+
+    def __init__(self, max_age: float = 600):
+        self.max_age = max_age
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._snapshot: Optional[TagsSnapshot] = None
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self, snapshot: Optional[TagsSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self.version
+            and time.monotonic() - snapshot.loaded_at < self.max_age
+        )
+
+    async def get(self) -> TagsSnapshot:
+        """ Актуальный снимок. При ошибке БД — последний удачный снимок
+            (или пустой, если загрузок ещё не было).
+        """
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            self.hits += 1
+            return snapshot  # type: ignore[return-value]
+
+        async with self._lock:
+            # Пока ждали блокировку, снимок мог загрузить другой вызов
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                self.hits += 1
+                return snapshot  # type: ignore[return-value]
+
+            self.misses += 1
+            version = self.version
+            from models.Tag import Tag
+            try:
+                tags = await Tag.get_all()
+            except Exception as e:
+                logger.error(f"TagCache: не удалось загрузить теги: {e}")
+                return snapshot or TagsSnapshot(version=-1, loaded_at=0.0)
+
+            # Если во время загрузки была инвалидация, снимок сохранится
+            # со старой версией и будет перечитан при следующем get()
+            self._snapshot = TagsSnapshot.build(version, tags)
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        """ Сбросить кэш после изменения тегов.
+
+            Вызывается моделью ``Tag`` после записи. Если запись шла во
+            внешней сессии, вызывать после её commit.
+        """
+        self.version += 1
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "tags": len(snapshot.records) if snapshot else 0,
+            "fresh": self._is_fresh(snapshot),
+        }
+
+
+tag_cache = TagCache()
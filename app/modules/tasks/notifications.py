@@ -1,22 +1,38 @@
 from models.Card import Card, CardStatus
 from models.User import User
 from modules.enums import UserRole
-from modules.exec.executors_client import notify_user, forward_first_by_tags, send_leaderboard
+from modules.exec.executors_client import notify_user, notify_users, forward_first_by_tags, send_leaderboard
 from datetime import datetime
+from typing import Optional
+from uuid import UUID
 import html
 from modules.json_utils import open_settings, open_clients
 from modules.logs import logger
 
 
-async def send_card_deadline_reminder(card: Card, **kwargs):
+async def _get_card(card_id) -> Optional[Card]:
+    """Карточка по ``card_id`` из аргументов задачи планировщика."""
+    try:
+        card = await Card.get_by_id(UUID(str(card_id)))
+    except ValueError:
+        card = None
+    if not card:
+        logger.warning(f"Карточка {card_id} не найдена")
+    return card
+
+
+async def send_card_deadline_reminder(card_id: str, **kwargs):
     """
     Отправить напоминание о дедлайне карточки исполнителю (за 2 дня до дедлайна).
     Напоминание отправляется только если статус карточки не ready.
     
     Args:
-        card: Карточка, по которой нужно отправить напоминание
+        card_id: ID карточки, по которой нужно отправить напоминание
         **kwargs: Дополнительные параметры
     """
+    card = await _get_card(card_id)
+    if not card:
+        return
     logger.info(f"Проверка напоминания о дедлайне для карточки {card.card_id}")
     
     # Проверяем статус карточки
@@ -53,12 +69,16 @@ async def send_card_deadline_reminder(card: Card, **kwargs):
         
     except Exception as e:
         logger.error(f"Ошибка отправки напоминания для карточки {card.card_id}: {e}", exc_info=True)
+        raise
 
 
-async def send_forum_deadline_passed(card: Card, **kwargs):
+async def send_forum_deadline_passed(card_id: str, **kwargs):
     """
     Отправить сообщение на форум о том, что дедлайн прошел.
     """
+    card = await _get_card(card_id)
+    if not card:
+        return
     logger.info(f"Отправка сообщения о просроченном дедлайне для карточки {card.card_id}")
     
     # Если задача уже выполнена или отправлена, не отправляем
@@ -84,12 +104,19 @@ async def send_forum_deadline_passed(card: Card, **kwargs):
         
     except Exception as e:
         logger.error(f"Ошибка отправки сообщения на форум для карточки {card.card_id}: {e}", exc_info=True)
+        raise
 
 
-async def send_forum_no_executor_alert(card: Card, **kwargs):
+async def send_forum_no_executor_alert(card_id: str, **kwargs):
     """
     Отправить сообщение на форум за 1 день до дедлайна, если нет исполнителя.
     """
+    card = await _get_card(card_id)
+    if card:
+        await _forum_no_executor_alert(card)
+
+
+async def _forum_no_executor_alert(card: Card):
     logger.info(f"Проверка наличия исполнителя для карточки {card.card_id} (форум)")
     
     # Проверяем наличие исполнителя через task
@@ -121,17 +148,21 @@ async def send_forum_no_executor_alert(card: Card, **kwargs):
         
     except Exception as e:
         logger.error(f"Ошибка отправки уведомления на форум для карточки {card.card_id}: {e}", exc_info=True)
+        raise
 
 
-async def send_admin_no_executor_alert(card: Card, **kwargs):
+async def send_admin_no_executor_alert(card_id: str, **kwargs):
     """
     Отправить уведомление всем админам о том, что у карточки нет исполнителя (за 1 день до дедлайна).
     Уведомление отправляется только если время до дедлайна больше 1 дня и нет исполнителя.
     
     Args:
-        card: Карточка, по которой нужно отправить уведомление
+        card_id: ID карточки, по которой нужно отправить уведомление
         **kwargs: Дополнительные параметры
     """
+    card = await _get_card(card_id)
+    if not card:
+        return
     logger.info(f"Проверка наличия исполнителя для карточки {card.card_id}")
     
     # Проверяем наличие исполнителя и дедлайна через task
@@ -160,20 +191,22 @@ async def send_admin_no_executor_alert(card: Card, **kwargs):
         # Формируем сообщение
         message_text = f"⚠️ Внимание! Карточка без исполнителя\n\n📝 Задача: {card.name}\n⏰ Дедлайн: {deadline_str}\n\n❗ До дедлайна остался 1 день, но исполнитель не назначен!"
         
-        # Отправляем уведомление каждому админу
-        for admin in admins:
-            try:
-                await notify_user(admin.telegram_id, message_text, card_id=str(card.card_id))
-            except Exception as e:
-                logger.error(f"Ошибка отправки уведомления админу {admin.telegram_id}: {e}")
+        # Отправляем уведомление всем админам разом
+        await notify_users(
+            [admin.telegram_id for admin in admins], message_text, card_id=str(card.card_id))
         
         # Также отправляем на форум
-        await send_forum_no_executor_alert(card, **kwargs)
+        await _forum_no_executor_alert(card)
         
         logger.info(f"Уведомления о карточке {card.card_id} отправлены всем админам")
         
     except Exception as e:
         logger.error(f"Ошибка отправки уведомлений админам для карточки {card.card_id}: {e}", exc_info=True)
+        raise
+
+
+class PostSendError(Exception):
+    """Исполнитель не смог отправить пост; планировщик повторит задачу."""
 
 
 async def send_post_now(card_id: str, client_key: str, **kwargs):
@@ -183,118 +216,117 @@ async def send_post_now(card_id: str, client_key: str, **kwargs):
     нативную отложенную отправку.
     
     Вся генерация контента и работа с исполнителями происходит на стороне executors API.
+    Ошибки отправки пробрасываются (:class:`PostSendError`), чтобы планировщик
+    повторил задачу с задержкой; когда попытки исчерпаны, админов уведомляет
+    :func:`send_post_now_failed`.
+
+    Повтор безопасен: отправленный пост сохраняется как CardMessage ``send_main``
+    клиента, и при его наличии отправка пропускается. Если пост доставлен
+    частично (например, не отправился опрос), доставленное сохраняется,
+    админы получают уведомление, а задача не повторяется.
     
     Args:
         card_id: ID карточки с контентом
         client_key: Ключ клиента из clients.json
         **kwargs: Дополнительные параметры
+
+    Raises:
+        PostSendError: Исполнитель вернул ошибку отправки
     """
     logger.info(f"Немедленная отправка поста для карточки {card_id}, клиент: {client_key}")
     
+    # Карточка со всеми связями — один запрос к БД
+    card = await Card.load_aggregate(card_id)
+    if not card:
+        logger.warning(f"Карточка {card_id} не найдена при отправке поста")
+        return
+
+    from models.CardMessage import CardMessage
+
+    if await CardMessage.filter_by(card_id=card.card_id, message_type='send_main', data_info=client_key):
+        logger.info(f"Пост карточки {card.card_id} для {client_key} уже отправлен, повтор пропущен")
+        return
+    view = card.publish_view(client_key)
+
+    # делегируем всю работу helper-методу
+    from modules.post_sender import send_post
+
+    response = await send_post(
+        card_id=str(card.card_id),
+        client_key=client_key,
+        content=view['content'],
+        tags=view['tags'],
+        post_images=view['post_images'],
+        settings=view['settings'],
+        entities=view['entities'],
+        file_records=view['files'],
+    )
+
+    logs = response.get('logs', [])
+    # Сохраняем логи в задаче финализации для последующего анализа
     try:
-        # Загружаем связанные данные через явную сессию, чтобы избежать lazy-loading вне greenlet
-        from database.connection import session_factory
-        content = 'nothing'
-        clients_settings = {}
-        entities_for_client = []
-
-        async with session_factory() as s:
-            # Contents: выбираем последний (по created_at) для каждого client_key
-            card = await Card.get_by_key('card_id', card_id, session=s)
-            if not card:
-                logger.warning(f"Карточка {card_id} не найдена при отправке поста")
-                return
-            contents = await card.get_content(session=s)
-            content_map: dict[str, tuple[str, object]] = {}
-            for c in contents:
-                key = c.client_key or 'all'
-                created = getattr(c, 'created_at', None)
-                prev = content_map.get(key)
-                if not prev or (created and prev[1] and created > prev[1]):
-                    content_map[key] = (c.text, created)
-            content_dict = {k: v[0] for k, v in content_map.items()}
-            content = content_dict.get(client_key) or content_dict.get('all') or 'nothing'
-
-            # Clients settings
-            settings_entries = await card.get_clients_settings(session=s)
-            clients_settings = {}
-            for s_entry in settings_entries:
-                key = s_entry.client_key or 'all'
-                clients_settings.setdefault(key, {}).update(s_entry.data or {})
-            # merge global and specific
-            merged_settings = clients_settings.get('all', {}).copy()
-            merged_settings.update(clients_settings.get(client_key, {}))
-            clients_settings = merged_settings
-
-            # Entities
-            entities_entries = await card.get_entities(session=s)
-            entities_for_client = []
-            for ent in entities_entries:
-                if ent.client_key == client_key or ent.client_key is None:
-                    entities_for_client.append(ent.to_dict())
-
-        # делегируем всю работу helper-методу
-        from modules.post_sender import send_post
-
-        response = await send_post(
-            card_id=str(card.card_id),
-            client_key=client_key,
-            content=content,
-            tags=card.tags,
-            post_images=card.post_images or [],
-            settings=clients_settings,
-            entities=entities_for_client,
-        )
-        
-        if response.get('success'):
-            logger.info(f"Пост для карточки {card.card_id} отправлен, клиент: {client_key}")
-
-            # Save sent message ids returned by executor (categorize and persist as CardMessage)
-            try:
-                sent = response.get('sent_message_ids') or {}
-                # expected shape: { 'send_main': [ids], 'send_entity': [ids], 'send_other': [ids] }
-                for tname, mids in (sent.items() if isinstance(sent, dict) else []):
-                    if not mids:
-                        continue
-                    msg_type = None
-                    if tname == 'send_main':
-                        msg_type = 'send_main'
-                    elif tname == 'send_entity':
-                        msg_type = 'send_entity'
-                    elif tname == 'send_other':
-                        msg_type = 'send_other'
-
-                    if msg_type:
-                        for mid in (mids or []):
-                            try:
-                                await card.add_message(message_type=msg_type, message_id=int(mid), data_info=client_key)
-                            except Exception as e:
-                                logger.error(f"Cannot save CardMessage {msg_type} {mid} for card {card.card_id}: {e}")
-            except Exception as e:
-                logger.error(f"Error while saving sent message ids for card {card.card_id}: {e}")
-
-            # Добавляем логи в задачу финализации (если есть)
-            try:
-                logs = response.get('logs', [])
-                await append_logs_to_finalize_task(str(card.card_id), logs)
-            except Exception as e:
-                logger.error(f"Ошибка при добавлении логов в задачу финализации: {e}")
+        await append_logs_to_finalize_task(str(card.card_id), logs)
+    except Exception as e:
+        logger.error(f"Ошибка при добавлении логов в задачу финализации: {e}")
 
-            
-        else:
-            logger.error(f"Ошибка отправки поста: {response}")
-            logs = response.get('logs', [])
-            # Сохраняем логи в задаче финализации для последующего анализа
-            try:
-                await append_logs_to_finalize_task(str(card.card_id), logs)
-            except Exception as e:
-                logger.error(f"Ошибка при добавлении логов в задачу финализации: {e}")
-            await notify_admins_about_post_failure(card, client_key, response.get('error', 'Unknown error'),
-                                                   logs)
+    sent = response.get('sent_message_ids') or {}
+    delivered = isinstance(sent, dict) and any(sent.values())
+    if not response.get('success') and not delivered:
+        logger.error(f"Ошибка отправки поста: {response}")
+        raise PostSendError(response.get('error', 'Unknown error'))
 
+    if response.get('success'):
+        logger.info(f"Пост для карточки {card.card_id} отправлен, клиент: {client_key}")
+    else:
+        # Не повторяем: повтор продублировал бы уже доставленные сообщения
+        logger.error(f"Пост для карточки {card.card_id} отправлен частично: {response}")
+
+    # Save sent message ids returned by executor (categorize and persist as CardMessage)
+    try:
+        # expected shape: { 'send_main': [ids], 'send_entity': [ids], 'send_other': [ids] }
+        for tname, mids in (sent.items() if isinstance(sent, dict) else []):
+            if not mids:
+                continue
+            msg_type = None
+            if tname == 'send_main':
+                msg_type = 'send_main'
+            elif tname == 'send_entity':
+                msg_type = 'send_entity'
+            elif tname == 'send_other':
+                msg_type = 'send_other'
+
+            if msg_type:
+                for mid in (mids or []):
+                    try:
+                        await card.add_message(message_type=msg_type, message_id=int(mid), data_info=client_key)
+                    except Exception as e:
+                        logger.error(f"Cannot save CardMessage {msg_type} {mid} for card {card.card_id}: {e}")
     except Exception as e:
-        logger.error(f"Ошибка при отправке поста для карточки {card.card_id}: {e}", exc_info=True)
-        await notify_admins_about_post_failure(card, client_key, str(e))
+        logger.error(f"Error while saving sent message ids for card {card.card_id}: {e}")
+
+    if not response.get('success'):
+        await notify_admins_about_post_failure(
+            card, client_key, f"Пост отправлен частично: {response.get('error')}", logs)
+
+
+async def send_post_now_failed(card_id: str, client_key: str, error: str, **kwargs):
+    """
+    Уведомить админов, что пост так и не отправлен после всех попыток.
+    Вызывается планировщиком при переносе задачи в ``failed_tasks``.
+
+    Args:
+        card_id: ID карточки
+        client_key: Ключ клиента из clients.json
+        error: Последняя ошибка задачи
+    """
+    card = await Card.load_aggregate(card_id)
+    if not card:
+        logger.warning(f"Карточка {card_id} не найдена, уведомление об ошибке публикации не отправлено")
+        return
+    await notify_admins_about_post_failure(card, client_key, error)
+
+
+send_post_now.on_failed = send_post_now_failed
 
 def normalize_logs(logs: list[dict]) -> str:
     """
@@ -365,11 +397,9 @@ async def notify_admins_about_post_failure(
             f"❗ Требуется ручная публикация!"
         )
 
-        for admin in admins:
-            try:
-                await notify_user(admin.telegram_id, message_text, parse_mode='HTML', card_id=str(card.card_id))
-            except Exception as e:
-                logger.error(f"Ошибка уведомления админа {admin.telegram_id}: {e}")
+        await notify_users(
+            [admin.telegram_id for admin in admins], message_text,
+            parse_mode='HTML', card_id=str(card.card_id))
                 
     except Exception as e:
         logger.error(f"Ошибка уведомления админов об ошибке публикации: {e}", exc_info=True)
@@ -427,23 +457,82 @@ async def append_logs_to_finalize_task(card_id: str, logs: list[dict] | None):
         logger.error(f"Ошибка добавления логов в задачу финализации для карточки {card_id}: {e}", exc_info=True)
 
 
+async def _post_sends_state(card: Card) -> tuple[Optional[datetime], int]:
+    """
+    Состояние задач send_post_now карточки.
+
+    Returns:
+        Время самой поздней ещё не выполненной отправки (None, если таких нет)
+        и число отправок текущей публикации, перемещённых в ``failed_tasks``
+    """
+    from sqlalchemy import select, func
+    from database.connection import session_factory
+    from models.FailedTask import FailedTask
+    from models.ScheduledTask import ScheduledTask
+
+    function_path = "modules.tasks.notifications.send_post_now"
+    failed = select(func.count()).select_from(FailedTask).where(
+        FailedTask.card_id == card.card_id,
+        FailedTask.function_path == function_path,
+    )
+    if card.send_time:
+        # Ошибки прошлых публикаций карточки не учитываем
+        failed = failed.where(FailedTask.execute_at >= card.send_time)
+
+    async with session_factory() as session:
+        pending_at = await session.scalar(
+            select(func.max(ScheduledTask.execute_at)).where(
+                ScheduledTask.card_id == card.card_id,
+                ScheduledTask.function_path == function_path,
+            )
+        )
+        failed_count = await session.scalar(failed)
+    return pending_at, failed_count or 0
+
+
 async def finalize_card_publication(card_id: str, **kwargs):
     """
     Финализировать публикацию карточки после отправки всех постов.
     Меняет статус на sent, удаляет сообщение с форума, увеличивает счётчики задач исполнителя и отправляет отчёт админам.
+
+    Пока у карточки есть невыполненные задачи send_post_now (в том числе
+    ожидающие повтора), финализация переносится на минуту после последней
+    из них. Если отправка ушла в ``failed_tasks``, карточка не помечается
+    отправленной: админов уже уведомил :func:`send_post_now_failed`.
     
     Args:
-        card: Карточка
+        card_id: ID карточки
         **kwargs: Дополнительные параметры
+
+    Raises:
+        TaskDeferred: Отправка постов ещё не завершена
     """
+    from datetime import timedelta
+    from modules.tasks.scheduler import TaskDeferred
+    from modules.timezone import now_naive as moscow_now
+
     logger.info(f"Финализация публикации карточки {card_id}")
-    
+
+    card = await Card.get_by_key('card_id', card_id)
+    if not card:
+        logger.warning(f"Карточка {card_id} не найдена при финализации")
+        return
+
+    pending_at, failed_count = await _post_sends_state(card)
+    if pending_at is not None:
+        raise TaskDeferred(
+            max(pending_at, moscow_now()) + timedelta(minutes=1),
+            f"у карточки {card_id} есть неотправленные посты",
+        )
+    if failed_count:
+        logger.error(
+            f"Финализация карточки {card_id} пропущена: "
+            f"{failed_count} отправок перемещены в failed_tasks"
+        )
+        return
+
     try:
         # Обновляем статус карточки на sent
-        card = await Card.get_by_key('card_id', card_id)
-        if not card:
-            logger.warning(f"Карточка {card_id} не найдена при финализации")
-            return
         await card.update(status=CardStatus.sent)
         logger.info(f"Статус карточки {card.card_id} изменен на sent")
         
@@ -451,8 +540,7 @@ async def finalize_card_publication(card_id: str, **kwargs):
         try:
             from models.ScheduledTask import ScheduledTask
             from database.connection import session_factory
-            from modules.timezone import now_naive as moscow_now
-            from datetime import timedelta
+            from modules.tasks.scheduler import notify_schedule_changed
             from uuid import UUID as PyUUID
             
             delete_at = moscow_now() + timedelta(days=0.5)
@@ -467,6 +555,7 @@ async def finalize_card_publication(card_id: str, **kwargs):
                 )
                 session.add(task)
                 await session.commit()
+                notify_schedule_changed(delete_at)
                 logger.info(f"Создана задача удаления карточки {card.card_id} на {delete_at}")
         except Exception as e:
             logger.error(f"Ошибка создания задачи удаления: {e}")
@@ -535,14 +624,31 @@ async def finalize_card_publication(card_id: str, **kwargs):
                 f"⏰ Время: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n"
             )
             
-            for admin in admins:
-                try:
-                    await notify_user(admin.telegram_id, message_text, parse_mode='HTML', card_id=str(card.card_id))
-                except Exception as e:
-                    logger.error(f"Ошибка уведомления админа {admin.telegram_id}: {e}")
+            await notify_users(
+                [admin.telegram_id for admin in admins], message_text,
+                parse_mode='HTML', card_id=str(card.card_id))
         
     except Exception as e:
-        logger.error(f"Ошибка финализации публикации карточки {card.card_id}: {e}", exc_info=True)
+        logger.error(f"Ошибка финализации публикации карточки {card_id}: {e}", exc_info=True)
+        raise
+
+
+async def delete_sent_card(card_id: str, **kwargs):
+    """
+    Удалить опубликованную карточку (задача создаётся в finalize_card_publication).
+    Карточки, вернувшиеся из статуса sent, не трогаем.
+    """
+    from modules.card.card_service import destroy_card
+
+    card = await _get_card(card_id)
+    if not card:
+        return
+    if card.status != CardStatus.sent:
+        logger.info(f"Карточка {card_id} в статусе {card.status}, удаление пропущено")
+        return
+    if not await destroy_card(str(card.card_id)):
+        raise RuntimeError(f"Не удалось удалить карточку {card_id}")
+    logger.info(f"Опубликованная карточка {card_id} удалена")
 
 
 async def reset_monthly_tasks():
@@ -579,6 +685,7 @@ async def reset_monthly_tasks():
 
     except Exception as e:
         logger.error(f"Ошибка сброса месячного счетчика: {e}", exc_info=True)
+        raise
 
 
 async def reset_yearly_tasks():
@@ -616,3 +723,4 @@ async def reset_yearly_tasks():
 
     except Exception as e:
         logger.error(f"Ошибка сброса годового счетчика: {e}", exc_info=True)
+        raise
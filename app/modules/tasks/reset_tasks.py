@@ -3,6 +3,7 @@ from uuid import uuid4
 from models.ScheduledTask import ScheduledTask
 from modules.timezone import now_naive as moscow_now
 from modules.logs import logger
+from modules.tasks.scheduler import notify_schedule_changed
 
 
 async def get_next_month_start() -> datetime:
@@ -49,6 +50,7 @@ async def check_and_create_monthly_reset_task():
             arguments={},
             execute_at=next_month
         )
+        notify_schedule_changed(next_month)
         
         logger.info(f"Создана задача сброса месячной статистики на {next_month}: {task.task_id}")
         
@@ -81,6 +83,7 @@ async def check_and_create_yearly_reset_task():
             arguments={},
             execute_at=next_year
         )
+        notify_schedule_changed(next_year)
         
         logger.info(f"Создана задача сброса годовой статистики на {next_year}: {task.task_id}")
         
@@ -1,11 +1,16 @@
 import asyncio
+import heapq
 import importlib
+import os
+import socket
+from uuid import UUID, uuid4
 from datetime import datetime, timedelta
-from typing import Callable
-from sqlalchemy import select
+from typing import Callable, Optional
+from sqlalchemy import select, func as sql_func, or_, update as sql_update, delete as sql_delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.ScheduledTask import ScheduledTask
+from models.FailedTask import FailedTask
 from modules.timezone import now_naive as moscow_now
 from modules.logs import logger
 
@@ -15,96 +20,536 @@ if TYPE_CHECKING:
     from models.Card import Card
 
 
+# Запущенный планировщик процесса (нужен для пробуждения при изменении расписания)
+_active_scheduler: Optional['TaskScheduler'] = None
+
+
+def notify_schedule_changed(*execute_at: Optional[datetime]) -> None:
+    """
+    Сообщить планировщику об изменении расписания.
+
+    Вызывается после коммита создания, переноса или удаления задач.
+    Переданное время добавляется в очередь, и планировщик просыпается
+    досрочно, чтобы пересчитать время следующего пробуждения.
+
+    Args:
+        *execute_at: Новые времена выполнения (можно не передавать при удалении)
+    """
+    if _active_scheduler is not None:
+        _active_scheduler.wake(*execute_at)
+
+
+class TaskDeferred(Exception):
+    """
+    Задача просит перенести её выполнение на ``execute_at``.
+
+    Попытка не засчитывается: задача не упала, а ждёт завершения других задач.
+    """
+
+    def __init__(self, execute_at: datetime, reason: str = ""):
+        super().__init__(reason or f"отложена до {execute_at}")
+        self.execute_at = execute_at
+
+
 class TaskScheduler:
     """
     Планировщик для выполнения запланированных задач.
     
-    Работает в фоновом режиме и проверяет задачи каждые N секунд.
+    Держит в памяти min-heap ближайших времён выполнения и спит ровно
+    до следующего из них. При изменении расписания (см.
+    :func:`notify_schedule_changed`) просыпается досрочно. Раз в
+    ``reconcile_interval`` секунд очередь сверяется с БД, чтобы подхватить
+    задачи, созданные в обход уведомлений, и пережить перезапуск.
+
+    Наступившие задачи выполняются параллельно, каждая в своей сессии,
+    с общим лимитом ``max_concurrency`` и отдельными лимитами для
+    исполнителей (``executor_limits``). Задачи одной карточки с более
+    поздним временем ждут завершения более ранних.
+
+    Задачи захватываются через ``SELECT ... FOR UPDATE SKIP LOCKED`` с
+    арендой на ``lease_seconds``, поэтому несколько реплик могут работать
+    с одной таблицей. Строка удаляется только после успешного выполнения;
+    упавшие задачи повторяются с экспоненциальной задержкой и после
+    ``max_attempts`` попыток переносятся в ``failed_tasks`` (с вызовом
+    ``on_failed`` функции задачи, если он задан).
     """
-    
-    def __init__(self, session_factory: Callable, check_interval: int = 10):
+
+    # Лимиты одновременных задач по исполнителям по умолчанию
+    DEFAULT_EXECUTOR_LIMITS = {
+        'telegram_executor': 5,
+        'vk_executor': 2,
+    }
+    
+    def __init__(self, session_factory: Callable,
+                 reconcile_interval: int = 60,
+                 preload_limit: int = 1000,
+                 max_concurrency: int = 10,
+                 executor_limits: Optional[dict[str, int]] = None,
+                 lease_seconds: int = 600,
+                 claim_batch_size: int = 100,
+                 retry_base_delay: int = 30,
+                 retry_max_delay: int = 3600):
         """
         Args:
             session_factory: Фабрика для создания сессий БД
-            check_interval: Интервал проверки задач в секундах (по умолчанию 10)
+            reconcile_interval: Интервал сверки очереди с БД в секундах (по умолчанию 60)
+            preload_limit: Сколько ближайших времён выполнения загружать при сверке
+            max_concurrency: Максимум одновременно выполняемых задач
+            executor_limits: Лимиты одновременных задач по имени исполнителя
+            lease_seconds: Длительность аренды захваченной задачи в секундах
+            claim_batch_size: Сколько задач захватывать за один запрос
+            retry_base_delay: Базовая задержка повтора в секундах
+            retry_max_delay: Максимальная задержка повтора в секундах
         """
         self.session_factory = session_factory
-        self.check_interval = check_interval
+        self.reconcile_interval = reconcile_interval
+        self.preload_limit = preload_limit
+        self.max_concurrency = max_concurrency
+        self.executor_limits = (
+            self.DEFAULT_EXECUTOR_LIMITS if executor_limits is None else executor_limits
+        )
+        self.lease_seconds = lease_seconds
+        self.claim_batch_size = claim_batch_size
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
         self.is_running = False
 
+        # Уникальный идентификатор процесса для аренды задач
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor_semaphores = {
+            name: asyncio.Semaphore(limit)
+            for name, limit in self.executor_limits.items()
+        }
+        # Выполняющиеся задачи: task_id -> (card_id, execute_at, asyncio.Task)
+        self._inflight: dict = {}
+        self._lease_keeper: Optional[asyncio.Task] = None
+
+        self._heap: list[datetime] = []
+        self._wakeup = asyncio.Event()
+        # Времена, добавленные во время сверки (чтобы не потерять их при замене очереди)
+        self._reconcile_pushes: Optional[list[datetime]] = None
+
     async def start(self):
         """Запустить планировщик."""
+        global _active_scheduler
+        _active_scheduler = self
+
         self.is_running = True
-        logger.info("Планировщик задач запущен")
-        
+        self._lease_keeper = asyncio.create_task(self._keep_leases())
+        logger.info(f"Планировщик задач запущен ({self.worker_id})")
+
+        next_reconcile = moscow_now()
         while self.is_running:
+            # Сбрасываем событие до чтения очереди, чтобы не пропустить пробуждение
+            self._wakeup.clear()
+            now = moscow_now()
+
             try:
-                await self._check_and_execute_tasks()
+                if now >= next_reconcile:
+                    next_reconcile = now + timedelta(seconds=self.reconcile_interval)
+                    await self._reconcile()
+
+                if self._heap and self._heap[0] <= now:
+                    while self._heap and self._heap[0] <= now:
+                        heapq.heappop(self._heap)
+                    await self._check_and_execute_tasks()
+                    continue
             except Exception as e:
                 logger.error(f"Ошибка в планировщике: {e}", exc_info=True)
-            
-            await asyncio.sleep(self.check_interval)
+
+            wake_at = next_reconcile
+            if self._heap and self._heap[0] < wake_at:
+                wake_at = self._heap[0]
+            timeout = max((wake_at - moscow_now()).total_seconds(), 0)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        if _active_scheduler is self:
+            _active_scheduler = None
     
-    async def stop(self):
-        """Остановить планировщик."""
+    async def stop(self, drain: bool = True, timeout: Optional[float] = 60):
+        """
+        Остановить планировщик.
+
+        Args:
+            drain: Дождаться завершения уже запущенных задач
+            timeout: Сколько секунд ждать задачи перед их отменой
+        """
         self.is_running = False
+        self._wakeup.set()
+
+        running = [job for _, _, job in self._inflight.values()]
+        if running:
+            if drain:
+                logger.info(f"Ожидание завершения {len(running)} задач планировщика")
+                _, pending = await asyncio.wait(running, timeout=timeout)
+            else:
+                pending = running
+
+            for job in pending:
+                job.cancel()
+            if pending:
+                logger.warning(f"Отменено {len(pending)} незавершённых задач планировщика")
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        if self._lease_keeper is not None:
+            self._lease_keeper.cancel()
+            await asyncio.gather(self._lease_keeper, return_exceptions=True)
+            self._lease_keeper = None
+
         logger.info("Планировщик задач остановлен")
+
+    def wake(self, *execute_at: Optional[datetime]):
+        """
+        Добавить времена выполнения в очередь и разбудить планировщик.
+
+        Args:
+            *execute_at: Времена выполнения новых или перенесённых задач
+        """
+        for moment in execute_at:
+            if moment is None:
+                continue
+            heapq.heappush(self._heap, moment)
+            if self._reconcile_pushes is not None:
+                self._reconcile_pushes.append(moment)
+        self._wakeup.set()
+
+    async def _reconcile(self):
+        """Пересобрать очередь из ближайших задач в БД."""
+        self._reconcile_pushes = []
+        try:
+            async with self.session_factory() as session:
+                # Для захваченных задач ждём окончания аренды
+                due_at = sql_func.greatest(
+                    ScheduledTask.execute_at,
+                    sql_func.coalesce(ScheduledTask.locked_until, ScheduledTask.execute_at)
+                )
+                query = (
+                    select(due_at)
+                    .distinct()
+                    .order_by(due_at)
+                    .limit(self.preload_limit)
+                )
+                result = await session.execute(query)
+                loaded = list(result.scalars().all())
+
+            heap = sorted(set(loaded + self._reconcile_pushes))
+            self._heap = heap  # отсортированный список уже является кучей
+        finally:
+            self._reconcile_pushes = None
     
     async def _check_and_execute_tasks(self):
-        """Проверить и выполнить задачи, время которых наступило."""
+        """Захватить наступившие задачи и запустить их, не дожидаясь завершения."""
+        now = moscow_now()
+
         async with self.session_factory() as session:
-            # Получаем все задачи, время выполнения которых уже наступило
-            query = select(ScheduledTask).where(
-                ScheduledTask.execute_at <= moscow_now()
+            # Захватываем свободные задачи: строки, заблокированные другими
+            # репликами, пропускаются (FOR UPDATE SKIP LOCKED)
+            claimable = (
+                select(ScheduledTask.task_id)
+                .where(
+                    ScheduledTask.execute_at <= now,
+                    or_(
+                        ScheduledTask.locked_until.is_(None),
+                        ScheduledTask.locked_until < now
+                    )
+                )
+                .order_by(ScheduledTask.execute_at)
+                .limit(self.claim_batch_size)
+                .with_for_update(skip_locked=True)
             )
-            result = await session.execute(query)
-            tasks = result.scalars().all()
-            
-            for task in tasks:
-                await self._execute_task(task, session)
+            claim = (
+                sql_update(ScheduledTask)
+                .where(ScheduledTask.task_id.in_(claimable.scalar_subquery()))
+                .values(
+                    locked_by=self.worker_id,
+                    locked_until=now + timedelta(seconds=self.lease_seconds),
+                    attempts=ScheduledTask.attempts + 1
+                )
+                .returning(
+                    ScheduledTask.task_id,
+                    ScheduledTask.card_id,
+                    ScheduledTask.execute_at,
+                    ScheduledTask.arguments,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            result = await session.execute(claim)
+            rows = sorted(result.all(), key=lambda row: row.execute_at)
+            await session.commit()
+
+        if not rows:
+            return
+
+        from modules.json_utils import open_clients
+        clients = open_clients() or {}
+
+        for task_id, card_id, execute_at, arguments in rows:
+            if task_id in self._inflight:
+                continue
+
+            executor_name = self._get_executor_name(arguments or {}, clients)
+
+            # Более ранние задачи той же карточки должны завершиться первыми
+            predecessors = [
+                job for other_card, other_at, job in self._inflight.values()
+                if card_id is not None and other_card == card_id and other_at < execute_at
+            ]
+
+            job = asyncio.create_task(
+                self._run_task(task_id, executor_name, predecessors)
+            )
+            self._inflight[task_id] = (card_id, execute_at, job)
+            job.add_done_callback(
+                lambda _, tid=task_id: self._inflight.pop(tid, None)
+            )
+
+        # Пакет заполнен целиком — возможно, в БД остались ещё наступившие задачи
+        if len(rows) >= self.claim_batch_size:
+            self.wake(now)
+
+    async def _keep_leases(self):
+        """Периодически продлевать аренду выполняющихся задач этого процесса."""
+        interval = max(self.lease_seconds / 3, 1)
+        while self.is_running or self._inflight:
+            await asyncio.sleep(interval)
+            if not self._inflight:
+                continue
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(
+                        sql_update(ScheduledTask)
+                        .where(
+                            ScheduledTask.task_id.in_(list(self._inflight.keys())),
+                            ScheduledTask.locked_by == self.worker_id
+                        )
+                        .values(locked_until=moscow_now() + timedelta(seconds=self.lease_seconds))
+                        .execution_options(synchronize_session=False)
+                    )
+                    await session.commit()
+            except Exception as e:
+                logger.error(f"Не удалось продлить аренду задач: {e}", exc_info=True)
+
+    def _get_executor_name(self, arguments: dict, clients: dict) -> Optional[str]:
+        """Определить исполнителя задачи по ``client_key`` в аргументах."""
+        client_key = arguments.get('client_key')
+        if not client_key:
+            return None
+        client_config = clients.get(client_key) or {}
+        return client_config.get('executor_name') or client_config.get('executor')
+
+    async def _run_task(self, task_id, executor_name: Optional[str],
+                        predecessors: list[asyncio.Task]):
+        """
+        Выполнить одну захваченную задачу с учётом лимитов.
+
+        Args:
+            task_id: ID задачи
+            executor_name: Исполнитель задачи (для отдельного лимита)
+            predecessors: Задачи, которые должны завершиться раньше
+        """
+        if predecessors:
+            await asyncio.gather(*predecessors, return_exceptions=True)
+
+        executor_semaphore = self._executor_semaphores.get(executor_name)
+
+        try:
+            if executor_semaphore is not None:
+                await executor_semaphore.acquire()
+            try:
+                async with self._semaphore:
+                    # Загружаем актуальные аргументы и сразу отпускаем соединение:
+                    # функция может выполняться долго
+                    async with self.session_factory() as session:
+                        task = await session.get(ScheduledTask, task_id)
+
+                    if task is None or task.locked_by != self.worker_id:
+                        # Задачу отменили или её захватила другая реплика
+                        return
+                    if task.execute_at > moscow_now():
+                        # Задачу перенесли на более позднее время
+                        await self._release_task(task)
+                        return
+
+                    await self._execute_task(task)
+            finally:
+                if executor_semaphore is not None:
+                    executor_semaphore.release()
+        except Exception as e:
+            logger.error(f"Ошибка запуска задачи {task_id}: {e}", exc_info=True)
     
-    async def _execute_task(self, 
-                            task: ScheduledTask, session: AsyncSession):
+    async def _execute_task(self, task: ScheduledTask):
         """
         Выполнить задачу.
+
+        Задача удаляется только после успешного выполнения. При ошибке
+        она переносится по экспоненциальной задержке или, если попытки
+        исчерпаны, перемещается в ``failed_tasks``. :class:`TaskDeferred`
+        переносит задачу без засчитывания попытки.
         
         Args:
-            task: Задача для выполнения
-            session: Сессия БД
+            task: Захваченная задача
         """
         try:
-            logger.info(f"Выполнение задачи {task.task_id}: {task.function_path}")
+            logger.info(
+                f"Выполнение задачи {task.task_id}: {task.function_path} "
+                f"(попытка {task.attempts}/{task.max_attempts})"
+            )
             
             # Импортируем функцию по пути
             func = self._import_function(task.function_path)
             
-            # Если указан card_id — убеждаемся, что карточка существует (передаём только card_id)
-            if 'card_id' in task.arguments:
-                exists = await session.get('Card', task.arguments['card_id'])
+            # Если указан card_id — убеждаемся, что карточка существует
+            card_id = task.arguments.get('card_id')
+            if card_id is not None:
+                from models.Card import Card
+
+                try:
+                    card_uuid = UUID(str(card_id))
+                except ValueError:
+                    card_uuid = None
+                exists = None
+                if card_uuid is not None:
+                    async with self.session_factory() as session:
+                        exists = await session.get(Card, card_uuid)
                 if not exists:
-                    logger.error(f"Карточка {task.arguments['card_id']} не найдена")
-                    await session.delete(task)
-                    await session.commit()
+                    logger.error(f"Карточка {card_id} не найдена")
+                    await self._complete_task(task)
                     return
 
-
-
-            # Удаляем задачу до выполнения, чтобы избежать повторного выполнения
-            await session.delete(task)
-            await session.commit()
-
             # Выполняем функцию
             if asyncio.iscoroutinefunction(func):
                 await func(**task.arguments)
             else:
                 func(**task.arguments)
 
-            logger.info(f"Задача {task.task_id} выполнена успешно")
-
+        except TaskDeferred as e:
+            logger.info(f"Задача {task.task_id} перенесена на {e.execute_at}: {e}")
+            await self._release_task(task, execute_at=e.execute_at)
+            return
         except Exception as e:
             logger.error(f"Ошибка выполнения задачи {task.task_id}: {e}", exc_info=True)
-            await session.delete(task)
+            await self._fail_task(task, e)
+            return
+
+        await self._complete_task(task)
+        logger.info(f"Задача {task.task_id} выполнена успешно")
+
+    async def _complete_task(self, task: ScheduledTask):
+        """Удалить выполненную задачу."""
+        async with self.session_factory() as session:
+            await session.execute(
+                sql_delete(ScheduledTask).where(ScheduledTask.task_id == task.task_id)
+            )
+            await session.commit()
+
+    async def _release_task(self, task: ScheduledTask, execute_at: Optional[datetime] = None):
+        """
+        Снять аренду с задачи без засчитывания попытки.
+
+        Args:
+            task: Захваченная задача
+            execute_at: Новое время выполнения (по умолчанию прежнее)
+        """
+        values = {}
+        if execute_at is not None:
+            values['execute_at'] = execute_at
+        async with self.session_factory() as session:
+            await session.execute(
+                sql_update(ScheduledTask)
+                .where(
+                    ScheduledTask.task_id == task.task_id,
+                    ScheduledTask.locked_by == self.worker_id
+                )
+                .values(
+                    locked_by=None,
+                    locked_until=None,
+                    attempts=ScheduledTask.attempts - 1,
+                    **values
+                )
+                .execution_options(synchronize_session=False)
+            )
             await session.commit()
+        self.wake(execute_at or task.execute_at)
+
+    async def _fail_task(self, task: ScheduledTask, error: Exception):
+        """
+        Обработать ошибку выполнения задачи.
+
+        Args:
+            task: Задача, завершившаяся ошибкой
+            error: Исключение
+        """
+        error_text = f"{type(error).__name__}: {error}"[:4000]
+
+        async with self.session_factory() as session:
+            if task.attempts >= task.max_attempts:
+                session.add(FailedTask(
+                    task_id=task.task_id,
+                    card_id=task.card_id,
+                    function_path=task.function_path,
+                    arguments=task.arguments,
+                    execute_at=task.execute_at,
+                    attempts=task.attempts,
+                    last_error=error_text
+                ))
+                await session.execute(
+                    sql_delete(ScheduledTask).where(ScheduledTask.task_id == task.task_id)
+                )
+                await session.commit()
+                logger.error(
+                    f"Задача {task.task_id} перемещена в failed_tasks "
+                    f"после {task.attempts} попыток"
+                )
+                await self._on_task_failed(task, error_text)
+                return
+
+            retry_at = moscow_now() + self._retry_delay(task.attempts)
+            await session.execute(
+                sql_update(ScheduledTask)
+                .where(ScheduledTask.task_id == task.task_id)
+                .values(
+                    execute_at=retry_at,
+                    locked_by=None,
+                    locked_until=None,
+                    last_error=error_text
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+        self.wake(retry_at)
+        logger.warning(f"Задача {task.task_id} будет повторена в {retry_at}")
+
+    async def _on_task_failed(self, task: ScheduledTask, error_text: str):
+        """
+        Вызвать обработчик окончательной ошибки задачи, если он есть.
+
+        Обработчик задаётся атрибутом ``on_failed`` функции задачи и
+        получает её аргументы и текст последней ошибки (``error``).
+        Обработчик может быть как корутиной, так и обычной функцией.
+        """
+        try:
+            handler = getattr(self._import_function(task.function_path), 'on_failed', None)
+            if handler is None:
+                return
+            arguments = {**task.arguments, 'error': error_text}
+            if asyncio.iscoroutinefunction(handler):
+                await handler(**arguments)
+            else:
+                handler(**arguments)
+        except Exception as e:
+            logger.error(f"Ошибка обработчика on_failed задачи {task.task_id}: {e}", exc_info=True)
+
+    def _retry_delay(self, attempts: int) -> timedelta:
+        """Экспоненциальная задержка перед повтором."""
+        delay = self.retry_base_delay * (2 ** max(attempts - 1, 0))
+        return timedelta(seconds=min(delay, self.retry_max_delay))
 
     def _import_function(self, function_path: str) -> Callable:
         """
@@ -164,6 +609,7 @@ async def create_scheduled_task(
     session.add(task)
     await session.commit()
     await session.refresh(task)
+    notify_schedule_changed(execute_at)
     
     logger.info(f"Создана задача {task.task_id} для выполнения в {execute_at}")
     
@@ -236,6 +682,7 @@ async def schedule_card_notifications(
         logger.info(f"Создана задача уведомления о дедлайне для карточки {card.card_id} на {deadline}")
 
     await session.commit()
+    notify_schedule_changed(two_days_before, one_day_before, deadline)
 
 
 async def cancel_card_tasks(
@@ -267,6 +714,7 @@ async def cancel_card_tasks(
     
     result = await session.execute(stmt)
     await session.commit()
+    notify_schedule_changed()
     
     deleted_count = result.rowcount
     logger.info(f"Удалено {deleted_count} задач для карточки {card_id}")
@@ -319,6 +767,7 @@ async def schedule_post_tasks(session: AsyncSession, card: 'Card') -> None:
     now = moscow_now()
     
     card_uuid = card.card_id if isinstance(card.card_id, PyUUID) else PyUUID(str(card.card_id))
+    send_times: list[datetime] = []
     
     for client_key in card.clients:
         client_config = clients.get(client_key)
@@ -343,6 +792,7 @@ async def schedule_post_tasks(session: AsyncSession, card: 'Card') -> None:
                 }
             )
             session.add(send_task)
+            send_times.append(send_task.execute_at)
             logger.info(f"Создана задача отправки поста для {client_key} на {card.send_time}")
         else:
             # Время уже прошло - отправляем сейчас
@@ -356,6 +806,7 @@ async def schedule_post_tasks(session: AsyncSession, card: 'Card') -> None:
                 }
             )
             session.add(send_task)
+            send_times.append(send_task.execute_at)
             logger.info(f"Время отправки прошло, создана задача немедленной отправки для {client_key}")
 
     # Создаём задачу финализации после отправки всех постов
@@ -371,6 +822,7 @@ async def schedule_post_tasks(session: AsyncSession, card: 'Card') -> None:
     logger.info(f"Создана задача финализации публикации для карточки {card.card_id} на {finalize_time}")
 
     await session.commit()
+    notify_schedule_changed(*send_times, finalize_time)
 
 
 async def cancel_post_tasks(session: AsyncSession, card_id: str) -> int:
@@ -407,6 +859,7 @@ async def cancel_post_tasks(session: AsyncSession, card_id: str) -> int:
     
     result = await session.execute(stmt)
     await session.commit()
+    notify_schedule_changed()
     
     deleted_count = result.rowcount
     logger.info(f"Удалено {deleted_count} задач публикации для карточки {card_id}")
@@ -486,6 +939,7 @@ async def update_post_tasks_time(session: AsyncSession, card: 'Card', new_time:
     await session.execute(finalize_stmt)
     
     await session.commit()
+    notify_schedule_changed(new_time, finalize_time)
     
     updated_count = result.rowcount
     logger.info(f"Обновлено время для {updated_count} задач публикации карточки {card.card_id} на {new_time}")
@@ -0,0 +1,370 @@
+"""
+Сверка файлового хранилища с таблицей card_files.
+
+Хранилище обходится по частям: за один проход — несколько шардов
+первого уровня (``STORAGE_PATH/<ab>``), корень со старыми плоскими
+файлами — отдельной частью. Для каждой части:
+
+- файлы, на которые нет ни одной записи CardFile и которые старше
+  ``grace_hours``, удаляются (через :func:`modules.storage.release_file`,
+  под блокировкой блоба);
+- записи CardFile, для которых нет файла, только считаются; удаляются
+  они лишь с ``delete_missing_rows=True``.
+
+Если хранилище не смонтировано или пусто, проход пропускается целиком.
+Если в части не найдены файлы у слишком многих записей
+(``MISSING_ROWS_MAX_SHARE``), записи этой части не удаляются — скорее
+всего, недоступен сам том, а не отдельные файлы.
+
+Файловые операции ограничены ``ops_per_second``. Задача планировщика
+сама ставит следующий проход: частые — пока обход не завершён,
+затем следующий полный обход через ``FULL_SCAN_INTERVAL``.
+
+Задача планировщика по умолчанию только считает (dry run): файлы
+удаляются лишь при ``"storage_gc_delete": true`` в ``settings.json``.
+Включать удаление стоит после полной миграции хранилища
+(``scripts/migrate_storage_cas.py``) и проверки отчёта: иначе под
+удаление попадут, например, старые файлы корня без записей CardFile.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import delete as sql_delete, func, select
+
+from database.connection import session_factory
+from models.Card import Card
+from models.CardFile import CardFile
+from models.ScheduledTask import ScheduledTask
+from models.Task import Task
+from modules.exec.notify_dispatcher import TokenBucket
+from modules.json_utils import open_settings
+from modules.logs import logger
+from modules.storage import STORAGE_PATH, TMP_DIR, file_exists, is_content_key, release_file
+from modules.timezone import now_naive as moscow_now
+
+GC_FUNCTION_PATH = "modules.tasks.storage_gc.collect_storage_garbage"
+
+# Шардов первого уровня за один проход (всего их 256)
+SHARDS_PER_RUN = 16
+# Пауза между проходами одного обхода и между полными обходами
+RUN_INTERVAL = timedelta(minutes=5)
+FULL_SCAN_INTERVAL = timedelta(days=1)
+
+# Метка корня хранилища (старые файлы) в курсоре обхода
+ROOT_PART = "root"
+SHARD_NAMES = [f"{i:02x}" for i in range(256)]
+SCAN_ORDER = SHARD_NAMES + [ROOT_PART]
+
+# Сколько имён проверять в БД одним запросом
+DB_BATCH = 500
+
+# Записи без файлов части не удаляются, если их больше этой доли
+# (и больше MISSING_ROWS_MIN штук)
+MISSING_ROWS_MAX_SHARE = 0.1
+MISSING_ROWS_MIN = 20
+
+
+@dataclass
+class GCStats:
+    files_scanned: int = 0
+    orphan_files: int = 0
+    orphan_bytes: int = 0
+    missing_rows: int = 0
+    skipped_recent: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def merge(self, other: "GCStats") -> None:
+        self.files_scanned += other.files_scanned
+        self.orphan_files += other.orphan_files
+        self.orphan_bytes += other.orphan_bytes
+        self.missing_rows += other.missing_rows
+        self.skipped_recent += other.skipped_recent
+        self.errors.extend(other.errors)
+
+    def __str__(self) -> str:
+        return (
+            f"scanned {self.files_scanned}, orphan files {self.orphan_files} "
+            f"({self.orphan_bytes / 1024 ** 2:.1f} MB), missing rows {self.missing_rows}, "
+            f"too recent {self.skipped_recent}, errors {len(self.errors)}"
+        )
+
+
+def _list_part(part: str) -> dict[str, tuple[int, float]]:
+    """Файлы части хранилища: ``{имя: (размер, mtime)}``.
+
+    Временные файлы (``.tmp``, недописанные ``*.migrate``) пропускаются.
+    """
+    files: dict[str, tuple[int, float]] = {}
+
+    if part == ROOT_PART:
+        entries = [Path(e.path) for e in os.scandir(STORAGE_PATH) if e.is_file()]
+    else:
+        base = STORAGE_PATH / part
+        if not base.is_dir():
+            return files
+        entries = [p for p in base.glob("*/*") if p.is_file()]
+
+    for path in entries:
+        name = path.name
+        if name.startswith(".") or name.endswith(".migrate") or path.parent == TMP_DIR:
+            continue
+        if part != ROOT_PART and not is_content_key(name):
+            continue
+        st = path.stat()
+        files[name] = (st.st_size, st.st_mtime)
+    return files
+
+
+def _storage_available() -> bool:
+    """Хранилище смонтировано и в нём есть что-то кроме временной папки."""
+    if not STORAGE_PATH.is_dir():
+        return False
+    with os.scandir(STORAGE_PATH) as entries:
+        return any(entry.name != TMP_DIR.name for entry in entries)
+
+
+def _rows_filter(part: str):
+    """Условие на записи CardFile, файлы которых лежат в части ``part``."""
+    if part == ROOT_PART:
+        # Ключи по содержимому — ровно 64 hex-символа, всё остальное лежит в корне
+        return CardFile.filename.op("!~")("^[0-9a-f]{64}$")
+    return CardFile.filename.op("~")(f"^{part}[0-9a-f]{{62}}$")
+
+
+async def _referenced(names: list[str]) -> set[str]:
+    referenced: set[str] = set()
+    async with session_factory() as session:
+        for i in range(0, len(names), DB_BATCH):
+            result = await session.execute(
+                select(CardFile.filename)
+                .where(CardFile.filename.in_(names[i:i + DB_BATCH]))
+                .distinct()
+            )
+            referenced.update(result.scalars())
+    return referenced
+
+
+def _deletion_enabled() -> bool:
+    """Разрешено ли задаче планировщика удалять файлы (``storage_gc_delete``)."""
+    return bool((open_settings() or {}).get('storage_gc_delete', False))
+
+
+async def _collect_part(
+    part: str,
+    budget: TokenBucket,
+    grace: timedelta,
+    dry_run: bool,
+    delete_missing_rows: bool,
+) -> GCStats:
+    stats = GCStats()
+    loop = asyncio.get_running_loop()
+
+    files = await loop.run_in_executor(None, _list_part, part)
+    stats.files_scanned = len(files)
+
+    # Файлы без записей
+    referenced = await _referenced(list(files))
+    threshold = time.time() - grace.total_seconds()
+    for name, (size, mtime) in files.items():
+        if name in referenced:
+            continue
+        if mtime > threshold:
+            # Только что записанный блоб: запись CardFile может ещё создаваться
+            stats.skipped_recent += 1
+            continue
+
+        await budget.acquire()
+        try:
+            if dry_run or await release_file(name, CardFile.count_refs):
+                stats.orphan_files += 1
+                stats.orphan_bytes += size
+        except Exception as e:
+            stats.errors.append(f"{name}: {e}")
+
+    # Записи без файлов
+    async with session_factory() as session:
+        result = await session.execute(
+            select(CardFile.id, CardFile.filename).where(_rows_filter(part))
+        )
+        rows = result.all()
+
+    missing = []
+    for file_id, name in rows:
+        if name in files:
+            continue
+        await budget.acquire()
+        # Перепроверяем: файл мог появиться после листинга
+        if not await loop.run_in_executor(None, file_exists, name):
+            missing.append(file_id)
+
+    stats.missing_rows = len(missing)
+    if not missing or dry_run or not delete_missing_rows:
+        return stats
+
+    if len(missing) > MISSING_ROWS_MIN and len(missing) > len(rows) * MISSING_ROWS_MAX_SHARE:
+        stats.errors.append(
+            f"{part}: нет файлов у {len(missing)} из {len(rows)} записей, записи не удалены"
+        )
+        return stats
+
+    async with session_factory() as session:
+        for i in range(0, len(missing), DB_BATCH):
+            await session.execute(
+                sql_delete(CardFile).where(CardFile.id.in_(missing[i:i + DB_BATCH]))
+            )
+        await session.commit()
+
+    return stats
+
+
+async def collect_storage_garbage(
+    cursor: int = 0,
+    parts: int = SHARDS_PER_RUN,
+    ops_per_second: float = 50,
+    grace_hours: float = 24,
+    dry_run: Optional[bool] = None,
+    delete_missing_rows: bool = False,
+    reschedule: bool = True,
+) -> dict:
+    """
+    Один проход сборщика: ``parts`` частей хранилища начиная с ``cursor``.
+
+    Args:
+        cursor: Позиция в ``SCAN_ORDER``, с которой начинать
+        parts: Сколько частей обработать (0 — до конца обхода)
+        ops_per_second: Лимит файловых операций (удаление, проверка наличия)
+        grace_hours: Файлы младше этого возраста не удаляются
+        dry_run: Только посчитать, ничего не удалять (по умолчанию —
+            если в настройках не включён ``storage_gc_delete``)
+        delete_missing_rows: Удалять записи CardFile, для которых нет файла
+        reschedule: Поставить следующий проход в планировщик
+
+    Returns:
+        {"cursor": следующая позиция (0 — обход завершён), "stats": GCStats}
+    """
+    if dry_run is None:
+        dry_run = not _deletion_enabled()
+    budget = TokenBucket(ops_per_second)
+    grace = timedelta(hours=grace_hours)
+    end = len(SCAN_ORDER) if not parts else min(cursor + parts, len(SCAN_ORDER))
+
+    total = GCStats()
+    available = await asyncio.get_running_loop().run_in_executor(None, _storage_available)
+    if not available:
+        logger.error(f"Storage GC: хранилище {STORAGE_PATH} недоступно или пусто, проход пропущен")
+        total.errors.append(f"{STORAGE_PATH}: недоступно или пусто")
+        end = cursor
+    for part in SCAN_ORDER[cursor:end]:
+        try:
+            total.merge(await _collect_part(part, budget, grace, dry_run, delete_missing_rows))
+        except Exception as e:
+            logger.error(f"Storage GC: ошибка обработки части {part}: {e}", exc_info=True)
+            total.errors.append(f"{part}: {e}")
+
+    next_cursor = end if end < len(SCAN_ORDER) else 0
+    logger.info(
+        f"Storage GC{' (dry run)' if dry_run else ''}: части {cursor}..{end - 1}: {total}"
+    )
+
+    if reschedule:
+        delay = RUN_INTERVAL if next_cursor or not available else FULL_SCAN_INTERVAL
+        await schedule_storage_gc(moscow_now() + delay, cursor=next_cursor)
+
+    return {"cursor": next_cursor, "stats": total}
+
+
+async def schedule_storage_gc(execute_at, cursor: int = 0) -> None:
+    from modules.tasks.scheduler import create_scheduled_task
+
+    async with session_factory() as session:
+        await create_scheduled_task(
+            session=session,
+            function_path=GC_FUNCTION_PATH,
+            execute_at=execute_at,
+            cursor=cursor,
+        )
+
+
+async def check_and_create_storage_gc_task() -> None:
+    """
+    Проверить наличие задачи сборщика хранилища.
+    Если задачи нет, создать её.
+    """
+    try:
+        existing = await ScheduledTask.filter_by(function_path=GC_FUNCTION_PATH)
+        if existing:
+            return
+        await schedule_storage_gc(moscow_now() + RUN_INTERVAL)
+        logger.info("Создана задача сборщика хранилища")
+    except Exception as e:
+        logger.error(f"Ошибка создания задачи сборщика хранилища: {e}", exc_info=True)
+
+
+async def storage_usage(top: Optional[int] = None) -> dict:
+    """
+    Объём файлов по карточкам и по пользователям (заказчик задания карточки).
+
+    Размеры — по записям card_files: одинаковый файл у двух карточек
+    учитывается у обеих. ``physical_bytes`` — объём уникальных блобов.
+
+    Returns:
+        {"cards": [{"card_id", "name", "files", "bytes"}],
+         "users": [{"user_id", "cards", "files", "bytes"}],
+         "logical_bytes": int, "physical_bytes": int}
+    """
+    size_sum = func.coalesce(func.sum(CardFile.size), 0)
+
+    async with session_factory() as session:
+        cards_query = (
+            select(Card.card_id, Card.name, func.count(CardFile.id), size_sum)
+            .join(CardFile, CardFile.card_id == Card.card_id)
+            .group_by(Card.card_id, Card.name)
+            .order_by(size_sum.desc())
+        )
+        users_query = (
+            select(
+                Task.customer_id,
+                func.count(func.distinct(Card.card_id)),
+                func.count(CardFile.id),
+                size_sum,
+            )
+            .select_from(CardFile)
+            .join(Card, Card.card_id == CardFile.card_id)
+            .outerjoin(Task, Task.task_id == Card.task_id)
+            .group_by(Task.customer_id)
+            .order_by(size_sum.desc())
+        )
+        if top:
+            cards_query = cards_query.limit(top)
+            users_query = users_query.limit(top)
+
+        cards = (await session.execute(cards_query)).all()
+        users = (await session.execute(users_query)).all()
+        logical = (await session.execute(select(size_sum))).scalar_one()
+        blobs = (
+            select(func.max(CardFile.size).label("size"))
+            .group_by(CardFile.filename)
+            .subquery()
+        )
+        physical = (await session.execute(
+            select(func.coalesce(func.sum(blobs.c.size), 0))
+        )).scalar_one()
+
+    return {
+        "cards": [
+            {"card_id": str(card_id), "name": name, "files": count, "bytes": int(total)}
+            for card_id, name, count, total in cards
+        ],
+        "users": [
+            {"user_id": str(user_id) if user_id else None,
+             "cards": card_count, "files": count, "bytes": int(total)}
+            for user_id, card_count, count, total in users
+        ],
+        "logical_bytes": int(logical),
+        "physical_bytes": int(physical),
+    }
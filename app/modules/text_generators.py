@@ -1,25 +1,35 @@
 
 from datetime import datetime
 from modules.card.card_events import on_executor
-from modules.post_sender import download_files
+from modules.post_sender import download_files, send_with_tg_file_cache, tg_media_source
 from tg.main import TelegramExecutor
 from modules.exec.executors_manager import manager
 from modules.constants import SETTINGS, CLIENTS
 from modules.post_generator import generate_post, render_post_from_card
 from modules.enums import CardStatus
-from modules.utils import get_telegram_user
+from modules.utils import get_bot_me, warm_telegram_users
 from modules.entities_sender import send_poll_preview, get_entities_for_client
 from models.Card import Card
 from models.User import User
 from models.CardMessage import CardMessage
 from modules.storage import download_file as _storage_download
-from modules.json_utils import open_clients, open_settings
+from modules.json_utils import config_registry, open_clients, open_settings
 
 forum_topic = SETTINGS.get('forum_topic', 0)
 group_forum = SETTINGS.get('group_forum', 0)
 complete_topic = SETTINGS.get('complete_topic', 0)
 
 
+def _apply_settings(settings: dict):
+    global forum_topic, group_forum, complete_topic
+    forum_topic = settings.get('forum_topic', 0)
+    group_forum = settings.get('group_forum', 0)
+    complete_topic = settings.get('complete_topic', 0)
+
+
+config_registry.subscribe('settings.json', _apply_settings)
+
+
 pass_tag = '#НовоеЗадание'
 edited_tag = '#ЗаданиеВыполняется'
 needcheck_tag = '#ЗаданиеНаПроверку'
@@ -65,6 +75,29 @@ async def card_deleted(card_id: str):
 
     return {"success": True}
 
+async def participant_profiles(card: dict, keys: list[str], bot) -> dict:
+    """Профили Telegram участников карточки: ``{ключ: TelegramProfile | None | False}``.
+
+    ``None`` — ключ не задан, ``False`` — пользователь не найден в БД.
+    Пользователи загружаются одним запросом, профили — из кэша
+    (см. :func:`modules.utils.warm_telegram_users`).
+    """
+    user_ids = {key: card.get(key) for key in keys}
+    telegram_ids = await User.telegram_ids_for(uid for uid in user_ids.values() if uid)
+    by_user = {str(uid): tid for uid, tid in telegram_ids.items()}
+    profiles = await warm_telegram_users(bot, by_user.values())
+
+    result = {}
+    for key, uid in user_ids.items():
+        if uid is None:
+            result[key] = None
+        elif str(uid) not in by_user:
+            result[key] = False
+        else:
+            result[key] = profiles.get(by_user[str(uid)])
+    return result
+
+
 async def text_getter(card: dict, tag: str, 
                       client_executor: TelegramExecutor) -> str:
 
@@ -81,13 +114,9 @@ async def text_getter(card: dict, tag: str,
     tags = []
     if tags_raw != ["Без тегов"]:
         # упорядочиваем теги по полю order из БД
-        from modules.utils import sort_tags
-        sorted_keys = await sort_tags(tags_raw)
-        from modules.utils import get_tags_map
-        tag_map = await get_tags_map()
-        for t in sorted_keys:
-            tag_label = '#' + tag_map.get(t, {}).get('tag', t)
-            tags.append(tag_label)
+        from modules.tag_cache import tag_cache
+        snapshot = await tag_cache.get()
+        tags = [snapshot.hashtag(t) for t in snapshot.sort(tags_raw)]
     else:
         tags = ["Без тегов"]
 
@@ -116,28 +145,21 @@ async def text_getter(card: dict, tag: str,
         except Exception as e:
             print(f"Error calculating days remaining: {e}")
 
-    data_list = []
-    for i in ['executor_id', 'customer_id', 'editor_id']:
-
-        _id = card.get(i)
+    roles = ['executor_id', 'customer_id', 'editor_id']
+    profiles = await participant_profiles(card, roles, client_executor.bot)
 
-        if _id is not None:
-            users = await User.find(user_id=_id)
-            user = users[0] if users else None
+    data_list = []
+    for i in roles:
+        tg_user = profiles[i]
 
-            if user is not None:
-                tg_user = await get_telegram_user(
-                    bot=client_executor.bot,
-                    telegram_id=user.telegram_id
-                )
-                if tg_user:
-                    username = f'@{tg_user.username}' if tg_user.username else f'`{tg_user.full_name}`'
-                else:
-                    username = f"ID: {card.get(i)}"
-            else:
-                username = f"ID: {card.get(i)} (ошибка получения)"
-        else:
+        if tg_user is None and card.get(i) is None:
             username = "<code>Не назначен</code>"
+        elif tg_user is False:
+            username = f"ID: {card.get(i)} (ошибка получения)"
+        elif tg_user:
+            username = f'@{tg_user.username}' if tg_user.username else f'`{tg_user.full_name}`'
+        else:
+            username = f"ID: {card.get(i)}"
 
         data_list.append(username)
 
@@ -180,7 +202,7 @@ async def forum_message(card_id: str):
     markup = []
 
     status = card['status']
-    bot_username = (await client_executor.bot.get_me()).username
+    bot_username = (await get_bot_me(client_executor.bot)).username
     view_link = f'https://t.me/{bot_username}?start=type-open-view_id-{card["card_id"]}'
 
     if status == CardStatus.pass_.value:
@@ -421,25 +443,34 @@ async def send_complete_preview(card_id: str, client_key: str) -> dict:
         # Отправляем пост с изображениями или без
         if downloaded_images:
             if len(downloaded_images) == 1:
-                result = await client_executor.send_photo(
-                    chat_id=group_forum,
-                    photo=downloaded_images[0]['data'],
-                    caption=post_text,
-                    parse_mode="HTML",
-                    reply_to_message_id=complete_topic,
-                    has_spoiler=downloaded_images[0].get('hide', False),
-                    reply_markup=reply_markup
-                )
+                async def send_single(files: list) -> dict:
+                    f = files[0]
+                    send = client_executor.send_video if f.get('type') == 'video' else client_executor.send_photo
+                    media_key = 'video' if f.get('type') == 'video' else 'photo'
+                    return await send(
+                        chat_id=group_forum,
+                        caption=post_text,
+                        parse_mode="HTML",
+                        reply_to_message_id=complete_topic,
+                        has_spoiler=f.get('hide', False),
+                        reply_markup=reply_markup,
+                        **{media_key: tg_media_source(f)}
+                    )
+
+                result = await send_with_tg_file_cache(send_single, downloaded_images)
                 if result.get("success"):
                     post_id = result.get("message_id")
                     post_ids = [post_id]
             else:
-                result = await client_executor.send_media_group(
-                    chat_id=group_forum,
-                    media=downloaded_images,
-                    caption=post_text,
-                    parse_mode="HTML",
-                    reply_to_message_id=complete_topic
+                result = await send_with_tg_file_cache(
+                    lambda files: client_executor.send_media_group(
+                        chat_id=group_forum,
+                        media=files,
+                        caption=post_text,
+                        parse_mode="HTML",
+                        reply_to_message_id=complete_topic
+                    ),
+                    downloaded_images
                 )
                 if result.get("success"):
                     post_id = result.get("message_id")
@@ -508,29 +539,14 @@ async def send_complete_preview(card_id: str, client_key: str) -> dict:
         executor_name = "Не назначен"
         editor_name = "Не назначен"
         
-        executor_id = card.get('executor_id')
-        if executor_id:
-            users = await User.find(user_id=executor_id)
-            if users:
-                user = users[0]
-                tg_user = await get_telegram_user(
-                    bot=client_executor.bot,
-                    telegram_id=user.telegram_id
-                )
-                if tg_user:
-                    executor_name = f'@{tg_user.username}' if tg_user.username else tg_user.full_name
-        
-        editor_id = card.get('editor_id')
-        if editor_id:
-            users = await User.find(user_id=editor_id)
-            if users:
-                user = users[0]
-                tg_user = await get_telegram_user(
-                    bot=client_executor.bot,
-                    telegram_id=user.telegram_id
-                )
-                if tg_user:
-                    editor_name = f'@{tg_user.username}' if tg_user.username else tg_user.full_name
+        profiles = await participant_profiles(
+            card, ['executor_id', 'editor_id'], client_executor.bot)
+        if profiles['executor_id']:
+            tg_user = profiles['executor_id']
+            executor_name = f'@{tg_user.username}' if tg_user.username else tg_user.full_name
+        if profiles['editor_id']:
+            tg_user = profiles['editor_id']
+            editor_name = f'@{tg_user.username}' if tg_user.username else tg_user.full_name
         
         # Отправляем информацию о задаче и клиенте
         card_name = card.get("name", "Без названия")
@@ -694,29 +710,14 @@ async def update_complete_preview(card_id: str, client_key: str,
             executor_name = "Не назначен"
             editor_name = "Не назначен"
             
-            executor_id = card.get('executor_id')
-            if executor_id:
-                users = await User.find(user_id=executor_id)
-                if users:
-                    user = users[0]
-                    tg_user = await get_telegram_user(
-                        bot=client_executor.bot,
-                        telegram_id=user.telegram_id
-                    )
-                    if tg_user:
-                        executor_name = f'@{tg_user.username}' if tg_user.username else tg_user.full_name
-            
-            editor_id = card.get('editor_id')
-            if editor_id:
-                users = await User.find(user_id=editor_id)
-                if users:
-                    user = users[0]
-                    tg_user = await get_telegram_user(
-                        bot=client_executor.bot,
-                        telegram_id=user.telegram_id
-                    )
-                    if tg_user:
-                        editor_name = f'@{tg_user.username}' if tg_user.username else tg_user.full_name
+            profiles = await participant_profiles(
+                card, ['executor_id', 'editor_id'], client_executor.bot)
+            if profiles['executor_id']:
+                tg_user = profiles['executor_id']
+                executor_name = f'@{tg_user.username}' if tg_user.username else tg_user.full_name
+            if profiles['editor_id']:
+                tg_user = profiles['editor_id']
+                editor_name = f'@{tg_user.username}' if tg_user.username else tg_user.full_name
 
             card_name = card.get("name", "Без названия")
 
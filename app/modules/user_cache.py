@@ -0,0 +1,75 @@
+"""
+Кэш пользователей по ``telegram_id`` для фильтров и обработчиков бота.
+
+Каждый апдейт проходит через ``Authorize`` / ``RoleFilter``, поэтому
+пользователь запрашивается из БД много раз за одно действие. Кэш хранит
+найденного пользователя (или его отсутствие) ``ttl`` секунд; запись
+сбрасывается при создании, изменении и удалении пользователя
+(``User.create`` / ``update`` / ``delete``).
+"""
+import time
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from models.User import User
+
+
+class UserCache:
+    """Кэш ``telegram_id -> User`` с ограниченным временем жизни."""
+
+    def __init__(self, ttl: float = 30, max_size: int = 5000):
+        """
+        Args:
+            ttl: Время жизни записи в секундах
+            max_size: Максимальное количество записей
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: dict[int, tuple[float, Optional['User']]] = {}
+
+    async def get(self, telegram_id: Optional[int]) -> Optional['User']:
+        """Получить пользователя, при промахе загрузив его из БД."""
+        if telegram_id is None:
+            return None
+
+        entry = self._entries.get(telegram_id)
+        if entry and time.monotonic() - entry[0] <= self.ttl:
+            return entry[1]
+
+        from models.User import User
+        user = await User.by_telegram(telegram_id)
+
+        if len(self._entries) >= self.max_size:
+            self._evict_expired()
+        self._entries[telegram_id] = (time.monotonic(), user)
+        return user
+
+    async def role_for(self, telegram_id: Optional[int]) -> Optional[str]:
+        """Строковое значение роли пользователя (как ``User.role_for``)."""
+        user = await self.get(telegram_id)
+        return user.role.value if user else None
+
+    def invalidate(self, telegram_id: Optional[int] = None) -> None:
+        """Сбросить запись пользователя или весь кэш, если ID не указан."""
+        if telegram_id is None:
+            self._entries.clear()
+            return
+        try:
+            self._entries.pop(int(telegram_id), None)
+        except (TypeError, ValueError):
+            self._entries.clear()
+
+    def _evict_expired(self) -> None:
+        now = time.monotonic()
+        expired = [k for k, (ts, _) in self._entries.items() if now - ts > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        # Если всё ещё переполнено — удаляем самые старые записи
+        overflow = len(self._entries) - self.max_size + 1
+        if overflow > 0:
+            oldest = sorted(self._entries.items(), key=lambda item: item[1][0])[:overflow]
+            for key, _ in oldest:
+                del self._entries[key]
+
+
+user_cache = UserCache()
@@ -1,24 +1,94 @@
-from typing import Optional
+import asyncio
+from dataclasses import dataclass
+from typing import Iterable, Optional
 from aiogram import Bot
 import time
 
+# Время жизни профиля Telegram в кэше (и повторной попытки после ошибки)
 max_live = 3600
-cache_users = {}
+miss_live = 300
+# Одновременных запросов get_chat при прогреве
+warm_concurrency = 5
+
+
+@dataclass(frozen=True)
+class TelegramProfile:
+    """Имя и username пользователя Telegram — всё, что нужно для отображения."""
+    id: int
+    username: Optional[str]
+    full_name: str
+
+
+# telegram_id -> (время записи, профиль или None, если получить не удалось)
+cache_users: dict[int, tuple[float, Optional[TelegramProfile]]] = {}
+# id бота -> результат get_me
+_bot_identity: dict[int, object] = {}
+
+
+def _cached_profile(telegram_id: int) -> tuple[bool, Optional[TelegramProfile]]:
+    entry = cache_users.get(telegram_id)
+    if entry is None:
+        return False, None
+    stored, profile = entry
+    ttl = max_live if profile is not None else miss_live
+    if time.time() - stored > ttl:
+        return False, None
+    return True, profile
+
+
+async def get_telegram_user(bot: Bot, telegram_id: int) -> Optional[TelegramProfile]:
+    """Получить информацию о пользователе Telegram по его ID (с кэшем на ``max_live`` секунд)"""
+    found, profile = _cached_profile(telegram_id)
+    if found:
+        return profile
 
-async def get_telegram_user(bot: Bot, telegram_id: int):
-    """Получить информацию о пользователе Telegram по его ID"""
     try:
-        if telegram_id in cache_users:
-            if time.time() - cache_users[telegram_id]['timestamp'] <= max_live:
-                return cache_users[telegram_id]['user']
-
-        user = await bot.get_chat(telegram_id)
-        cache_users[telegram_id] = {
-            'user': user, 'timestamp': time.time()
-        }
-        return user
-    except Exception as e:
-        return None
+        chat = await bot.get_chat(telegram_id)
+        profile = TelegramProfile(
+            id=chat.id, username=chat.username, full_name=chat.full_name)
+    except Exception:
+        # Недоступного пользователя не запрашиваем повторно при каждой отрисовке
+        profile = None
+
+    cache_users[telegram_id] = (time.time(), profile)
+    return profile
+
+
+async def warm_telegram_users(
+    bot: Bot, telegram_ids: Iterable[int]
+) -> dict[int, Optional[TelegramProfile]]:
+    """Получить профили пачкой: отсутствующие в кэше запрашиваются параллельно."""
+    ids = list(dict.fromkeys(tid for tid in telegram_ids if tid))
+    semaphore = asyncio.Semaphore(warm_concurrency)
+
+    async def fetch(telegram_id: int):
+        async with semaphore:
+            return await get_telegram_user(bot, telegram_id)
+
+    profiles = await asyncio.gather(*(fetch(tid) for tid in ids))
+    return dict(zip(ids, profiles))
+
+
+def remember_telegram_user(user) -> None:
+    """Обновить профиль из пришедшего апдейта (``from_user``) — без запроса к API."""
+    cache_users[user.id] = (
+        time.time(),
+        TelegramProfile(id=user.id, username=user.username, full_name=user.full_name),
+    )
+
+
+def invalidate_telegram_user(telegram_id: int) -> None:
+    """Сбросить профиль из кэша (например, после смены имени)."""
+    cache_users.pop(telegram_id, None)
+
+
+async def get_bot_me(bot: Bot):
+    """``bot.get_me()``, запрошенный один раз на процесс."""
+    me = _bot_identity.get(bot.id)
+    if me is None:
+        me = await bot.get_me()
+        _bot_identity[bot.id] = me
+    return me
 
 async def get_display_name(
                     telegram_id: int,
@@ -56,28 +126,17 @@ def get_user_display_name(user) -> str:
 
 
 
-# кешированная карта тегов: ключ -> запись из БД
-_tags_cache: dict[str, dict] | None = None
-
-
 async def get_tags_map(refresh: bool = False) -> dict[str, dict]:
-    """Возвращает карту тегов ``{key: record}``, загруженную из БД.
+    """Возвращает карту тегов ``{key: record}`` в порядке ``order``.
 
-    При первом вызове загружает теги через модель ``Tag`` и кэширует результат.
-    Если ``refresh=True``, выполняется повторная загрузка.
+    Данные берутся из кэша справочника (:mod:`modules.tag_cache`), который
+    сбрасывается при изменении тегов. ``refresh=True`` принудительно
+    перечитывает таблицу. Возвращаемый словарь общий — не изменять.
     """
-    global _tags_cache
-    if _tags_cache is not None and not refresh:
-        return _tags_cache
-
-    from models.Tag import Tag
-    try:
-        tags_list = await Tag.all_sorted()
-    except Exception:
-        tags_list = []
-
-    _tags_cache = {t.key: {"key": t.key, "name": t.name, "tag": t.tag, "order": t.order} for t in tags_list}
-    return _tags_cache
+    from modules.tag_cache import tag_cache
+    if refresh:
+        tag_cache.invalidate()
+    return (await tag_cache.get()).records
 
 
 async def sort_tags(tags: list[str]) -> list[str]:
@@ -93,17 +152,16 @@ async def sort_tags(tags: list[str]) -> list[str]:
     if not tags:
         return []
 
-    tag_map = await get_tags_map()
-    order_map = {k: tag_map.get(k, {}).get('order', 0) for k in tags}
-    return sorted(tags, key=lambda k: order_map.get(k, 0))
+    from modules.tag_cache import tag_cache
+    return (await tag_cache.get()).sort(tags)
 
 
 async def format_tags(tags: list[str]) -> str:
     """
     Форматирует список ключей тегов в строку через запятую, учитывая порядок.
 
-    Сортировка и получение имён берётся из карты тегов
-    (см. :func:`get_tags_map`).
+    Сортировка и получение имён берётся из кэша справочника тегов
+    (см. :mod:`modules.tag_cache`).
 
     Args:
         tags: список ключей тегов
@@ -114,11 +172,9 @@ async def format_tags(tags: list[str]) -> str:
     if not tags:
         return 'Не указаны'
 
-    tag_map = await get_tags_map()
-    sorted_keys = sorted(tags, key=lambda k: tag_map.get(k, {}).get('order', 0))
-    def name_for(k: str) -> str:
-        return tag_map.get(k, {}).get('name', k)
-    return ', '.join(name_for(k) for k in sorted_keys)
+    from modules.tag_cache import tag_cache
+    snapshot = await tag_cache.get()
+    return ', '.join(snapshot.name(k) for k in snapshot.sort(tags))
 
 def is_valid_telegram_url(url: str) -> bool:
     """Проверяет, что URL допустим для кнопок Telegram (нет подчёркиваний в домене)."""
@@ -1,12 +1,14 @@
-from typing import Union
+from typing import Optional, Union
 from aiogram.filters import BaseFilter
 from aiogram.types import CallbackQuery, Message
 from models.User import User
+from modules.user_cache import user_cache
 
 class Authorize(BaseFilter):
 
     async def __call__(self, 
-                       var: Union[CallbackQuery, Message]
+                       var: Union[CallbackQuery, Message],
+                       db_user: Optional[User] = None
                        ) -> bool:
         telegram_id = None
 
@@ -20,5 +22,6 @@ class Authorize(BaseFilter):
                 telegram_id = var.from_user.id
             else: return False
 
-        users = await User.find(telegram_id=telegram_id)
-        return len(users) > 0
+        # db_user приходит из UserMiddleware, иначе берём из кэша
+        user = db_user or await user_cache.get(telegram_id)
+        return user is not None
@@ -1,13 +1,15 @@
-from typing import Union
+from typing import Optional, Union
 from aiogram.filters import BaseFilter
 from aiogram.types import CallbackQuery, Message
 from models.User import User
+from modules.user_cache import user_cache
 
 class RoleFilter(BaseFilter):
     def __init__(self, need_role: str) -> None:
         self.need_role = need_role
 
-    async def __call__(self, var: Union[CallbackQuery, Message]) -> bool:
+    async def __call__(self, var: Union[CallbackQuery, Message],
+                       db_user: Optional[User] = None) -> bool:
         telegram_id = None
 
         if type(var) == CallbackQuery:
@@ -22,9 +24,9 @@ class RoleFilter(BaseFilter):
 
         if telegram_id is None: return False
 
-        users = await User.find(telegram_id=telegram_id)
-        if len(users) == 0: return False
+        # db_user приходит из UserMiddleware, иначе берём из кэша
+        user = db_user or await user_cache.get(telegram_id)
+        if user is None: return False
 
-        user_role = await User.role_for(telegram_id)
-        if user_role is None: return False
+        user_role = user.role.value
         return user_role == self.need_role or user_role == "admin"
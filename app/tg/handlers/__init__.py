@@ -8,4 +8,5 @@ from . import start
 from . import design_photos
 from . import leaderboard
 from . import help
-from . import design_tasks
\ No newline at end of file
+from . import design_tasks
+from . import config
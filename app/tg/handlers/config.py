@@ -0,0 +1,26 @@
+from aiogram import Dispatcher
+from aiogram.types import Message
+from aiogram.filters import Command
+
+from modules.exec.executors_manager import manager
+from modules.json_utils import config_registry
+from tg.filters.role_filter import RoleFilter
+from tg.filters.in_dm import InDMorWorkGroup
+
+client_executor = manager.get("telegram_executor")
+dp: Dispatcher = client_executor.dp
+
+
+@dp.message(Command('reload_config'), RoleFilter('admin'), InDMorWorkGroup())
+async def reload_config_command(message: Message):
+    """Перечитать json-конфигурации без перезапуска"""
+    changed = config_registry.reload()
+    if changed:
+        await message.answer("🔄 Обновлены: " + ", ".join(changed))
+    else:
+        await message.answer("✅ Конфигурации не изменились")
+
+
+@dp.message(Command('reload_config'), InDMorWorkGroup())
+async def reload_config_command_nau(message: Message):
+    await message.answer("У вас нет прав для использования этой команды.")
@@ -1,3 +1,4 @@
+from typing import Optional
 from aiogram import Bot, Dispatcher
 from aiogram.types import Message
 from models.User import User
@@ -42,12 +43,12 @@ async def cmd_create_customer(message: Message):
     await cmd_create(message)
 
 @dp.message(Command("create"), RoleFilter('copywriter'), InDMorWorkGroup())
-async def cmd_create_copywriter(message: Message):
+async def cmd_create_copywriter(message: Message, db_user: Optional[User] = None):
     n_s = scene_manager.get_scene(message.from_user.id)
     if n_s:
         await n_s.end()
     
-    user = await User.by_telegram(message.from_user.id)
+    user = db_user or await User.by_telegram(message.from_user.id)
     if not user:
         await message.answer("❌ Ошибка: пользователь не найден в базе данных.")
         return
@@ -64,12 +65,12 @@ async def cmd_create_copywriter(message: Message):
     await sc.start()
 
 @dp.message(Command("create"), RoleFilter('editor'), InDMorWorkGroup())
-async def cmd_create_editor(message: Message):
+async def cmd_create_editor(message: Message, db_user: Optional[User] = None):
     n_s = scene_manager.get_scene(message.from_user.id)
     if n_s:
         await n_s.end()
     
-    user = await User.by_telegram(message.from_user.id)
+    user = db_user or await User.by_telegram(message.from_user.id)
     if not user:
         await message.answer("❌ Ошибка: пользователь не найден в базе данных.")
         return
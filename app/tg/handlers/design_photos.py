@@ -9,7 +9,7 @@ from modules.exec.executors_manager import manager
 from modules.constants import SETTINGS
 from modules.logs import logger
 from modules.file_utils import download_telegram_file, is_image_by_mime_or_extension
-from modules.file_utils import convert_image_to_png
+from modules.image_pool import image_pool
 from modules.exec.executors_client import notify_user
 
 client_executor = manager.get("telegram_executor")
@@ -37,7 +37,7 @@ async def upload_image_for_card(card_id: str, file_data: bytes, file_name: str)
     try:
         # Конвертируем картинку в PNG если нужно
         try:
-            converted = convert_image_to_png(file_data)
+            converted = await image_pool.convert_to_png(file_data)
             file_data_to_upload = converted
             file_name = file_name.rsplit('.', 1)[0] + '.png' if '.' in file_name else file_name + '.png'
             content_type = 'image/png'
@@ -1,3 +1,4 @@
+from typing import Optional
 from aiogram import Bot, Dispatcher
 from aiogram.types import Message, CallbackQuery
 from models.Card import Card
@@ -15,12 +16,11 @@ dp: Dispatcher = client_executor.dp
 bot: Bot = client_executor.bot
 
 @dp.callback_query(F.data == "take_task")
-async def take_task(callback: CallbackQuery):
+async def take_task(callback: CallbackQuery, db_user: Optional[User] = None):
     logger.info(f"Пользователь {callback.from_user.id} нажал 'Забрать задание'")
 
     message_id = callback.message.message_id
-    users = await User.find(telegram_id=callback.from_user.id)
-    user = users[0] if users else None
+    user = db_user or await User.by_telegram(callback.from_user.id)
 
     if not user:
         await callback.answer(
@@ -88,13 +88,12 @@ async def take_task(callback: CallbackQuery):
 
 
 @dp.callback_query(F.data == "edit_task")
-async def edit_task(callback: CallbackQuery):
+async def edit_task(callback: CallbackQuery, db_user: Optional[User] = None):
     """Взять задание на проверку (назначить себя редактором)"""
     logger.info(f"Пользователь {callback.from_user.id} нажал 'Взять в проверку'")
 
     message_id = callback.message.message_id
-    users = await User.find(telegram_id=callback.from_user.id)
-    user = users[0] if users else None
+    user = db_user or await User.by_telegram(callback.from_user.id)
 
     if not user:
         await callback.answer(
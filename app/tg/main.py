@@ -1,10 +1,12 @@
 import asyncio
-from typing import Optional
+from typing import Optional, Union
 from aiogram import Bot, Dispatcher
 from aiogram.types import Message
+from aiogram.exceptions import TelegramRetryAfter
 from tg.oms.utils import list_to_inline
-from tg.oms import scene_manager
+from tg.oms import scene_manager, scene_store
 from modules.exec.executor import BaseExecutor
+from modules.file_utils import extract_file_info_from_telegram_message
 from modules.logs import logger
 from models.Scene import Scene as SceneModel
 
@@ -17,11 +19,18 @@ class TelegramExecutor(BaseExecutor):
         self.bot: Bot = Bot(
             token=self.token) if self.token else None # type: ignore
         self.dp: Dispatcher = Dispatcher()
+        # Через сколько секунд простоя выгружать сцену из памяти (None — не выгружать)
+        self.scene_idle_ttl: Optional[float] = config.get("scene_idle_ttl")
 
     def setup_handlers(self):
         """Настройка обработчиков"""
         import tg.handlers
         from .oms import register_handlers
+        from .middlewares.user_middleware import UserMiddleware
+
+        # Пользователь из БД загружается один раз на апдейт
+        self.dp.message.outer_middleware(UserMiddleware())
+        self.dp.callback_query.outer_middleware(UserMiddleware())
 
         register_handlers(self.dp)
 
@@ -46,6 +55,8 @@ class TelegramExecutor(BaseExecutor):
                     parse_mode=parse_mode
                                                  )
             return {"success": True, "message_id": result.message_id}
+        except TelegramRetryAfter as e:
+            return {"success": False, "error": str(e), "retry_after": e.retry_after}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
@@ -97,6 +108,12 @@ class TelegramExecutor(BaseExecutor):
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    @staticmethod
+    def _media_file_id(message) -> Optional[str]:
+        """file_id отправленного медиа — для повторной отправки без загрузки байтов."""
+        info = extract_file_info_from_telegram_message(message) if message else None
+        return info['file_id'] if info else None
+
     async def send_photo(self, 
                          chat_id: str,
                          photo: str,
@@ -140,14 +157,15 @@ class TelegramExecutor(BaseExecutor):
                 reply_to_message_id=reply_to_message_id,
                 has_spoiler=has_spoiler
             )
-            return {"success": True, "message_id": result.message_id}
+            return {"success": True, "message_id": result.message_id,
+                    "file_id": self._media_file_id(result)}
         except Exception as e:
             logger.error(f"Error sending photo: {e}")
             return {"success": False, "error": str(e)}
 
     async def send_video(self, 
                          chat_id: str,
-                         video: bytes,
+                         video: Union[bytes, str],
                          caption: Optional[str] = None,
                          parse_mode: Optional[str] = 'HTML',
                          list_markup: Optional[list] = None,
@@ -161,7 +179,7 @@ class TelegramExecutor(BaseExecutor):
         
         Args:
             chat_id: ID чата
-            video: bytes данные видео
+            video: bytes данные видео, file_id или InputFile
             caption: Подпись
             parse_mode: Режим парсинга
             list_markup: Кнопки
@@ -175,7 +193,9 @@ class TelegramExecutor(BaseExecutor):
             markup = reply_markup
         
         try:
-            video_input = BufferedInputFile(video, filename="video.mp4")
+            video_input = video
+            if isinstance(video, bytes):
+                video_input = BufferedInputFile(video, filename="video.mp4")
             
             result = await self.bot.send_video(
                 chat_id=chat_id,
@@ -186,7 +206,8 @@ class TelegramExecutor(BaseExecutor):
                 reply_to_message_id=reply_to_message_id,
                 has_spoiler=has_spoiler
             )
-            return {"success": True, "message_id": result.message_id}
+            return {"success": True, "message_id": result.message_id,
+                    "file_id": self._media_file_id(result)}
         except Exception as e:
             logger.error(f"Error sending video: {e}")
             return {"success": False, "error": str(e)}
@@ -254,22 +275,27 @@ class TelegramExecutor(BaseExecutor):
 
         Args:
             chat_id: ID чата
-            media: Список bytes данных, словарей с file_id или dict с {data, type, name, hide | has_spoiler}
+            media: Список bytes данных, словарей с file_id или dict с {data, type, name, hide | has_spoiler}.
+                Если в dict есть ``tg_file_id`` — отправляется он вместо байтов;
+                при ``data=None`` и ``path`` файл читается с диска (FSInputFile).
             caption: Подпись (применяется к первому элементу)
             parse_mode: Режим парсинга
             reply_to_message_id: ID сообщения для ответа
             reply_markup: InlineKeyboardMarkup или None — будет применён к первому сообщению
         """
-        from aiogram.types import InputMediaPhoto, InputMediaVideo, BufferedInputFile
+        from aiogram.types import InputMediaPhoto, InputMediaVideo, BufferedInputFile, FSInputFile
         
         try:
             media_group = []
+            # Индексы media, попавших в группу (для сопоставления file_ids)
+            sent_indexes = []
             for idx, item in enumerate(media):
                 # Подпись только для первого элемента
                 item_caption = caption if idx == 0 else None
                 item_parse_mode = parse_mode if idx == 0 else None
                 
                 # Определяем тип данных
+                sent_indexes.append(idx)
                 if isinstance(item, bytes):
                     # bytes данные - конвертируем в BufferedInputFile (как фото по умолчанию)
                     photo_input = BufferedInputFile(item, filename=f"photo_{idx}.png")
@@ -282,12 +308,23 @@ class TelegramExecutor(BaseExecutor):
                     # Новый формат: {data: bytes, type: str, name: str}
                     if 'data' in item and 'type' in item:
                         file_data = item['data']
+                        file_path = item.get('path')
                         file_type = item['type']
                         file_name = item.get('name', f"file_{idx}")
                         has_spoiler = item.get('hide', False) or item.get('has_spoiler', False)
                         
-                        if file_type == 'photo':
+                        # Уже загруженный в Telegram файл отправляем по file_id
+                        cached_id = item.get('tg_file_id')
+
+                        if cached_id:
+                            media_input = cached_id
+                        elif file_data is None and file_path:
+                            # Крупный файл — отправляется с диска потоком
+                            media_input = FSInputFile(file_path, filename=file_name)
+                        else:
                             media_input = BufferedInputFile(file_data, filename=file_name)
+
+                        if file_type == 'photo':
                             media_group.append(InputMediaPhoto(
                                 media=media_input,
                                 caption=item_caption,
@@ -295,7 +332,6 @@ class TelegramExecutor(BaseExecutor):
                                 has_spoiler=has_spoiler
                             ))
                         elif file_type == 'video':
-                            media_input = BufferedInputFile(file_data, filename=file_name)
                             media_group.append(InputMediaVideo(
                                 media=media_input,
                                 caption=item_caption,
@@ -305,11 +341,13 @@ class TelegramExecutor(BaseExecutor):
                         else:
                             # Неизвестный тип - пропускаем в media group
                             logger.warning(f"Unsupported media type in group: {file_type}")
+                            sent_indexes.pop()
                             continue
                     else:
                         # Старый формат: словарь с file_id
                         file_id = item.get('file_id')
                         if not file_id:
+                            sent_indexes.pop()
                             continue
                         media_group.append(InputMediaPhoto(
                             media=file_id,
@@ -348,11 +386,18 @@ class TelegramExecutor(BaseExecutor):
             # Возвращаем ID первого сообщения и список всех ID
             first_message_id = result[0].message_id if result else None
             all_message_ids = [msg.message_id for msg in result] if result else []
+
+            # file_ids в порядке входного media (None для пропущенных элементов)
+            file_ids = [None] * len(media)
+            for idx, msg in zip(sent_indexes, result or []):
+                file_ids[idx] = self._media_file_id(msg)
+
             return {
                 "success": True, 
                 "message_id": first_message_id, 
                 "message_ids": all_message_ids,
-                "messages_count": len(result)
+                "messages_count": len(result),
+                "file_ids": file_ids
             }
         except Exception as e:
             logger.error(f"Error sending media group: {e}")
@@ -361,27 +406,29 @@ class TelegramExecutor(BaseExecutor):
     async def start_polling(self):
         """Запустить пуллинг"""
         self.setup_handlers()
-        
-        all_scenes = await SceneModel.all_scenes()
 
-        for scene_data in all_scenes:
+        # Сцены восстанавливаются из БД лениво, при первом апдейте пользователя
+        scene_manager.set_loader(SceneModel.load_scene)
 
-            scene_manager.load_scene_from_db(
-                user_id=scene_data['user_id'],
-                scene_path=scene_data['scene_path'],
-                page=scene_data['page'],
-                message_id=scene_data['message_id'],
-                data=scene_data['data'],
-                bot_instance=self.bot,
-                update_message=True
+        eviction_task = None
+        if self.scene_idle_ttl:
+            eviction_task = asyncio.create_task(
+                scene_manager.run_eviction(self.scene_idle_ttl)
             )
 
-        while self.is_running:
-            try:
-                await self.dp.start_polling(self.bot)
-            except Exception as e:
-                print(f"TG Polling error: {e}")
-                await asyncio.sleep(5)
+        # Отложенная запись сцен в БД; при остановке оставшиеся изменения сбрасываются
+        scene_store.start()
+        try:
+            while self.is_running:
+                try:
+                    await self.dp.start_polling(self.bot)
+                except Exception as e:
+                    print(f"TG Polling error: {e}")
+                    await asyncio.sleep(5)
+        finally:
+            if eviction_task is not None:
+                eviction_task.cancel()
+            await scene_store.stop()
 
     def is_available(self) -> bool:
         """Проверить доступность"""
@@ -0,0 +1,28 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from modules.user_cache import user_cache
+from modules.utils import remember_telegram_user
+
+
+class UserMiddleware(BaseMiddleware):
+    """ Кладёт пользователя из БД в данные обработчика под ключом ``db_user``.
+
+        Пользователь берётся из :data:`modules.user_cache.user_cache`,
+        поэтому фильтры и обработчики одного апдейта делят один запрос.
+        Заодно обновляет кэш профилей Telegram (имя и username отправителя).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user = data.get('event_from_user')
+        if from_user:
+            remember_telegram_user(from_user)
+        data['db_user'] = await user_cache.get(from_user.id) if from_user else None
+        return await handler(event, data)
@@ -1,11 +1,12 @@
 from .manager import scene_manager
+from .scene_store import scene_store
 from .models.json_scene import SceneModel, scenes_loader
 from .models.scene import Scene
 from .models.page import Page
 from .oms_handler import register_handlers
 
 __all__ = [
-    'scene_manager',
+    'scene_manager', 'scene_store',
     'SceneModel', 'scenes_loader',
     'Scene', 'Page', 
     'register_handlers',
@@ -3,7 +3,7 @@ from tg.oms import Page
 from models.Card import Card
 from models.User import User
 from uuid import UUID as _UUID
-from modules.utils import get_telegram_user, get_user_display_name
+from modules.utils import get_bot_me, get_telegram_user, get_user_display_name
 from tg.scenes.constants import ROLE_ICONS
 
 
@@ -29,7 +29,7 @@ class ContactPage(Page):
         card = await self._get_task_data()
         task_name = card.get('name', 'задаче') if card else 'задаче'
 
-        bot_username = (await self.scene.bot.get_me()).username
+        bot_username = (await get_bot_me(self.scene.bot)).username
         view_link = f't.me/{bot_username}?start=type-open-view_id-{card["card_id"]}'
 
         contacts = []
@@ -3,12 +3,10 @@ from typing import Optional, Callable
 
 
 async def _get_tags_options() -> dict:
-    """Загружает теги из БД, при отсутствии — из settings.json."""
+    """Теги ``{key: name}`` в порядке ``order`` (из кэша справочника тегов)."""
 
-    from models.Tag import Tag
-    db_tags = [t.to_dict() for t in await Tag.all_sorted()]
-
-    return {t['key']: t['name'] for t in db_tags}
+    from modules.tag_cache import tag_cache
+    return dict((await tag_cache.get()).names)
 
 
 
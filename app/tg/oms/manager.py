@@ -1,5 +1,6 @@
 import asyncio
-from typing import Optional, Type, TYPE_CHECKING
+import time
+from typing import Callable, Optional, Type, TYPE_CHECKING
 from aiogram import Bot
 from .utils import str_to_func
 import copy
@@ -10,11 +11,124 @@ if TYPE_CHECKING:
 class SceneManager:
     _instances = {}
 
+    # Функция загрузки сцены из БД для ленивого восстановления
+    # В функцию передаёт user_id: int, вернуть должна dict или None
+    _loader: Optional[Callable] = None
+
+    # Пользователи, для которых БД уже проверена в этом процессе
+    _checked: set[int] = set()
+    # Идущие загрузки, чтобы параллельные апдейты не грузили сцену дважды
+    _loading: dict[int, asyncio.Task] = {}
+    # Время последнего обращения к сцене (time.monotonic)
+    _last_access: dict[int, float] = {}
+
+    # Ключи данных сцены, по которым строится индекс для рассылки обновлений
+    WATCHED_KEYS: tuple[str, ...] = ('task_id', 'selected_task')
+
+    # Вторичные индексы: имя сцены / страница / (ключ, значение) -> user_id
+    _by_scene: dict[str, set[int]] = {}
+    _by_page: dict[str, set[int]] = {}
+    _by_data: dict[tuple[str, str], set[int]] = {}
+    # Текущие ключи индекса для каждого пользователя
+    _index_keys: dict[int, tuple] = {}
+
     @classmethod
     def get_scene(cls, user_id: int) -> Optional['Scene']:
         if not cls.has_scene(user_id): return None
+        cls._last_access[user_id] = time.monotonic()
         return cls._instances[user_id]
 
+    @classmethod
+    def set_loader(cls, load_function: Optional[Callable]):
+        """ Установить функцию загрузки сцены из БД.
+            Сцены восстанавливаются при первом обращении пользователя
+            (см. :meth:`ensure_loaded`), а не при старте бота.
+        """
+        cls._loader = load_function
+        cls._checked.clear()
+
+    @classmethod
+    async def ensure_loaded(cls, user_id: int,
+                            bot_instance: 'Bot') -> Optional['Scene']:
+        """ Вернуть сцену пользователя, при необходимости восстановив её из БД.
+            БД проверяется не больше одного раза на пользователя.
+        """
+        if user_id in cls._instances:
+            return cls.get_scene(user_id)
+
+        if user_id in cls._loading:
+            await asyncio.shield(cls._loading[user_id])
+            return cls.get_scene(user_id)
+
+        if cls._loader is None or user_id in cls._checked:
+            return None
+
+        cls._checked.add(user_id)
+        task = asyncio.create_task(cls._load(user_id, bot_instance))
+        cls._loading[user_id] = task
+        try:
+            await asyncio.shield(task)
+        finally:
+            cls._loading.pop(user_id, None)
+        return cls.get_scene(user_id)
+
+    @classmethod
+    async def _load(cls, user_id: int, bot_instance: 'Bot'):
+        try:
+            data = await cls._loader(user_id=user_id)
+            if not data or user_id in cls._instances:
+                return
+
+            cls.load_scene_from_db(
+                user_id=user_id,
+                scene_path=data['scene_path'],
+                page=data['page'],
+                message_id=data['message_id'],
+                data=data['data'],
+                bot_instance=bot_instance
+            )
+        except Exception as e:
+            # Позволяем повторить попытку при следующем обращении
+            cls._checked.discard(user_id)
+            print(f"OMS: Ошибка восстановления сцены {user_id}: {e}")
+
+    @classmethod
+    async def evict_idle(cls, ttl: float) -> int:
+        """ Выгрузить из памяти сцены, к которым не обращались ``ttl`` секунд.
+            Перед выгрузкой несохранённые изменения записываются в БД,
+            при следующем обращении сцена будет восстановлена заново.
+        """
+        from .scene_store import scene_store
+
+        now = time.monotonic()
+        idle = [
+            user_id for user_id in cls._instances
+            if now - cls._last_access.get(user_id, now) >= ttl
+        ]
+        if not idle:
+            return 0
+
+        await scene_store.flush()
+        for user_id in idle:
+            cls._instances.pop(user_id, None)
+            cls._last_access.pop(user_id, None)
+            cls._checked.discard(user_id)
+            cls._unindex(user_id)
+        return len(idle)
+
+    @classmethod
+    async def run_eviction(cls, ttl: float, interval: float = 60):
+        """ Цикл периодической выгрузки простаивающих сцен.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                evicted = await cls.evict_idle(ttl)
+                if evicted:
+                    print(f"OMS: Выгружено {evicted} неактивных сцен")
+            except Exception as e:
+                print(f"OMS: Ошибка выгрузки сцен: {e}")
+
     @classmethod
     def create_scene(cls, user_id: int, 
                      scene_class: Type['Scene'],
@@ -23,12 +137,17 @@ class SceneManager:
         if user_id in cls._instances:
             raise ValueError(f"Сцена для пользователя {user_id} уже существует")
         cls._instances[user_id] = scene_class(user_id, bot_instance)
+        cls._checked.add(user_id)
+        cls._last_access[user_id] = time.monotonic()
+        cls.reindex(cls._instances[user_id])
         return cls._instances[user_id]
 
     @classmethod
     def remove_scene(cls, user_id: int):
         if user_id in cls._instances:
             del cls._instances[user_id]
+        cls._last_access.pop(user_id, None)
+        cls._unindex(user_id)
 
     @classmethod
     def has_scene(cls, user_id: int) -> bool:
@@ -62,6 +181,9 @@ class SceneManager:
             'message_id': message_id,
             'data': copy.deepcopy(data)
         })
+        cls._checked.add(user_id)
+        cls._last_access[user_id] = time.monotonic()
+        cls.reindex(cls._instances[user_id])
 
         if update_message:
             asyncio.create_task(
@@ -70,6 +192,101 @@ class SceneManager:
 
         return cls._instances[user_id]
 
+    # ===== Индексы =====
+
+    @classmethod
+    def reindex(cls, scene: 'Scene'):
+        """ Обновить вторичные индексы для сцены.
+            Вызывается при создании, загрузке и сохранении сцены.
+        """
+        user_id = scene.user_id
+        if cls._instances.get(user_id) is not scene:
+            return
+
+        scene_data = scene.data.get('scene', {}) if isinstance(scene.data, dict) else {}
+        data_keys = tuple(
+            (key, str(scene_data[key]))
+            for key in cls.WATCHED_KEYS
+            if scene_data.get(key) is not None
+        )
+        keys = (scene.__scene_name__, scene.page, data_keys)
+
+        if cls._index_keys.get(user_id) == keys:
+            return
+
+        cls._unindex(user_id)
+        cls._index_keys[user_id] = keys
+        cls._by_scene.setdefault(keys[0], set()).add(user_id)
+        cls._by_page.setdefault(keys[1], set()).add(user_id)
+        for data_key in data_keys:
+            cls._by_data.setdefault(data_key, set()).add(user_id)
+
+    @classmethod
+    def _unindex(cls, user_id: int):
+        keys = cls._index_keys.pop(user_id, None)
+        if not keys:
+            return
+
+        scene_name, page, data_keys = keys
+        for index, key in ((cls._by_scene, scene_name), (cls._by_page, page)):
+            users = index.get(key)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del index[key]
+        for data_key in data_keys:
+            users = cls._by_data.get(data_key)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del cls._by_data[data_key]
+
+    @classmethod
+    def find_scenes(cls,
+                    scene_name: Optional[str] = None,
+                    page_name: Optional[str] = None,
+                    data_key: Optional[str] = None,
+                    data_value: Optional[str] = None,
+                    users_id: Optional[list[int]] = None
+                    ) -> list['Scene']:
+        """ Найти активные сцены по параметрам через индексы.
+            Кандидаты берутся из самого узкого индекса и проверяются
+            по фактическому состоянию сцены.
+        """
+        candidates: list[set[int]] = []
+        if users_id:
+            candidates.append(set(users_id))
+        if scene_name:
+            candidates.append(cls._by_scene.get(scene_name, set()))
+        if page_name:
+            candidates.append(cls._by_page.get(page_name, set()))
+        if data_key and data_value and data_key in cls.WATCHED_KEYS:
+            candidates.append(cls._by_data.get((data_key, str(data_value)), set()))
+
+        if candidates:
+            user_ids = min(candidates, key=len)
+        else:
+            user_ids = cls._instances.keys()
+
+        results = []
+        for user_id in list(user_ids):
+            scene = cls._instances.get(user_id)
+            if scene is None:
+                continue
+            if scene_name and scene.__scene_name__ != scene_name:
+                continue
+            if page_name and scene.page != page_name:
+                continue
+            if data_key and data_value:
+                scene_value = scene.data.get('scene', {}).get(data_key)
+                if str(scene_value) != str(data_value):
+                    continue
+            if users_id and user_id not in users_id:
+                continue
+            results.append(scene)
+
+        return results
+
     @classmethod
     def get_for_params(cls, 
                        scene: Optional[str], 
@@ -77,23 +294,9 @@ class SceneManager:
                        ) -> list['Scene']:
         """ Получение всех сцен, соответствующих параметрам.
         """
-        results = []
-        for user_id, instance in cls._instances.items():
-            instance: 'Scene'
-
-            page_name: str = instance.current_page.__page_name__
-
-            if scene and page:
-                if instance.__scene_name__ == scene and page_name == page:
-                    results.append(instance)
-            elif scene:
-                if instance.__scene_name__ == scene:
-                    results.append(instance)
-            elif page:
-                if page_name == page:
-                    results.append(instance)
-
-        return results
+        if not scene and not page:
+            return []
+        return cls.find_scenes(scene_name=scene, page_name=page)
 
 
 scene_manager = SceneManager()
\ No newline at end of file
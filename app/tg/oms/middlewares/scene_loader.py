@@ -0,0 +1,28 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from ..manager import scene_manager
+
+
+class SceneLoaderMiddleware(BaseMiddleware):
+    """ Восстанавливает сцену пользователя из БД при первом его апдейте.
+
+        Работает до фильтров, поэтому ``InScene`` и обработчики видят
+        сцену так же, как если бы она была загружена при старте бота.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = getattr(event, 'from_user', None)
+        bot = data.get('bot')
+
+        if user is not None and bot is not None:
+            await scene_manager.ensure_loaded(user.id, bot)
+
+        return await handler(event, data)
@@ -6,6 +6,7 @@ from aiogram.types import Message, CallbackQuery, InputMediaPhoto
 from ..fast_page import fast_page
 from ..utils import list_to_inline, callback_generator, func_to_str, prepare_image
 from ..manager import scene_manager
+from ..scene_store import scene_store
 from .json_scene import scenes_loader, SceneModel
 from .page import Page
 import copy
@@ -28,6 +29,11 @@ class Scene:
     # В функцию передаёт user_id: int, data: dict
     __update_function__: Optional[Callable] = None
 
+    # Функция для пакетного обновления сцен в БД (write-behind)
+    # В функцию передаёт items: list[dict]
+    # Если указана, save_to_db только помечает сцену, а запись делает scene_store
+    __bulk_update_function__: Optional[Callable] = None
+
     # Функция для удаления сцены из БД
     # В функцию передаёт user_id: int
     __delete_function__: Optional[Callable] = None
@@ -388,9 +394,15 @@ class Scene:
         # caller = stack[-2]
         # print(f"[save_to_db] Вызовов из: {caller.filename}:{caller.lineno} в {caller.name}")
         
+        scene_manager.reindex(self)
+
         if not self.__insert_function__ or not self.__update_function__:
             return False
 
+        if self.__bulk_update_function__:
+            scene_store.mark_dirty(self)
+            return True
+
         if self.__update_function__:
             await self.__update_function__(user_id=self.user_id, data=self.data_to_save())
         return True
@@ -400,6 +412,9 @@ class Scene:
         if not self.__load_function__:
             return False
 
+        if scene_store.is_dirty(self.user_id):
+            await scene_store.flush()
+
         data = await self.__load_function__(user_id=self.user_id)
         if not data:
             return False
@@ -494,5 +509,6 @@ class Scene:
         except Exception as e: pass
 
         scene_manager.remove_scene(self.user_id)
+        await scene_store.discard(self.user_id)
         if self.__delete_function__:
             await self.__delete_function__(self.user_id)
\ No newline at end of file
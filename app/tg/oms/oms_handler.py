@@ -7,11 +7,16 @@ from .manager import scene_manager
 from aiogram import F, Router
 from logging import getLogger
 from .filters.scene_filter import InScene
+from .middlewares.scene_loader import SceneLoaderMiddleware
 
 logger = getLogger(__name__)
 
 def register_handlers(router: Union[Router, Dispatcher]):
 
+    # Ленивое восстановление сцен из БД при первом апдейте пользователя
+    router.message.outer_middleware(SceneLoaderMiddleware())
+    router.callback_query.outer_middleware(SceneLoaderMiddleware())
+
     @router.message(InScene(), F.photo)
     async def on_photo_message(message: Message):
         """Обработчик фото-сообщений в сцене"""
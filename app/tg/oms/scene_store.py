@@ -0,0 +1,98 @@
+import asyncio
+from typing import Callable, Optional, TYPE_CHECKING
+
+from .manager import scene_manager
+
+if TYPE_CHECKING:
+    from oms import Scene
+
+
+class SceneStore:
+    """ Отложенная (write-behind) запись сцен в БД.
+
+        Вместо записи при каждом изменении ключа сцена помечается как
+        изменённая. Раз в ``flush_interval`` секунд (а также при
+        остановке) все изменённые сцены записываются одним пакетом
+        через ``__bulk_update_function__`` класса сцены.
+    """
+
+    def __init__(self, flush_interval: float = 2.0):
+        self.flush_interval = flush_interval
+        self._dirty: dict[int, 'Scene'] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_dirty(self, scene: 'Scene') -> None:
+        """ Пометить сцену для записи при следующем сбросе.
+            Сцены, уже удалённые из менеджера, игнорируются.
+        """
+        if scene_manager.get_scene(scene.user_id) is not scene:
+            return
+        self._dirty[scene.user_id] = scene
+
+    def is_dirty(self, user_id: int) -> bool:
+        return user_id in self._dirty
+
+    async def discard(self, user_id: int) -> None:
+        """ Убрать сцену из очереди записи.
+            Дожидается текущего сброса, чтобы он не восстановил
+            удаляемую запись.
+        """
+        async with self._lock:
+            self._dirty.pop(user_id, None)
+
+    async def flush(self) -> int:
+        """ Записать все изменённые сцены.
+            Возвращает количество записанных сцен.
+        """
+        async with self._lock:
+            if not self._dirty:
+                return 0
+
+            dirty, self._dirty = self._dirty, {}
+
+            groups: dict[Callable, list['Scene']] = {}
+            for scene in dirty.values():
+                groups.setdefault(
+                    scene.__bulk_update_function__, []).append(scene)
+
+            written = 0
+            for bulk_function, scenes in groups.items():
+                try:
+                    await bulk_function(
+                        items=[scene.data_to_save() for scene in scenes]
+                    )
+                    written += len(scenes)
+                except Exception as e:
+                    print(f"OMS: Ошибка пакетной записи сцен: {e}")
+                    # Возвращаем сцены в очередь, если их не изменили заново
+                    for scene in scenes:
+                        self._dirty.setdefault(scene.user_id, scene)
+
+            return written
+
+    async def run(self):
+        """ Цикл периодического сброса.
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            pass
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """ Остановить цикл и записать оставшиеся сцены.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+scene_store = SceneStore()
@@ -74,7 +74,7 @@ class AIParserPage(Page):
     async def handle_text_input(self, message, value: str):
         """Отправка введённого текста на парсинг AI (fire-and-forget).
 
-        Результат придёт в `/events/ai_callback` и будет обработан методом `on_ai_parsed_result`.
+        Результат придёт через шлюз :mod:`modules.ai` в метод `on_ai_parsed_result`.
         """
         # Сбрасываем старые результаты и ставим индикатор загрузки
         await self.update_data('parsed_data', None)
@@ -87,7 +87,7 @@ class AIParserPage(Page):
         asyncio.create_task(self._send_parse_request(value))
 
     async def _send_parse_request(self, text: str):
-        """Отправляет текст на парсинг в brain-api с callback-метаданными."""
+        """Отправляет текст на парсинг в AI-шлюз с callback-метаданными."""
         current_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
         from modules.utils import get_tags_map
@@ -118,9 +118,14 @@ class AIParserPage(Page):
             }
         }
 
+        from modules import ai as ai_module
         try:
-            from modules import ai as ai_module
+            # Ответ придёт в on_ai_parsed_result
             await ai_module.send(payload)
+        except ai_module.AIRateLimited as e:
+            await self.update_data('parse_error', f'⏳ **{e}**')
+            await self.update_data('is_loading', False)
+            await self.scene.update_message()
         except Exception as e:
             logger.error(f"Exception while sending AI parse request for user {self.scene.user_id}: {e}")
             await self.update_data('parse_error', '❌ **Ошибка при отправке запроса в AI. Попробуйте позже.**')
@@ -7,8 +7,8 @@ from modules.file_utils import (
     generate_unique_filename,
     is_image_by_mime_or_extension,
     download_telegram_file,
-    convert_image_to_png
 )
+from modules.image_pool import image_pool
 
 
 class FilesPage(Page):
@@ -288,8 +288,8 @@ class FilesPage(Page):
                                 except: pass
                             return
 
-                        # Конвертируем в PNG
-                        png_data = convert_image_to_png(raw_data)
+                        # Конвертируем в PNG в пуле процессов, не блокируя бота
+                        png_data = await image_pool.convert_to_png(raw_data)
 
                         # Отправляем как фото и получаем file_id
                         if file_name_orig:
@@ -1,9 +1,10 @@
 from datetime import datetime
 from tg.oms.utils import callback_generator
 from tg.oms import Page
-from models.User import User
+from modules.user_cache import user_cache
 from models.CardFile import CardFile
 from modules.card import card_service
+from modules.utils import get_bot_me
 from uuid import UUID as _UUID
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
@@ -125,8 +126,8 @@ class FinishPage(Page):
         self.creating = True
         await self.scene.update_message()
 
-        customers = await User.find(telegram_id=self.scene.user_id)
-        customer_id = customers[0].user_id if customers else None
+        customer = await user_cache.get(self.scene.user_id)
+        customer_id = customer.user_id if customer else None
 
         try:
             if self._task_flow():
@@ -186,7 +187,7 @@ class FinishPage(Page):
 
         await self.scene.end()
 
-        bot_username = (await self.scene.__bot__.get_me()).username
+        bot_username = (await get_bot_me(self.scene.__bot__)).username
         msg = (
             f'✅ Задание *«{task_data["name"]}»* создано\n'
             f'📮 Постов создано: {len(created_cards)} из {len(cards_data)}\n'
@@ -243,7 +244,7 @@ class FinishPage(Page):
 
         await self.scene.end()
 
-        bot_username = (await self.scene.__bot__.get_me()).username
+        bot_username = (await get_bot_me(self.scene.__bot__)).username
         view_link = f'https://t.me/{bot_username}?start=type-open-view_id-{card_id}'
         markup = InlineKeyboardMarkup(inline_keyboard=[[
             InlineKeyboardButton(text='Просмотреть задачу', url=view_link)
@@ -7,7 +7,7 @@ class AICheckPage(Page):
 
     __page_name__ = 'ai-check'
 
-    # Функция, вызываемая при получении результата от AI через events/ai_callback
+    # Функция, вызываемая при получении результата от AI (modules.ai.send)
     async def on_ai_result(self, result: str):
         """Обработка результата от AI: сохраняем ответ, снимаем индикатор загрузки и обновляем страницу."""
         try:
@@ -49,14 +49,18 @@ class AICheckPage(Page):
             await self.scene.update_key(
                 self.__page_name__, 'checked_content', content)
 
-            # Отправляем запрос к AI в фоне — результат придёт в /events/ai_callback
-            asyncio.create_task(self._send_ai_request(content))
+            # Отправляем запрос к AI в фоне — результат придёт в on_ai_result
+            fresh = bool(page_data.get('fresh'))
+            if fresh:
+                await self.scene.update_key(self.__page_name__, 'fresh', False)
+            asyncio.create_task(self._send_ai_request(content, fresh=fresh))
 
-    async def _send_ai_request(self, content: str):
-        """Отправляет запрос к AI-сервису асинхронно (fire-and-forget).
+    async def _send_ai_request(self, content: str, fresh: bool = False):
+        """Отправляет запрос к AI-шлюзу (фоновая задача).
 
         Включает в payload callback-метаданные (user_id, scene, page и имя функции),
-        чтобы AI-сервис мог POST-ить результат в `/events/ai_callback`.
+        по которым шлюз передаёт результат в `on_ai_result`.
+        ``fresh`` — не брать ответ из кэша (перепроверка).
         """
         prompt = (
             "Проверь следующий текст на ошибки (орфографические, пунктуационные, стилистические).\n"
@@ -77,6 +81,7 @@ class AICheckPage(Page):
 
         payload = {
             'prompt': prompt,
+            'fresh': fresh,
             'callback': {
                 'user_id': self.scene.user_id,
                 'scene': self.scene.__scene_name__,
@@ -85,10 +90,12 @@ class AICheckPage(Page):
             }
         }
 
+        from modules import ai as ai_module
         try:
-            # Отправляем запрос и логируем, но не блокируем основной flow (это фоновой таск)
-            from modules import ai as ai_module
-            ai_module.send(payload)
+            # Фоновая задача: ожидание ответа не блокирует основной flow
+            await ai_module.send(payload)
+        except ai_module.AIRateLimited as e:
+            await self.on_ai_result(f'⏳ **{e}**')
         except Exception as e:
             logger.error(f"Exception while sending AI request for user {self.scene.user_id}: {e}")
             try:
@@ -154,6 +161,9 @@ class AICheckPage(Page):
             self.__page_name__, 'is_loading', False)
         await self.scene.update_key(
             self.__page_name__, 'checked_content', None)
+        # Повторная проверка не берёт ответ из кэша
+        await self.scene.update_key(
+            self.__page_name__, 'fresh', True)
 
         # Обновляем страницу (это запустит новую проверку)
         await self.scene.update_page(self.__page_name__)
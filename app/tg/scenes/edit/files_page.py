@@ -1,15 +1,19 @@
 """
 Страница для просмотра и выбора файлов карточки (упрощённая версия)
 """
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, Message, BufferedInputFile
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, Message, FSInputFile, BufferedInputFile
 from tg.oms import Page
 from models.Card import Card
 from models.CardFile import CardFile
 from modules.logs import logger
-from modules.file_utils import download_telegram_file, is_image_by_mime_or_extension, is_video_by_mime_or_extension, detect_file_type_by_bytes, convert_image_to_png
-from modules.storage import download_file as _dl_storage
+from modules.file_utils import download_telegram_file, stream_telegram_file, is_image_by_mime_or_extension, is_video_by_mime_or_extension, detect_file_type_by_bytes
+from modules.image_pool import image_pool
+from modules.storage import get_file_path as _storage_path, read_header as _storage_header
 from uuid import UUID as _UUID
 
+# Фото больше этого размера показываются уменьшенным превью
+PREVIEW_FROM_BYTES = 2 * 1024 * 1024
+
 
 class FilesPage(Page):
     __page_name__ = 'files-view'
@@ -157,9 +161,11 @@ class FilesPage(Page):
         
         try:
             cf = await CardFile.get_by_id(_UUID(str(fid)))
-            file_data, status = (await _dl_storage(cf.filename)) if cf else (None, 404)
-            if status != 200 or not isinstance(file_data, bytes):
+            file_path, status = _storage_path(cf.filename) if cf else (None, 404)
+            if status != 200:
                 return await callback.answer('❌ Ошибка при загрузке файла')
+            # Для определения типа достаточно заголовка, файл отправляется с диска
+            file_data = await _storage_header(cf.filename)
 
             toggle_action = 'toggle_remove' if is_selected else 'toggle_add'
             toggle_text = '❌ Убрать из выбранных' if is_selected else '✅ Добавить к выбранным'
@@ -235,14 +241,22 @@ class FilesPage(Page):
                         fname = 'preview.mp4'
 
                 await callback.message.answer_video(
-                    video=BufferedInputFile(file_data, filename=fname),
+                    video=FSInputFile(file_path, filename=fname),
                     caption=caption_text,
                     reply_markup=keyboard,
                     has_spoiler=is_hidden
                 )
             else:
+                photo = FSInputFile(file_path, filename='preview.png')
+                if file_path.stat().st_size > PREVIEW_FROM_BYTES:
+                    try:
+                        photo = BufferedInputFile(
+                            await image_pool.thumbnail(file_path), filename='preview.jpg')
+                    except Exception as e:
+                        logger.warning(f'Preview thumbnail failed: {e}')
+
                 await callback.message.answer_photo(
-                    photo=BufferedInputFile(file_data, filename='preview.png'),
+                    photo=photo,
                     caption=caption_text,
                     reply_markup=keyboard,
                     has_spoiler=is_hidden
@@ -311,21 +325,30 @@ class FilesPage(Page):
         card = await self._card()
         if not card or not card.get('card_id'):
             return await message.answer('❌ Карточка не найдена')
-        data = await download_telegram_file(self.scene.__bot__, file_id)
-        if not data:
-            return await message.answer('❌ Не удалось скачать файл')
-        try:
-            converted = convert_image_to_png(data) if is_image_by_mime_or_extension(mime, filename) else data
-        except Exception:
-            converted = data
-    
-        content_type = 'image/png' if is_image_by_mime_or_extension(mime, filename) else (mime or 'application/octet-stream')
-        res = await CardFile.upload(
-            card_id=card.get('card_id'), 
-            file_data=converted,
-            filename=filename or 'file', 
-            content_type=content_type
-        )
+
+        if is_image_by_mime_or_extension(mime, filename):
+            data = await download_telegram_file(self.scene.__bot__, file_id)
+            if not data:
+                return await message.answer('❌ Не удалось скачать файл')
+            try:
+                converted = await image_pool.convert_to_png(data)
+            except Exception:
+                converted = data
+
+            res = await CardFile.upload(
+                card_id=card.get('card_id'), 
+                file_data=converted,
+                filename=filename or 'file', 
+                content_type='image/png'
+            )
+        else:
+            # Видео и документы пишутся в хранилище потоком, без чтения в память
+            res = await CardFile.upload_stream(
+                card_id=card.get('card_id'),
+                chunks=stream_telegram_file(self.scene.__bot__, file_id),
+                filename=filename or 'file',
+                content_type=mime or 'application/octet-stream'
+            )
 
         if res:
             msg = await message.answer('✅ Файл загружен')
@@ -1,6 +1,6 @@
 from tg.oms import Page
 from models.Card import Card
-from models.User import User
+from modules.user_cache import user_cache
 from modules.card import card_service
 from modules.enums import CardStatus
 from uuid import UUID as _UUID
@@ -94,9 +94,9 @@ class StatusSetterPage(Page):
         executor_id = card.get('executor_id')
 
         # Получаем информацию о пользователе
-        user_role = await User.role_for(self.scene.user_id)
-        users = await User.find(telegram_id=self.scene.user_id)
-        current_user_id = str(users[0].user_id) if users else None
+        user = await user_cache.get(self.scene.user_id)
+        user_role = user.role.value if user else None
+        current_user_id = str(user.user_id) if user else None
         
         # Флаги ролей
         is_admin = user_role == 'admin'
@@ -241,15 +241,11 @@ class StatusSetterPage(Page):
         set_executor = args[1] == 'set_executor'
 
         if task_id:
-            # Получаем роль пользователя
-            user_role = await User.role_for(self.scene.user_id)
+            # Получаем роль и user_id текущего пользователя
+            user = await user_cache.get(self.scene.user_id)
+            user_role = user.role.value if user else None
             who_changed = 'executor' if user_role == 'copywriter' else 'admin'
-
-            # Получаем user_id текущего пользователя
-            users = await User.find(telegram_id=self.scene.user_id)
-            executor_id = None
-            if users:
-                executor_id = str(users[0].user_id)
+            executor_id = str(user.user_id) if user else None
 
             logger.info(f"Пользователь {self.scene.user_id} перевел задачу {task_id} в статус 'В работе' (executor_id={executor_id})")
 
@@ -303,7 +299,7 @@ class StatusSetterPage(Page):
             logger.info(f"Пользователь {self.scene.user_id} завершил задачу {task_id} (статус 'Готова')")
             
             # Получаем роль пользователя
-            user_role = await User.role_for(self.scene.user_id)
+            user_role = await user_cache.role_for(self.scene.user_id)
             who_changed = 'executor' if user_role == 'copywriter' else 'admin'
             
             await card_service.change_card_status(
@@ -333,7 +329,7 @@ class StatusSetterPage(Page):
             logger.info(f"Пользователь {self.scene.user_id} завершил задачу {task_id} без отправки")
             
             # Получаем роль пользователя
-            user_role = await User.role_for(self.scene.user_id)
+            user_role = await user_cache.role_for(self.scene.user_id)
             who_changed = 'executor' if user_role == 'copywriter' else 'admin'
             
             # Устанавливаем need_send=False и сбрасываем send_time
@@ -367,7 +363,7 @@ class StatusSetterPage(Page):
             logger.info(f"Пользователь {self.scene.user_id} возвращает задачу {task_id} на форум")
             
             # Вызываем специальный эндпоинт для возврата на форум
-            user_role = await User.role_for(self.scene.user_id)
+            user_role = await user_cache.role_for(self.scene.user_id)
             who = 'executor' if user_role == 'copywriter' else 'admin'
 
             await card_service.change_card_status(
@@ -51,6 +51,7 @@ class TaskScene(Scene):
     __insert_function__ = staticmethod(SceneModel.insert_scene)
     __load_function__ = staticmethod(SceneModel.load_scene)
     __update_function__ = staticmethod(SceneModel.update_scene)
+    __bulk_update_function__ = staticmethod(SceneModel.bulk_upsert_scenes)
     __delete_function__ = staticmethod(SceneModel.delete_scene)
     
     def set_taskid(self, task_id: int):
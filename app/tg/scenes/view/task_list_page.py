@@ -3,6 +3,7 @@ from tg.oms import Page
 from tg.oms.utils import callback_generator
 from models.Card import Card
 from models.User import User
+from modules.user_cache import user_cache
 from uuid import UUID as _UUID
 from modules.enums import UserRole, CardStatus, Department
 from modules.utils import get_user_display_name
@@ -18,9 +19,18 @@ filter_names = {
     'by-department': 'По отделу'
 }
 
+# Показываем по 5 задач на страницу
+TASKS_PER_PAGE = 5
+
+
 class TaskListPage(Page):
     __page_name__ = 'task-list'
 
+    def __after_init__(self):
+        # Текущая страница живёт только на время отрисовки, в сцене — курсоры
+        self.page_tasks: list[dict] = []
+        self.total_tasks = 0
+
     async def data_preparate(self) -> None:
 
         selected_filter = self.scene.data['scene'].get('selected_filter')
@@ -48,9 +58,6 @@ class TaskListPage(Page):
     async def content_worker(self) -> str:
         self.clear_content()
 
-        tasks = self.scene.data['scene'].get(
-            'tasks', []
-        )
         selected_filter = self.scene.data['scene'].get(
             'selected_filter', ''
         )
@@ -58,11 +65,9 @@ class TaskListPage(Page):
             'current_page', 0
         )
 
-        # Показываем по 5 задач на страницу
-        tasks_per_page = 5
-        total_tasks = len(tasks)
-        start_index = current_page * tasks_per_page
-        end_index = min(start_index + tasks_per_page, total_tasks)
+        total_tasks = self.total_tasks
+        start_index = current_page * TASKS_PER_PAGE
+        end_index = start_index + len(self.page_tasks)
 
         # Формируем текст фильтра с дополнительной информацией
         selected_filter_text = filter_names.get(selected_filter, selected_filter)
@@ -93,128 +98,68 @@ class TaskListPage(Page):
         self.content = self.append_variables(**add_vars)
         return self.content
 
-    async def load_tasks(self):
-        """Загружает задачи в зависимости от фильтра и роли пользователя"""
-        telegram_id = self.scene.user_id
-        selected_filter = self.scene.data['scene'].get('selected_filter')
-        
-        # Получаем информацию о пользователе
-        users = await User.find(telegram_id=telegram_id)
-        if not users:
-            await self.scene.update_key('scene', 'tasks', [])
-            print(f"Failed to load user info for telegram_id {telegram_id}")
-            return
+    def _page_cursor(self) -> list | None:
+        """Курсор начала текущей страницы (None — первая страница)."""
+        current_page = self.scene.data['scene'].get('current_page', 0)
+        cursors = self.scene.data['scene'].get('task_cursors') or []
+        if current_page <= 0 or current_page >= len(cursors):
+            return None
+        return cursors[current_page]
 
-        user = users[0]
-        user_uuid = user.user_id
-        
-        # Загружаем задачи в зависимости от фильтра
-        tasks = []
+    def _filter_kwargs(self, user) -> dict | None:
+        """Условия Card.find_page для выбранного фильтра (None — ничего не показывать)."""
+        selected_filter = self.scene.data['scene'].get('selected_filter')
 
         if selected_filter == 'my-tasks':
             # Задачи где пользователь исполнитель
-            tasks = [c.to_dict() for c in await Card.find(executor_id=user_uuid)]
+            return {'executor_id': user.user_id}
 
         elif selected_filter == 'all-tasks':
             # Все задачи (только для админа)
-            tasks = [c.to_dict() for c in await Card.find()]
+            return {}
 
         elif selected_filter == 'created-by-me':
             # Задачи созданные пользователем
-            tasks = [c.to_dict() for c in await Card.find(customer_id=user_uuid)]
+            return {'customer_id': user.user_id}
 
         elif selected_filter == 'for-review':
             # Задачи на проверку
-            tasks = [c.to_dict() for c in await Card.find(status=CardStatus.review)]
+            return {'status': CardStatus.review}
 
         elif selected_filter == 'department-tasks':
-            # Задачи отдела - получаем всех пользователей из отдела и их задачи
-            department = user.department
-            if department:
-                # Получаем всех пользователей из этого отдела
-                department_users = await User.find(department=department)
-                # Собираем все задачи этих пользователей
-                all_department_tasks = []
-                for dept_user in department_users:
-                    dept_user_id = dept_user.user_id
-                    # Получаем задачи где пользователь исполнитель
-                    all_department_tasks.extend(c.to_dict() for c in await Card.find(executor_id=dept_user_id))
-                    # Получаем задачи созданные пользователем
-                    all_department_tasks.extend(c.to_dict() for c in await Card.find(customer_id=dept_user_id))
-
-                # Убираем дубликаты по card_id
-                seen_ids = set()
-                tasks = []
-                for task in all_department_tasks:
-                    task_id = task.get('card_id')
-                    if task_id not in seen_ids:
-                        seen_ids.add(task_id)
-                        tasks.append(task)
-            else:
-                tasks = []
+            # Задачи отдела: исполнитель или заказчик из отдела пользователя
+            return {'department': user.department} if user.department else None
 
         elif selected_filter == 'by-user':
             # Задачи конкретного пользователя (для админов)
             filter_user_id = self.scene.data['scene'].get('filter_user_id')
-            if filter_user_id:
-                # Получаем задачи где пользователь исполнитель
-                executor_tasks = [c.to_dict() for c in await Card.find(executor_id=filter_user_id)]
-                # Получаем задачи созданные пользователем
-                customer_tasks = [c.to_dict() for c in await Card.find(customer_id=filter_user_id)]
-
-                # Объединяем и убираем дубликаты
-                all_tasks = executor_tasks + customer_tasks
-                seen_ids = set()
-                tasks = []
-                for task in all_tasks:
-                    task_id = task.get('card_id')
-                    if task_id not in seen_ids:
-                        seen_ids.add(task_id)
-                        tasks.append(task)
-            else:
-                tasks = []
+            return {'member_id': filter_user_id} if filter_user_id else None
 
         elif selected_filter == 'by-department':
             # Задачи по отделу (для админов)
             filter_department = self.scene.data['scene'].get('filter_department')
-            if filter_department:
-                # Получаем всех пользователей из отдела
-                department_users = await User.find(department=filter_department)
-
-                all_department_tasks = []
-                for dept_user in department_users:
-                    dept_user_id = dept_user.user_id
-                    all_department_tasks.extend(c.to_dict() for c in await Card.find(executor_id=dept_user_id))
-                    all_department_tasks.extend(c.to_dict() for c in await Card.find(customer_id=dept_user_id))
-
-                # Убираем дубликаты
-                seen_ids = set()
-                tasks = []
-                for task in all_department_tasks:
-                    task_id = task.get('card_id')
-                    if task_id not in seen_ids:
-                        seen_ids.add(task_id)
-                        tasks.append(task)
-            else:
-                tasks = []
-
-        await self.scene.update_key('scene', 'tasks', tasks)
-
-    def sort_tasks_by_deadline(self, tasks: list) -> list:
-        """Сортирует задачи по дедлайну (ближайшие первые)"""
-        def get_deadline_sort_key(task):
-            deadline = task.get('deadline')
-            if deadline:
-                try:
-                    if isinstance(deadline, str):
-                        return datetime.fromisoformat(deadline)
-                    return deadline
-                except:
-                    pass
-            # Задачи без дедлайна в конец
-            return datetime.max
-
-        return sorted(tasks, key=get_deadline_sort_key)
+            return {'department': filter_department} if filter_department else None
+
+        return None
+
+    async def load_tasks(self):
+        """Загружает одну страницу задач в зависимости от фильтра и роли пользователя"""
+        telegram_id = self.scene.user_id
+        self.page_tasks, self.total_tasks = [], 0
+
+        # Получаем информацию о пользователе
+        user = await user_cache.get(telegram_id)
+        if not user:
+            print(f"Failed to load user info for telegram_id {telegram_id}")
+            return
+
+        filters = self._filter_kwargs(user)
+        if filters is None:
+            return
+
+        self.page_tasks, self.total_tasks = await Card.find_page(
+            after=self._page_cursor(), limit=TASKS_PER_PAGE, **filters
+        )
 
     def format_deadline_label(self, task: dict) -> str:
         """Форматирует название задачи с дедлайном и эмодзи"""
@@ -252,21 +197,11 @@ class TaskListPage(Page):
     async def buttons_worker(self) -> list[dict]:
         result = await super().buttons_worker()
         
-        tasks = self.scene.data['scene'].get('tasks', [])
         current_page = self.scene.data['scene'].get('current_page', 0)
+        end_index = current_page * TASKS_PER_PAGE + len(self.page_tasks)
         
-        # Сортируем задачи по дедлайну
-        tasks = self.sort_tasks_by_deadline(tasks)
-        
-        # Показываем по 5 задач на страницу
-        tasks_per_page = 5
-        start_index = current_page * tasks_per_page
-        end_index = min(start_index + tasks_per_page, len(tasks))
-        
-        # Добавляем кнопки для задач на текущей странице
-        current_tasks = tasks[start_index:end_index]
-        
-        for i, task in enumerate(current_tasks):
+        # Добавляем кнопки для задач на текущей странице (уже по дедлайну)
+        for i, task in enumerate(self.page_tasks):
             # Используем новый формат с дедлайном и эмодзи
             button_text = self.format_deadline_label(task)
             
@@ -296,7 +231,7 @@ class TaskListPage(Page):
             })
         
         # Следующая страница
-        if end_index < len(tasks):
+        if end_index < self.total_tasks and self.page_tasks:
             nav_buttons.append({
                 'text': 'Вперед ➡️',
                 'callback_data': callback_generator(
@@ -327,7 +262,23 @@ class TaskListPage(Page):
     @Page.on_callback('page_nav')
     async def page_nav_handler(self, callback, args):
         new_page = int(args[1])
-        
+        current_page = self.scene.data['scene'].get('current_page', 0)
+
+        # Курсор страницы i — последняя задача страницы i-1, у первой страницы курсора нет
+        cursors = [None] + (self.scene.data['scene'].get('task_cursors') or [None])[1:current_page + 1]
+        if len(cursors) < current_page + 1:
+            new_page = 0
+        elif new_page == current_page + 1:
+            if not self.page_tasks:
+                await self.load_tasks()
+            if self.page_tasks:
+                cursors.append(self.page_tasks[-1]['cursor'])
+            else:
+                new_page = current_page
+        elif new_page > current_page:
+            new_page = 0
+
+        await self.scene.update_key('scene', 'task_cursors', cursors)
         # Обновляем номер текущей страницы
         await self.scene.update_key('scene', 'current_page', new_page)
         
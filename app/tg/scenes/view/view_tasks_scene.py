@@ -39,6 +39,7 @@ class ViewTasksScene(Scene):
     __insert_function__ = staticmethod(SceneModel.insert_scene)
     __load_function__ = staticmethod(SceneModel.load_scene)
     __update_function__ = staticmethod(SceneModel.update_scene)
+    __bulk_update_function__ = staticmethod(SceneModel.bulk_upsert_scenes)
     __delete_function__ = staticmethod(SceneModel.delete_scene)
 
     async def get_card_data(self):
@@ -0,0 +1,173 @@
+"""
+Асинхронный транспорт VK API поверх aiohttp.
+
+Один пул соединений на процесс (``VKTransport``) используется
+и для вызовов методов, и для загрузки файлов на upload-серверы.
+``AsyncVKApi`` повторяет интерфейс ``vk_api.VkApiMethod``
+(``api.wall.post(...)``), но методы — корутины.
+"""
+import asyncio
+from typing import Any, Optional
+
+import aiohttp
+
+from modules.logs import logger
+
+DEFAULT_API_URL = "https://api.vk.com/method"
+# Версия, с которой работал vk_api.VkApi — форматы ответов не меняются
+DEFAULT_API_VERSION = "5.92"
+
+# Too many requests per second
+TOO_MANY_REQUESTS = 6
+
+
+class VKApiError(Exception):
+    """ Ошибка, возвращённая VK API в поле ``error``.
+    """
+
+    def __init__(self, method: str, error: dict):
+        self.method = method
+        self.code = error.get("error_code")
+        self.error_msg = error.get("error_msg", "")
+        super().__init__(f"[{self.code}] {self.error_msg} ({method})")
+
+
+class VKTransport:
+    """ Общий aiohttp-клиент с таймаутами.
+
+        Сессия создаётся лениво внутри работающего цикла событий
+        и закрывается через :meth:`close`.
+    """
+
+    def __init__(
+        self,
+        api_url: str = DEFAULT_API_URL,
+        request_timeout: float = 30,
+        upload_timeout: float = 300,
+        connect_timeout: float = 10,
+        pool_size: int = 20,
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.request_timeout = aiohttp.ClientTimeout(
+            total=request_timeout, connect=connect_timeout)
+        self.upload_timeout = aiohttp.ClientTimeout(
+            total=upload_timeout, connect=connect_timeout)
+        self.pool_size = pool_size
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=self.request_timeout,
+            )
+        return self._session
+
+    async def call(self, token: str, version: str, method: str, params: dict) -> Any:
+        """ Вызвать метод API и вернуть поле ``response``.
+        """
+        data = {
+            key: _format_param(value)
+            for key, value in params.items() if value is not None
+        }
+        data["access_token"] = token
+        data["v"] = version
+
+        async with self.session.post(f"{self.api_url}/{method}", data=data) as response:
+            response.raise_for_status()
+            payload = await response.json(content_type=None)
+
+        if "error" in payload:
+            raise VKApiError(method, payload["error"])
+        return payload.get("response")
+
+    async def upload(
+        self,
+        upload_url: str,
+        field: str,
+        filename: str,
+        content: bytes,
+        content_type: Optional[str] = None,
+    ) -> tuple[int, Any, str]:
+        """ Загрузить файл на upload-сервер VK.
+
+            Возвращает ``(status, json | None, text)``.
+        """
+        form = aiohttp.FormData()
+        form.add_field(field, content, filename=filename,
+                       content_type=content_type or "application/octet-stream")
+
+        async with self.session.post(
+            upload_url, data=form, timeout=self.upload_timeout
+        ) as response:
+            text = await response.text()
+            try:
+                payload = await response.json(content_type=None)
+            except Exception:
+                payload = None
+            return response.status, payload, text
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class AsyncVKApi:
+    """ Вызовы VK API от имени одного токена.
+
+        ``await api.wall.post(owner_id=..., message=...)`` или
+        ``await api.call("wall.post", owner_id=..., message=...)``.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        transport: VKTransport,
+        version: str = DEFAULT_API_VERSION,
+        max_retries: int = 3,
+    ):
+        self.token = token
+        self.transport = transport
+        self.version = version
+        self.max_retries = max_retries
+
+    async def call(self, method: str, **params) -> Any:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return await self.transport.call(
+                    self.token, self.version, method, params)
+            except VKApiError as e:
+                if e.code != TOO_MANY_REQUESTS or attempt == self.max_retries:
+                    raise
+                logger.warning(f"VK: {method} — слишком много запросов, повтор {attempt}")
+                await asyncio.sleep(0.4 * attempt)
+
+    def __getattr__(self, name: str) -> "_MethodGroup":
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return _MethodGroup(self, name)
+
+
+class _MethodGroup:
+
+    def __init__(self, api: AsyncVKApi, group: str):
+        self._api = api
+        self._group = group
+
+    def __getattr__(self, name: str):
+        method = f"{self._group}.{name}"
+
+        async def caller(**params):
+            return await self._api.call(method, **params)
+
+        return caller
+
+
+def _format_param(value: Any) -> Any:
+    if isinstance(value, bool):
+        return 1 if value else 0
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(v) for v in value)
+    return value
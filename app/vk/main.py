@@ -1,11 +1,12 @@
 import asyncio
+import os
 import random
-import vk_api
-from vk_api.vk_api import VkApiMethod
+from contextlib import nullcontext
 from modules.exec.executor import BaseExecutor
 from modules.post_generator import clean_html, convert_hyperlinks_to_vk
 from typing import Literal, Optional, Dict, List, Any
 from modules.logs import logger
+from vk.api import AsyncVKApi, VKTransport, DEFAULT_API_URL, DEFAULT_API_VERSION
 
 
 class VKExecutor(BaseExecutor):
@@ -17,20 +18,24 @@ class VKExecutor(BaseExecutor):
         self.user_token = config.get("user_token")  # Токен пользователя для загрузки фото
         self.group_id = int(config.get("group_id") or 0)
 
+        # Общий пул HTTP-соединений для API и upload-серверов
+        self.transport = VKTransport(
+            api_url=config.get("api_url") or DEFAULT_API_URL,
+            request_timeout=float(config.get("request_timeout") or 30),
+            upload_timeout=float(config.get("upload_timeout") or 300),
+        )
+        api_version = config.get("api_version") or DEFAULT_API_VERSION
+
         if self.token:
-            self.vk_session = vk_api.VkApi(token=self.token)
-            self.vk: VkApiMethod = self.vk_session.get_api()
+            self.vk: AsyncVKApi = AsyncVKApi(self.token, self.transport, api_version)
         else:
-            self.vk_session = None
             self.vk = None
-        
-        # Отдельная сессия для загрузки фото (требует user token)
+
+        # Отдельный клиент для загрузки фото (требует user token)
         if self.user_token:
-            self.vk_user_session = vk_api.VkApi(token=self.user_token)
-            self.vk_user: VkApiMethod = self.vk_user_session.get_api()
+            self.vk_user: AsyncVKApi = AsyncVKApi(self.user_token, self.transport, api_version)
             logger.info("VK: User token загружен для загрузки фото")
         else:
-            self.vk_user_session = None
             self.vk_user = None
             logger.warning("VK: User token не указан - загрузка фото на стену будет недоступна")
 
@@ -42,7 +47,7 @@ class VKExecutor(BaseExecutor):
     async def send_message(self, chat_id: str, text: str) -> dict:
         """Отправить сообщение"""
         try:
-            result = self.vk.messages.send(
+            result = await self.vk.messages.send(
                 user_id=int(chat_id),
                 message=self._format_text_for_vk(text),
                 random_id=random.getrandbits(64)
@@ -54,7 +59,7 @@ class VKExecutor(BaseExecutor):
     async def edit_message(self, chat_id: str, message_id: str, text: str) -> dict:
         """Изменить сообщение"""
         try:
-            self.vk.messages.edit(
+            await self.vk.messages.edit(
                 peer_id=int(chat_id),
                 message_id=int(message_id),
                 message=self._format_text_for_vk(text)
@@ -66,7 +71,7 @@ class VKExecutor(BaseExecutor):
     async def delete_message(self, chat_id: str, message_id: str) -> dict:
         """Удалить сообщение"""
         try:
-            self.vk.messages.delete(
+            await self.vk.messages.delete(
                 message_ids=int(message_id),
                 delete_for_all=1
             )
@@ -100,7 +105,7 @@ class VKExecutor(BaseExecutor):
                 params["attachments"] = ",".join(attachments)
                 logger.info(f"VK: Добавлены attachments в пост: {params['attachments']}")
 
-            result = self.vk.wall.post(**params)
+            result = await self.vk.wall.post(**params)
             logger.info(f"VK: Пост создан успешно, post_id: {result.get('post_id')}")
             return {"success": True, "post_id": result["post_id"]}
         except Exception as e:
@@ -120,7 +125,7 @@ class VKExecutor(BaseExecutor):
             if attachments:
                 params["attachments"] = ",".join(attachments)
             
-            result = self.vk.wall.edit(**params)
+            result = await self.vk.wall.edit(**params)
             return {"success": True, "post_id": result["post_id"]}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -128,7 +133,7 @@ class VKExecutor(BaseExecutor):
     async def delete_wall_post(self, post_id: str) -> dict:
         """Удалить пост со стены"""
         try:
-            self.vk.wall.delete(
+            await self.vk.wall.delete(
                 owner_id=-abs(self.group_id),
                 post_id=int(post_id)
             )
@@ -140,7 +145,7 @@ class VKExecutor(BaseExecutor):
                             filter_type: str = "owner") -> dict:
         """Получить посты со стены"""
         try:
-            result = self.vk.wall.get(
+            result = await self.vk.wall.get(
                 owner_id=-abs(self.group_id),
                 count=count,
                 offset=offset,
@@ -153,7 +158,7 @@ class VKExecutor(BaseExecutor):
     async def pin_wall_post(self, post_id: str) -> dict:
         """Закрепить пост на стене"""
         try:
-            self.vk.wall.pin(
+            await self.vk.wall.pin(
                 owner_id=-abs(self.group_id),
                 post_id=int(post_id)
             )
@@ -164,7 +169,7 @@ class VKExecutor(BaseExecutor):
     async def unpin_wall_post(self) -> dict:
         """Открепить пост со стены"""
         try:
-            self.vk.wall.unpin(
+            await self.vk.wall.unpin(
                 owner_id=-abs(self.group_id)
             )
             return {"success": True}
@@ -185,7 +190,7 @@ class VKExecutor(BaseExecutor):
             if attachments:
                 params["attachments"] = ",".join(attachments)
             
-            result = self.vk.wall.createComment(**params)
+            result = await self.vk.wall.createComment(**params)
             return {"success": True, "comment_id": result["comment_id"]}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -193,7 +198,7 @@ class VKExecutor(BaseExecutor):
     async def delete_comment(self, comment_id: str) -> dict:
         """Удалить комментарий"""
         try:
-            self.vk.wall.deleteComment(
+            await self.vk.wall.deleteComment(
                 owner_id=-abs(self.group_id),
                 comment_id=int(comment_id)
             )
@@ -206,8 +211,16 @@ class VKExecutor(BaseExecutor):
         Загрузить фото для поста на стену группы.
         Требует user_token, так как групповой токен не поддерживает photos.getWallUploadServer.
         """
-        import requests
-        import os
+        with open(photo_path, 'rb') as f:
+            file_content = f.read()
+
+        return await self.upload_photo_bytes(file_content, os.path.basename(photo_path))
+
+    async def upload_photo_bytes(self, file_content: bytes, filename: str = "photo") -> dict:
+        """
+        Загрузить фото из памяти для поста на стену группы.
+        Требует user_token, так как групповой токен не поддерживает photos.getWallUploadServer.
+        """
         from modules.file_utils import detect_file_type_by_bytes
 
         # Проверяем наличие user token
@@ -218,52 +231,41 @@ class VKExecutor(BaseExecutor):
         max_attempts = 5
         last_error = None
 
-        # Читаем файл для определения типа по magic bytes
-        with open(photo_path, 'rb') as f:
-            file_content = f.read()
-        
         # Определяем тип изображения через общую функцию
         mime_type, extension, file_type = detect_file_type_by_bytes(file_content)
-        
-        # Формируем имя файла с правильным расширением
-        original_filename = os.path.basename(photo_path)
-        if '.' in original_filename:
-            # Файл уже имеет расширение - используем его
-            filename = original_filename
-        else:
-            # Временный файл без расширения - добавляем определённое расширение
-            filename = original_filename + extension
-        
-        logger.info(f"VK: Загрузка файла {photo_path}, filename={filename}, mime_type={mime_type}, size={len(file_content)} bytes")
+
+        # Имя без расширения дополняем определённым по содержимому
+        if '.' not in filename:
+            filename = filename + extension
+
+        logger.info(f"VK: Загрузка файла filename={filename}, mime_type={mime_type}, size={len(file_content)} bytes")
 
         for attempt in range(1, max_attempts + 1):
             try:
-                logger.info(f"VK: Попытка {attempt}/{max_attempts} загрузки фото {photo_path} для группы {self.group_id}")
+                logger.info(f"VK: Попытка {attempt}/{max_attempts} загрузки фото {filename} для группы {self.group_id}")
 
                 # Получаем сервер загрузки фото на стену (требует user token)
-                upload_server = self.vk_user.photos.getWallUploadServer(group_id=self.group_id)
+                upload_server = await self.vk_user.photos.getWallUploadServer(group_id=self.group_id)
                 upload_url = upload_server['upload_url']
                 logger.info(f"VK: Получен сервер загрузки photos: {upload_url[:50]}...")
 
                 # Отправляем с явным указанием имени файла и типа (file_content уже прочитан выше)
-                files = {'photo': (filename, file_content, mime_type)}
-                response = requests.post(upload_url, files=files)
+                status, upload_result, response_text = await self.transport.upload(
+                    upload_url, 'photo', filename, file_content, mime_type)
 
                 # Проверяем ответ сервера
-                if response.status_code != 200:
-                    logger.warning(f"VK: HTTP {response.status_code}: {response.text[:200]}")
-                    last_error = f"HTTP {response.status_code}"
+                if status != 200:
+                    logger.warning(f"VK: HTTP {status}: {response_text[:200]}")
+                    last_error = f"HTTP {status}"
                     if attempt < max_attempts:
                         await asyncio.sleep(2 * attempt)
                         continue
                     else:
                         return {"success": False, "error": last_error}
 
-                try:
-                    upload_result = response.json()
-                except Exception as json_err:
-                    logger.warning(f"VK: Ошибка парсинга JSON: {json_err}, response: {response.text[:200]}")
-                    last_error = f"JSON parse error: {response.text[:100]}"
+                if upload_result is None:
+                    logger.warning(f"VK: Ошибка парсинга JSON, response: {response_text[:200]}")
+                    last_error = f"JSON parse error: {response_text[:100]}"
                     if attempt < max_attempts:
                         await asyncio.sleep(2 * attempt)
                         continue
@@ -285,7 +287,7 @@ class VKExecutor(BaseExecutor):
                         return {"success": False, "error": last_error}
 
                 # Сохраняем фото (тоже через user token)
-                saved_photo = self.vk_user.photos.saveWallPhoto(
+                saved_photo = await self.vk_user.photos.saveWallPhoto(
                     group_id=self.group_id,
                     photo=upload_result['photo'],
                     server=upload_result['server'],
@@ -325,12 +327,18 @@ class VKExecutor(BaseExecutor):
                                       title: Optional[str] = None) -> dict:
         """Загрузить документ для поста на стену"""
         try:
-            from vk_api import VkUpload
-            upload = VkUpload(self.vk_session)
-            
+            upload_server = await self.vk.docs.getWallUploadServer(group_id=self.group_id)
+
             # Загружаем документ
-            doc = upload.document_wall(doc_path, group_id=self.group_id, title=title)
-            
+            with open(doc_path, 'rb') as doc_file:
+                status, upload_result, response_text = await self.transport.upload(
+                    upload_server['upload_url'], 'file', os.path.basename(doc_path), doc_file)
+
+            if status != 200 or not upload_result or 'file' not in upload_result:
+                return {"success": False, "error": f"HTTP {status}: {response_text[:200]}"}
+
+            doc = await self.vk.docs.save(file=upload_result['file'], title=title)
+
             # Формируем строку для attachment
             attachment = f"doc{doc['doc']['owner_id']}_{doc['doc']['id']}"
             
@@ -349,9 +357,25 @@ class VKExecutor(BaseExecutor):
             title: Название видео
             description: Описание видео
         """
-        import requests
-        import os
-        
+        return await self._upload_video(
+            os.path.basename(video_path), lambda: open(video_path, 'rb'),
+            title=title, description=description)
+
+    async def upload_video_bytes(self, content: bytes, filename: str = "video.mp4",
+                                 title: Optional[str] = None,
+                                 description: Optional[str] = None) -> dict:
+        """Загрузить видео из памяти для поста на стену группы."""
+        return await self._upload_video(
+            filename, lambda: nullcontext(content),
+            title=title, description=description)
+
+    async def _upload_video(self, filename: str, open_data,
+                            title: Optional[str] = None,
+                            description: Optional[str] = None) -> dict:
+        """
+        Общая загрузка видео. ``open_data()`` возвращает контекстный
+        менеджер с данными (файл или bytes) — открывается на каждую попытку.
+        """
         # Проверяем наличие user token (для загрузки видео требуется)
         if not self.vk_user:
             logger.error("VK: User token не настроен - невозможно загрузить видео")
@@ -362,7 +386,7 @@ class VKExecutor(BaseExecutor):
 
         for attempt in range(1, max_attempts + 1):
             try:
-                logger.info(f"VK: Попытка {attempt}/{max_attempts} загрузки видео {video_path} для группы {self.group_id}")
+                logger.info(f"VK: Попытка {attempt}/{max_attempts} загрузки видео {filename} для группы {self.group_id}")
 
                 # Получаем сервер загрузки видео
                 save_params = {
@@ -374,29 +398,26 @@ class VKExecutor(BaseExecutor):
                 if description:
                     save_params["description"] = description
 
-                upload_server = self.vk_user.video.save(**save_params)
+                upload_server = await self.vk_user.video.save(**save_params)
                 upload_url = upload_server['upload_url']
                 logger.info(f"VK: Получен сервер загрузки видео: {upload_url[:50]}...")
 
                 # Загружаем видео
-                filename = os.path.basename(video_path)
-                with open(video_path, 'rb') as video_file:
-                    files = {'video_file': (filename, video_file)}
-                    response = requests.post(upload_url, files=files)
-
-                if response.status_code != 200:
-                    logger.warning(f"VK: HTTP {response.status_code}: {response.text[:200]}")
-                    last_error = f"HTTP {response.status_code}"
+                with open_data() as video_data:
+                    status, upload_result, response_text = await self.transport.upload(
+                        upload_url, 'video_file', filename, video_data)
+
+                if status != 200:
+                    logger.warning(f"VK: HTTP {status}: {response_text[:200]}")
+                    last_error = f"HTTP {status}"
                     if attempt < max_attempts:
                         await asyncio.sleep(2 * attempt)
                         continue
                     else:
                         return {"success": False, "error": last_error}
 
-                try:
-                    upload_result = response.json()
-                except Exception as json_err:
-                    logger.warning(f"VK: Ошибка парсинга JSON: {json_err}")
+                if upload_result is None:
+                    logger.warning(f"VK: Ошибка парсинга JSON: {response_text[:200]}")
                     last_error = f"JSON parse error"
                     if attempt < max_attempts:
                         await asyncio.sleep(2 * attempt)
@@ -441,10 +462,50 @@ class VKExecutor(BaseExecutor):
 
         return {"success": False, "error": last_error or "Unknown error"}
 
+    async def upload_wall_media(self, files: List[Dict[str, Any]],
+                                concurrency: int = 4) -> List[dict]:
+        """
+        Параллельно загрузить файлы поста из памяти.
+
+        Args:
+            files: Список ``{'data': bytes | None, 'path': str | None, 'name': str,
+                'type': 'photo' | 'video'}`` — при ``data=None`` читается ``path``
+            concurrency: Сколько файлов загружать одновременно
+
+        Returns:
+            Результаты загрузки в порядке ``files``
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def upload(f: Dict[str, Any]) -> dict:
+            data = f.get('data')
+            path = f.get('path')
+            is_video = f.get('type') == 'video'
+
+            async with semaphore:
+                if isinstance(data, (bytes, bytearray)):
+                    if is_video:
+                        return await self.upload_video_bytes(
+                            bytes(data), f.get('name') or 'video.mp4')
+                    return await self.upload_photo_bytes(
+                        bytes(data), f.get('name') or 'photo')
+
+                # Крупный файл из хранилища — видео уходит потоком с диска
+                if path:
+                    if is_video:
+                        return await self._upload_video(
+                            f.get('name') or os.path.basename(path),
+                            lambda: open(path, 'rb'))
+                    return await self.upload_photo_to_wall(path)
+
+            return {"success": False, "error": "No file data"}
+
+        return list(await asyncio.gather(*(upload(f) for f in files)))
+
     async def get_upload_server_wall(self) -> dict:
         """Получить сервер для загрузки фото на стену"""
         try:
-            result = self.vk.photos.getWallUploadServer(group_id=self.group_id)
+            result = await self.vk.photos.getWallUploadServer(group_id=self.group_id)
             return {"success": True, "upload_url": result["upload_url"]}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -452,9 +513,12 @@ class VKExecutor(BaseExecutor):
     async def start_polling(self):
         logger.info("VK executor started")
 
-        while self.is_running:
-            # Просто ждем, пока executor работает
-            await asyncio.sleep(1)
+        try:
+            while self.is_running:
+                # Просто ждем, пока executor работает
+                await asyncio.sleep(1)
+        finally:
+            await self.transport.close()
         logger.info("VK executor stopped")
 
     def is_available(self) -> bool:
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Проверка AI-шлюза на локальном FakeProvider, без сети и БД.
+
+Сценарии:
+
+- dedup — одинаковые промпты от нескольких пользователей дают одно
+  обращение к провайдеру;
+- hedge — «зависший» первый ответ перекрывается параллельной попыткой;
+- retry — служебные ответы и ошибки провайдера отбрасываются;
+- rate — пользователь упирается в лимит, другой пользователь — нет;
+- lag — задержка цикла событий, пока идут запросы.
+
+Пример запуска:
+
+    python scripts/ai_gateway_selftest.py
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+
+from modules.ai import AIGateway, AIRateLimited, FakeProvider  # noqa: E402
+
+
+def gateway(provider: FakeProvider, **kwargs) -> AIGateway:
+    # cache_ttl=None — без таблицы ai_responses
+    kwargs.setdefault("cache_ttl", None)
+    kwargs.setdefault("backoff", 0.01)
+    return AIGateway(provider, **kwargs)
+
+
+async def check_dedup():
+    provider = FakeProvider(latency=0.2)
+    gw = gateway(provider)
+    results = await asyncio.gather(*(gw.ask("same", user_id=i) for i in range(10)))
+    assert len(provider.calls) == 1, provider.calls
+    assert set(results) == {"ok: same"}
+    return gw.stats()
+
+
+async def check_hedge():
+    provider = FakeProvider(responses=[(5.0, "slow"), (0.05, "fast")])
+    gw = gateway(provider, hedge_after=0.1)
+    started = time.perf_counter()
+    text = await gw.ask("hedge")
+    elapsed = time.perf_counter() - started
+    assert text == "fast" and elapsed < 1, (text, elapsed)
+    return {**gw.stats(), "elapsed": round(elapsed, 2)}
+
+
+async def check_retry():
+    provider = FakeProvider(responses=["", "Too Many Requests", RuntimeError("boom"), "good"])
+    gw = gateway(provider)
+    assert await gw.ask("retry") == "good"
+
+    failing = gateway(FakeProvider(reply=lambda p: ""), attempts=3)
+    try:
+        await failing.ask("never")
+    except Exception as e:
+        assert "3" in str(e), e
+    else:
+        raise AssertionError("expected AIError")
+    return gw.stats()
+
+
+async def check_rate():
+    gw = gateway(FakeProvider(), user_rate=0.1, user_burst=2)
+    await gw.ask("a", user_id=1)
+    await gw.ask("b", user_id=1)
+    try:
+        await gw.ask("c", user_id=1)
+    except AIRateLimited as e:
+        assert e.retry_after > 0
+    else:
+        raise AssertionError("expected AIRateLimited")
+    await gw.ask("c", user_id=2)
+    return gw.stats()
+
+
+async def check_lag(requests: int):
+    gw = gateway(FakeProvider(latency=0.3), max_concurrency=4)
+    lag = 0.0
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        nonlocal lag
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.perf_counter() - started - 0.01)
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.gather(*(gw.ask(f"p{i}") for i in range(requests)))
+    stop.set()
+    await beat
+    return {**gw.stats(), "max_lag_ms": round(lag * 1000, 1)}
+
+
+async def run(requests: int):
+    for name, check in [
+        ("dedup", check_dedup()),
+        ("hedge", check_hedge()),
+        ("retry", check_retry()),
+        ("rate", check_rate()),
+        ("lag", check_lag(requests)),
+    ]:
+        print(f"{name:<6} {await check}")
+
+
+def main(argv: list[str] | None = None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--requests", type=int, default=20, help="concurrent prompts in the lag check")
+    args = p.parse_args(argv)
+
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
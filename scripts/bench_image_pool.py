@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Бенчмарк задержек цикла событий при обработке изображений.
+
+Одновременно «загружаются» несколько больших фото, а фоновая корутина
+каждые 10 мс замеряет, насколько цикл событий опоздал её разбудить.
+Сравниваются два режима:
+
+- inline — ``convert_image_to_png`` прямо в корутине (как было в обработчиках);
+- pool — ``image_pool.convert_to_png`` (процессы, с уменьшением до MAX_IMAGE_SIDE).
+
+Пример запуска:
+
+    python scripts/bench_image_pool.py --uploads 8 --width 6000 --height 4000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+
+from PIL import Image  # noqa: E402
+
+from modules.file_utils import convert_image_to_png  # noqa: E402
+from modules.image_pool import ImagePool  # noqa: E402
+
+TICK = 0.01
+
+
+def make_photo(width: int, height: int) -> bytes:
+    """JPEG с шумом — плохо сжимается, как настоящее фото."""
+    noise = Image.frombytes("RGB", (width, height), random.randbytes(width * height * 3))
+    output = io.BytesIO()
+    noise.save(output, format="JPEG", quality=90)
+    return output.getvalue()
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def measure(convert, photo: bytes, uploads: int) -> dict:
+    lags: list[float] = []
+    stop = asyncio.Event()
+
+    async def heartbeat():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(max(time.perf_counter() - started - TICK, 0.0))
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(TICK * 5)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(convert(photo) for _ in range(uploads)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await beat
+    return {
+        "elapsed": elapsed,
+        "p50": percentile(lags, 50) * 1000,
+        "p99": percentile(lags, 99) * 1000,
+        "max": max(lags) * 1000,
+    }
+
+
+async def run(uploads: int, width: int, height: int, workers: int | None):
+    photo = make_photo(width, height)
+    print(f"{uploads} uploads of {width}x{height} JPEG ({len(photo) / 1024 ** 2:.1f} MB)")
+
+    async def inline(data: bytes):
+        return convert_image_to_png(data)
+
+    pool = ImagePool(max_workers=workers)
+    # Прогрев: запуск процессов не должен попасть в замер
+    await pool.run(sum, [1, 2])
+
+    try:
+        results = {
+            "inline": await measure(inline, photo, uploads),
+            f"pool ({pool.max_workers} workers)": await measure(pool.convert_to_png, photo, uploads),
+        }
+    finally:
+        pool.shutdown()
+
+    print()
+    header = f"{'mode':<22}{'total':>10}{'lag p50':>12}{'lag p99':>12}{'lag max':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<22}{r['elapsed']:>9.2f}s{r['p50']:>10.1f}ms{r['p99']:>10.1f}ms{r['max']:>10.1f}ms")
+
+
+def main(argv: list[str] | None = None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--uploads", type=int, default=8, help="concurrent uploads")
+    p.add_argument("--width", type=int, default=6000)
+    p.add_argument("--height", type=int, default=4000)
+    p.add_argument("--workers", type=int, default=None, help="pool processes")
+    args = p.parse_args(argv)
+
+    asyncio.run(run(args.uploads, args.width, args.height, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Бенчмарк горячих запросов планировщика и сообщений карточек.
+
+Создаёт во временной схеме все таблицы из моделей приложения, заполняет
+их ~100k строками и измеряет p50/p99 задержки запросов:
+
+- поиск наступивших задач планировщиком (``execute_at <= now``);
+- ``cancel_post_tasks``: фильтр ``(card_id, function_path)``;
+- ``Card.get_forum_message``: ``CardMessage(card_id, message_type)``;
+- ``Card.by_message_id``: ``CardMessage(message_id)``;
+- ``get_content`` / ``get_entities`` / ``get_clients_settings`` по ``(card_id, client_key)``.
+
+Сначала замер выполняется с индексами из моделей, затем индексы
+удаляются и замер повторяется — это соответствует состоянию «до».
+
+Пример запуска (внутри контейнера app):
+
+    python ../scripts/bench_indexes.py --rows 100000 --repeat 300
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+
+from sqlalchemy import insert, select, text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from database.connection import Base  # noqa: E402
+# Импорт ради побочного эффекта: регистрирует все таблицы (включая card_files)
+# в Base.metadata для create_all, поэтому имя models не используется
+import models  # noqa: E402,F401
+from models.Card import Card  # noqa: E402
+from models.CardContent import CardContent  # noqa: E402
+from models.CardMessage import CardMessage  # noqa: E402
+from models.ClientSetting import ClientSetting  # noqa: E402
+from models.Entity import Entity  # noqa: E402
+from models.ScheduledTask import ScheduledTask  # noqa: E402
+from modules.enums import CardStatus  # noqa: E402
+
+POSTGRES_HOST = os.getenv("POSTGRES_HOST", "postgres")
+POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
+POSTGRES_DB = os.getenv("POSTGRES_DB", "database")
+POSTGRES_USER = os.getenv("POSTGRES_USER", "user")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "password")
+
+BENCH_TABLES = [ScheduledTask, CardMessage, CardContent, Entity, ClientSetting]
+CLIENT_KEYS = ["tg_main", "tg_news", "vk_main", "vk_news", "tg_design", "vk_design"]
+MESSAGE_TYPES = ["forum", "complete_post", "complete_info", "complete_entity"]
+POST_FUNCTIONS = [
+    "modules.tasks.notifications.send_post_now",
+    "modules.tasks.notifications.finalize_card_publication",
+]
+OTHER_FUNCTIONS = [
+    "modules.tasks.notifications.send_card_deadline_reminder",
+    "modules.tasks.notifications.send_admin_no_executor_alert",
+    "modules.tasks.notifications.send_forum_deadline_passed",
+]
+CHUNK = 5000
+
+
+async def insert_chunked(conn, table, rows: list[dict]):
+    for i in range(0, len(rows), CHUNK):
+        await conn.execute(insert(table), rows[i:i + CHUNK])
+
+
+async def seed(engine, rows: int) -> dict:
+    """Заполнить таблицы; возвращает выборки ключей для запросов."""
+    cards_count = max(rows // 5, 1)
+    now = datetime.now()
+    card_ids = [uuid4() for _ in range(cards_count)]
+
+    async with engine.begin() as conn:
+        await insert_chunked(conn, Card.__table__, [
+            {"card_id": cid, "name": f"card {i}", "status": CardStatus.pass_}
+            for i, cid in enumerate(card_ids)
+        ])
+
+        # Большинство задач в будущем, небольшая доля уже наступила
+        await insert_chunked(conn, ScheduledTask.__table__, [
+            {
+                "task_id": uuid4(),
+                "card_id": random.choice(card_ids),
+                "function_path": random.choice(POST_FUNCTIONS + OTHER_FUNCTIONS),
+                "arguments": {},
+                "execute_at": now + timedelta(minutes=random.randint(-5, 525600)),
+            }
+            for _ in range(rows)
+        ])
+
+        message_ids = random.sample(range(1, rows * 10), rows)
+        await insert_chunked(conn, CardMessage.__table__, [
+            {
+                "id": uuid4(),
+                "card_id": card_ids[i % cards_count],
+                "message_type": MESSAGE_TYPES[(i // cards_count) % len(MESSAGE_TYPES)],
+                "message_id": message_ids[i],
+            }
+            for i in range(rows)
+        ])
+
+        for model, extra in (
+            (CardContent, lambda i: {"text": f"text {i}", "meta": {}}),
+            (Entity, lambda i: {"data": {}, "type": "poll"}),
+            (ClientSetting, lambda i: {"data": {}, "type": None}),
+        ):
+            await insert_chunked(conn, model.__table__, [
+                {
+                    "id": uuid4(),
+                    "card_id": card_ids[i % cards_count],
+                    "client_key": CLIENT_KEYS[(i // cards_count) % len(CLIENT_KEYS)],
+                    **extra(i),
+                }
+                for i in range(rows)
+            ])
+
+        await conn.execute(text("ANALYZE"))
+
+    return {"card_ids": card_ids, "message_ids": message_ids}
+
+
+def build_queries(keys: dict) -> dict:
+    """Запросы в том виде, в котором их выполняет приложение."""
+    card_ids = keys["card_ids"]
+    message_ids = keys["message_ids"]
+
+    return {
+        "scheduler due scan": lambda: (
+            select(ScheduledTask.task_id)
+            .where(ScheduledTask.execute_at <= datetime.now())
+            .order_by(ScheduledTask.execute_at)
+            .limit(100)
+        ),
+        "cancel_post_tasks filter": lambda: (
+            select(ScheduledTask.task_id).where(
+                ScheduledTask.card_id == random.choice(card_ids),
+                ScheduledTask.function_path.in_(POST_FUNCTIONS),
+            )
+        ),
+        "get_forum_message": lambda: (
+            select(CardMessage).where(
+                CardMessage.card_id == random.choice(card_ids),
+                CardMessage.message_type == "forum",
+            )
+        ),
+        "by_message_id": lambda: (
+            select(CardMessage).where(CardMessage.message_id == random.choice(message_ids))
+        ),
+        "get_content(client)": lambda: (
+            select(CardContent).where(
+                CardContent.card_id == random.choice(card_ids),
+                CardContent.client_key == random.choice(CLIENT_KEYS),
+            )
+        ),
+        "get_entities(client)": lambda: (
+            select(Entity).where(
+                Entity.card_id == random.choice(card_ids),
+                Entity.client_key == random.choice(CLIENT_KEYS),
+            )
+        ),
+        "set_client_setting lookup": lambda: (
+            select(ClientSetting).where(
+                ClientSetting.card_id == random.choice(card_ids),
+                ClientSetting.client_key == random.choice(CLIENT_KEYS),
+                ClientSetting.type.is_(None),
+            )
+        ),
+    }
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def measure(engine, queries: dict, repeat: int) -> dict[str, tuple[float, float]]:
+    """p50/p99 в миллисекундах для каждого запроса."""
+    results = {}
+    async with engine.connect() as conn:
+        for name, make_query in queries.items():
+            # Прогрев кэша планов и буферов
+            for _ in range(10):
+                await conn.execute(make_query())
+
+            samples = []
+            for _ in range(repeat):
+                query = make_query()
+                started = time.perf_counter()
+                await conn.execute(query)
+                samples.append((time.perf_counter() - started) * 1000)
+            results[name] = (percentile(samples, 50), percentile(samples, 99))
+    return results
+
+
+async def drop_model_indexes(engine, schema: str):
+    async with engine.begin() as conn:
+        for model in BENCH_TABLES:
+            for index in model.__table__.indexes:
+                await conn.execute(text(f'DROP INDEX IF EXISTS "{schema}"."{index.name}"'))
+        await conn.execute(text("ANALYZE"))
+
+
+def print_report(before: dict, after: dict):
+    header = f"{'query':<28}{'p50 before':>12}{'p99 before':>12}{'p50 after':>12}{'p99 after':>12}"
+    print(header)
+    print("-" * len(header))
+    for name in after:
+        b50, b99 = before[name]
+        a50, a99 = after[name]
+        print(f"{name:<28}{b50:>10.2f}ms{b99:>10.2f}ms{a50:>10.2f}ms{a99:>10.2f}ms")
+
+
+async def run(rows: int, repeat: int, schema: str, keep: bool):
+    dsn = (
+        f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}"
+        f"@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    )
+    engine = create_async_engine(
+        dsn, connect_args={"server_settings": {"search_path": schema}}
+    )
+
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+            await conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+            await conn.run_sync(Base.metadata.create_all)
+
+        print(f"Seeding {rows} rows per table into schema '{schema}' ...")
+        started = time.perf_counter()
+        keys = await seed(engine, rows)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+        queries = build_queries(keys)
+
+        print("Measuring with model indexes ...")
+        after = await measure(engine, queries, repeat)
+
+        print("Dropping model indexes and measuring again ...")
+        await drop_model_indexes(engine, schema)
+        before = await measure(engine, queries, repeat)
+
+        print()
+        print_report(before, after)
+    finally:
+        if not keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+        await engine.dispose()
+
+
+def main(argv: list[str] | None = None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--rows", type=int, default=100_000, help="rows per benchmarked table")
+    p.add_argument("--repeat", type=int, default=300, help="executions per query")
+    p.add_argument("--schema", default="bench_indexes", help="temporary schema name")
+    p.add_argument("--keep", action="store_true", help="do not drop the schema afterwards")
+    args = p.parse_args(argv)
+
+    asyncio.run(run(args.rows, args.repeat, args.schema, args.keep))
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,72 @@ BEGIN
     RAISE NOTICE 'Card files with hide=true: %', (SELECT COUNT(*) FROM card_files WHERE hide = TRUE);
 END$$;
 
+-- Scheduler: lease-based claiming, retries and dead-letter table
+ALTER TABLE scheduled_tasks ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE scheduled_tasks ADD COLUMN IF NOT EXISTS max_attempts INTEGER NOT NULL DEFAULT 5;
+ALTER TABLE scheduled_tasks ADD COLUMN IF NOT EXISTS locked_by VARCHAR(255);
+ALTER TABLE scheduled_tasks ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP WITHOUT TIME ZONE;
+ALTER TABLE scheduled_tasks ADD COLUMN IF NOT EXISTS last_error TEXT;
+
+CREATE TABLE IF NOT EXISTS failed_tasks (
+    task_id UUID PRIMARY KEY,
+    card_id UUID,
+    function_path VARCHAR(500) NOT NULL,
+    arguments JSON NOT NULL,
+    execute_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    failed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT TIMEZONE('utc', now())
+);
+CREATE INDEX IF NOT EXISTS ix_failed_tasks_card_id ON failed_tasks (card_id);
+
+-- Indexes for scheduler and card-message hot queries
+DROP INDEX IF EXISTS ix_scheduled_tasks_card_id;
+CREATE INDEX IF NOT EXISTS ix_scheduled_tasks_execute_at ON scheduled_tasks (execute_at);
+CREATE INDEX IF NOT EXISTS ix_scheduled_tasks_card_function ON scheduled_tasks (card_id, function_path);
+CREATE INDEX IF NOT EXISTS ix_scheduled_tasks_system_function ON scheduled_tasks (function_path) WHERE card_id IS NULL;
+CREATE INDEX IF NOT EXISTS ix_scheduled_tasks_locked_until ON scheduled_tasks (locked_until) WHERE locked_until IS NOT NULL;
+CREATE INDEX IF NOT EXISTS ix_card_messages_card_type ON card_messages (card_id, message_type);
+CREATE INDEX IF NOT EXISTS ix_card_messages_message_id ON card_messages (message_id);
+-- Покрывается ix_card_messages_card_type
+DROP INDEX IF EXISTS ix_card_messages_forum;
+CREATE INDEX IF NOT EXISTS ix_card_contents_card_client_created ON card_contents (card_id, client_key, created_at);
+CREATE INDEX IF NOT EXISTS ix_entities_card_client ON entities (card_id, client_key);
+CREATE INDEX IF NOT EXISTS ix_client_settings_card_client ON client_settings (card_id, client_key, type);
+
+-- Content-addressed storage: one blob may be referenced by several card_files rows
+ALTER TABLE card_files DROP CONSTRAINT IF EXISTS card_files_filename_key;
+CREATE INDEX IF NOT EXISTS ix_card_files_filename ON card_files (filename);
+
+-- AI gateway: persistent response cache keyed by prompt hash
+CREATE TABLE IF NOT EXISTS ai_responses (
+    prompt_hash VARCHAR(64) PRIMARY KEY,
+    provider VARCHAR(100) NOT NULL,
+    response TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT TIMEZONE('utc', now())
+);
+
+-- Google Calendar mirror with incremental sync tokens
+CREATE TABLE IF NOT EXISTS calendar_events (
+    calendar_id VARCHAR NOT NULL,
+    event_id VARCHAR(1024) NOT NULL,
+    summary VARCHAR,
+    status VARCHAR(20) NOT NULL DEFAULT 'confirmed',
+    start_at TIMESTAMP,
+    end_at TIMESTAMP,
+    all_day BOOLEAN NOT NULL DEFAULT FALSE,
+    data JSON NOT NULL,
+    synced_at TIMESTAMP NOT NULL DEFAULT TIMEZONE('utc', now()),
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS ix_calendar_events_range ON calendar_events (calendar_id, start_at, end_at);
+
+CREATE TABLE IF NOT EXISTS calendar_sync_state (
+    calendar_id VARCHAR PRIMARY KEY,
+    sync_token TEXT,
+    synced_at TIMESTAMP NOT NULL DEFAULT TIMEZONE('utc', now())
+);
+
 COMMIT;
 
 -- End of migration
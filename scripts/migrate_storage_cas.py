@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Перенос файлов хранилища на адресацию по содержимому.
+
+Файлы со старыми именами (``<uuid>.<ext>`` в корне STORAGE_PATH) хешируются
+SHA-256 и переносятся в ``STORAGE_PATH/<ab>/<cd>/<ключ>``; записи
+``card_files`` переключаются на ключ. Одинаковые файлы после переноса
+хранятся один раз.
+
+Порядок для каждого файла: блоб создаётся жёсткой ссылкой (или копией),
+затем в БД обновляется ``filename``, и только после этого удаляется
+старый файл — приложение в любой момент находит файл хотя бы под одним
+из имён. ``data_info`` (в том числе file_id Telegram) не меняется.
+
+Пример запуска (внутри контейнера app, после migrate_cards.sql):
+
+    python ../scripts/migrate_storage_cas.py --dry-run
+    python ../scripts/migrate_storage_cas.py --batch 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+
+from sqlalchemy import select, update  # noqa: E402
+
+from database.connection import session_factory  # noqa: E402
+from models.CardFile import CardFile  # noqa: E402
+from modules.storage import (  # noqa: E402
+    CHUNK_SIZE, STORAGE_PATH, blob_lock, blob_path, is_content_key,
+)
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def place_blob(source: Path, target: Path) -> None:
+    """Создать блоб рядом со старым файлом, не удаляя его."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.migrate")
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copy2(source, tmp)
+    os.replace(tmp, target)
+
+
+async def next_names(batch: int, after: str) -> list[str]:
+    """Следующая пачка имён из card_files.
+
+    Пачка берётся по имени, а не по смещению: перенесённые записи
+    получают ключи и не сдвигают выборку.
+    """
+    async with session_factory() as session:
+        result = await session.execute(
+            select(CardFile.filename)
+            .where(CardFile.filename > after)
+            .distinct()
+            .order_by(CardFile.filename)
+            .limit(batch)
+        )
+        return list(result.scalars())
+
+
+async def survey_one(name: str, seen: set[str], stats: dict) -> None:
+    """Dry-run: только хеш и подсчёт, ключи запоминаются в ``seen``."""
+    source = STORAGE_PATH / name
+    if not source.is_file():
+        stats["missing"] += 1
+        print(f"  missing: {name}")
+        return
+
+    key = await asyncio.get_running_loop().run_in_executor(None, hash_file, source)
+    if key in seen or blob_path(key).exists():
+        stats["duplicates"] += 1
+        stats["bytes_saved"] += source.stat().st_size
+    else:
+        stats["moved"] += 1
+        seen.add(key)
+
+
+async def migrate_one(name: str, stats: dict) -> None:
+    loop = asyncio.get_running_loop()
+    source = STORAGE_PATH / name
+    if not source.is_file():
+        stats["missing"] += 1
+        print(f"  missing: {name}")
+        return
+
+    key = await loop.run_in_executor(None, hash_file, source)
+    target = blob_path(key)
+    size = source.stat().st_size
+
+    async with blob_lock(key) as session:
+        duplicate = target.exists()
+        if duplicate:
+            stats["duplicates"] += 1
+            stats["bytes_saved"] += size
+        else:
+            stats["moved"] += 1
+            await loop.run_in_executor(None, place_blob, source, target)
+
+        await session.execute(
+            update(CardFile).where(CardFile.filename == name).values(filename=key)
+        )
+
+    await loop.run_in_executor(None, source.unlink)
+
+
+async def run(batch: int, dry_run: bool):
+    stats = {"moved": 0, "duplicates": 0, "missing": 0, "bytes_saved": 0}
+    started = time.perf_counter()
+    seen: set[str] = set()
+
+    after = ""
+    while names := await next_names(batch, after):
+        after = names[-1]
+        for name in names:
+            if is_content_key(name):
+                continue
+            try:
+                if dry_run:
+                    await survey_one(name, seen, stats)
+                else:
+                    await migrate_one(name, stats)
+            except Exception as e:
+                print(f"  failed: {name}: {e}")
+
+        print(f"  ... {stats['moved'] + stats['duplicates']} files processed")
+
+    prefix = "[dry-run] " if dry_run else ""
+    print(
+        f"{prefix}moved: {stats['moved']}, duplicates removed: {stats['duplicates']}, "
+        f"missing: {stats['missing']}, saved: {stats['bytes_saved'] / 1024 ** 2:.1f} MB, "
+        f"elapsed: {time.perf_counter() - started:.1f}s"
+    )
+
+
+def main(argv: list[str] | None = None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--batch", type=int, default=500, help="card_files names per query")
+    p.add_argument("--dry-run", action="store_true", help="only hash files and report")
+    args = p.parse_args(argv)
+
+    asyncio.run(run(args.batch, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
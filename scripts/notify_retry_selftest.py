@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Проверка переноса уведомления при флуд-контроле Telegram, без сети и БД.
+
+Сценарии:
+
+- retry — Telegram отвечает RetryAfter дольше ``max_inline_wait``:
+  notify_user ставит задачу ``notify_user`` в планировщик, и эта задача,
+  выполненная планировщиком (с проверкой карточки по ``card_id``),
+  действительно отправляет сообщение и удаляется;
+- card-gone — карточка удалена до повтора: задача снимается без отправки;
+- global-pause — после RetryAfter в одном чате диспетчер не шлёт и в
+  другие чаты, пока не истечёт пауза.
+
+Telegram, сессии БД и создание задачи подменяются локальными заглушками,
+код notify_user и TaskScheduler._execute_task — настоящий.
+
+Пример запуска (внутри контейнера app):
+
+    python ../scripts/notify_retry_selftest.py
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+
+import database.connection  # noqa: E402
+import models  # noqa: E402,F401  (порядок импорта как в приложении: модели до executors_client)
+import modules.exec.executors_client as executors_client  # noqa: E402
+import modules.tasks.scheduler as scheduler_module  # noqa: E402
+from models.ScheduledTask import ScheduledTask  # noqa: E402
+from modules.exec.notify_dispatcher import NotificationDispatcher  # noqa: E402
+from modules.tasks.scheduler import TaskScheduler  # noqa: E402
+from modules.timezone import now_naive as moscow_now  # noqa: E402
+
+RETRY_AFTER = 120
+
+
+class FakeBot:
+    id = 1
+
+    async def get_me(self):
+        return SimpleNamespace(username="selftest_bot")
+
+
+class FakeTelegram:
+    """ TelegramExecutor.send_message с очередью ответов.
+    """
+
+    def __init__(self, responses: list[dict]):
+        self.bot = FakeBot()
+        self.responses = list(responses)
+        self.sent: list[dict] = []
+
+    async def send_message(self, **kwargs) -> dict:
+        result = self.responses.pop(0) if self.responses else {"success": True}
+        if result.get("success"):
+            self.sent.append(kwargs)
+        return {"message_id": len(self.sent), **result}
+
+
+class FakeSession:
+    def __init__(self, cards: set):
+        self.cards = cards
+        self.statements: list = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, model, key):
+        return SimpleNamespace(card_id=key) if key in self.cards else None
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+    def add(self, obj):
+        self.statements.append(obj)
+
+    async def commit(self):
+        pass
+
+
+class FakeSessionFactory:
+    def __init__(self, cards: set = ()):
+        self.cards = set(cards)
+        self.sessions: list[FakeSession] = []
+
+    def __call__(self) -> FakeSession:
+        session = FakeSession(self.cards)
+        self.sessions.append(session)
+        return session
+
+
+def install(telegram: FakeTelegram) -> list[ScheduledTask]:
+    """Подменить Telegram, сессии и создание задач; вернуть список созданных задач."""
+    created: list[ScheduledTask] = []
+
+    async def create_scheduled_task(session, function_path, execute_at, **kwargs):
+        # Аргументы хранятся в JSON-колонке
+        arguments = json.loads(json.dumps(kwargs))
+        task = ScheduledTask(
+            task_id=uuid4(), function_path=function_path, execute_at=execute_at,
+            arguments=arguments, attempts=1, max_attempts=5,
+        )
+        created.append(task)
+        return task
+
+    executors_client._get_tg = lambda: telegram
+    executors_client.notify_dispatcher = NotificationDispatcher()
+    scheduler_module.create_scheduled_task = create_scheduled_task
+    database.connection.session_factory = FakeSessionFactory()
+    return created
+
+
+async def run_task(task: ScheduledTask, cards: set) -> dict:
+    """Выполнить задачу настоящим TaskScheduler._execute_task."""
+    sessions = FakeSessionFactory(cards)
+    scheduler = TaskScheduler(sessions)
+    failures = []
+
+    async def fail_task(task, error):
+        failures.append(error)
+
+    scheduler._fail_task = fail_task
+    # Повтор выполняется после паузы — у диспетчера новый слот чата
+    executors_client.notify_dispatcher = NotificationDispatcher()
+    await scheduler._execute_task(task)
+
+    statements = [st for session in sessions.sessions for st in session.statements]
+    return {
+        "failures": failures,
+        "completed": any(getattr(st, "is_delete", False) for st in statements),
+    }
+
+
+async def reschedule(card_id: str) -> tuple[FakeTelegram, ScheduledTask]:
+    telegram = FakeTelegram([{"success": False, "error": "Flood", "retry_after": RETRY_AFTER}])
+    created = install(telegram)
+
+    started = moscow_now()
+    sent = await executors_client.notify_user(42, "selftest", card_id=card_id)
+    assert sent is False and not telegram.sent, telegram.sent
+    assert len(created) == 1, created
+
+    task = created[0]
+    assert task.function_path == "modules.exec.executors_client.notify_user", task.function_path
+    assert task.execute_at >= started + timedelta(seconds=RETRY_AFTER), task.execute_at
+    assert task.arguments["card_id"] == card_id, task.arguments
+    return telegram, task
+
+
+async def check_retry():
+    card_id = uuid4()
+    telegram, task = await reschedule(str(card_id))
+
+    result = await run_task(task, cards={card_id})
+    assert not result["failures"], result["failures"]
+    assert result["completed"], "task was not removed after success"
+    assert len(telegram.sent) == 1, telegram.sent
+    assert telegram.sent[0]["chat_id"] == "42" and telegram.sent[0]["text"] == "selftest"
+    return {"sent": len(telegram.sent), "execute_in": str(task.execute_at - moscow_now())[:7]}
+
+
+async def check_card_gone():
+    telegram, task = await reschedule(str(uuid4()))
+
+    result = await run_task(task, cards=set())
+    assert not result["failures"], result["failures"]
+    assert result["completed"], "task for a deleted card was not removed"
+    assert not telegram.sent, telegram.sent
+    return {"sent": len(telegram.sent)}
+
+
+async def check_global_pause():
+    pause = 0.3
+    dispatcher = NotificationDispatcher(global_rate=100, max_inline_wait=0.01)
+    responses = [{"success": False, "retry_after": pause}]
+
+    async def send():
+        return responses.pop(0) if responses else {"success": True}
+
+    started = time.perf_counter()
+    first = await dispatcher.send(1, send)
+    second = await dispatcher.send(2, send)
+    elapsed = time.perf_counter() - started
+    assert first.get("retry_after") == pause, first
+    assert second.get("success") and elapsed >= pause, (second, elapsed)
+    return {"other_chat_waited": round(elapsed, 2)}
+
+
+async def run():
+    for name, check in [
+        ("retry", check_retry()),
+        ("card-gone", check_card_gone()),
+        ("global-pause", check_global_pause()),
+    ]:
+        print(f"{name:<12} {await check}")
+
+
+def main(argv: list[str] | None = None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.parse_args(argv)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
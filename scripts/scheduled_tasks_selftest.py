@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""Проверка, что каждая задача планировщика вызывается со своими аргументами.
+
+Задачи создаются настоящими функциями, которые их планируют:
+schedule_card_notifications, schedule_post_tasks, finalize_card_publication
+(delete_sent_card), check_and_create_*_reset_task, schedule_storage_gc и
+notify_user при флуд-контроле. Затем каждая задача выполняется настоящим
+TaskScheduler._execute_task: функция импортируется по function_path, а её
+аргументы проверяются по сигнатуре (``inspect.signature(...).bind``) вместо
+реального вызова. Задача не должна попасть в ``_fail_task``.
+
+Отдельно проверяется finalize_card_publication: пока отправка ждёт
+повтора, задача переносится без засчитывания попытки, а если отправка
+ушла в ``failed_tasks``, карточка не становится отправленной; и
+send_post_now: повтор не дублирует доставленный пост, а частичная
+доставка не ведёт к повтору.
+
+БД, Telegram и конфиги подменяются локальными заглушками.
+
+Пример запуска (внутри контейнера app):
+
+    python ../scripts/scheduled_tasks_selftest.py
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import json
+import sys
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+
+import database.connection  # noqa: E402
+import models  # noqa: E402,F401  (порядок импорта как в приложении: модели до executors_client)
+import modules.exec.executors_client as executors_client  # noqa: E402
+import modules.json_utils as json_utils  # noqa: E402
+import modules.tasks.notifications as notifications  # noqa: E402
+import modules.tasks.reset_tasks as reset_tasks  # noqa: E402
+import modules.tasks.scheduler as scheduler_module  # noqa: E402
+import modules.tasks.storage_gc as storage_gc  # noqa: E402
+from models.Card import Card, CardStatus  # noqa: E402
+from models.ScheduledTask import ScheduledTask  # noqa: E402
+from models.User import User  # noqa: E402
+from modules.exec.notify_dispatcher import NotificationDispatcher  # noqa: E402
+from modules.tasks.scheduler import TaskScheduler  # noqa: E402
+from modules.timezone import now_naive as moscow_now  # noqa: E402
+
+CLIENT_KEY = "selftest_tg"
+
+
+class FakeSession:
+    """Сессия, складывающая добавленные задачи в общий список."""
+
+    def __init__(self, factory: "FakeSessionFactory"):
+        self.created = factory.created
+        self.cards = factory.cards
+        self.scalars = factory.scalars
+        self.statements: list = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def add(self, obj):
+        if isinstance(obj, ScheduledTask):
+            self.created.append(obj)
+        self.statements.append(obj)
+
+    async def get(self, model, key):
+        return SimpleNamespace(card_id=key) if key in self.cards else None
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+    async def scalar(self, statement):
+        return self.scalars.pop(0) if self.scalars else None
+
+    async def commit(self):
+        pass
+
+    async def refresh(self, obj):
+        pass
+
+
+class FakeSessionFactory:
+    def __init__(self, created: list | None = None, cards: set = (), scalars: list = ()):
+        self.created = created if created is not None else []
+        self.cards = set(cards)
+        # Ответы session.scalar по порядку (None, когда закончились)
+        self.scalars = list(scalars)
+        self.sessions: list[FakeSession] = []
+
+    def __call__(self) -> FakeSession:
+        session = FakeSession(self)
+        self.sessions.append(session)
+        return session
+
+
+class FakeTelegram:
+    """Telegram, всегда отвечающий RetryAfter."""
+
+    bot = SimpleNamespace(id=1)
+
+    async def send_message(self, **kwargs) -> dict:
+        return {"success": False, "error": "Flood", "retry_after": 120}
+
+
+def fake_card(card_id) -> SimpleNamespace:
+    now = moscow_now()
+
+    async def get_task():
+        return SimpleNamespace(deadline=now + timedelta(days=5))
+
+    async def update(**kwargs):
+        card.__dict__.update(kwargs)
+
+    async def no_messages(**kwargs):
+        return []
+
+    card = SimpleNamespace(
+        card_id=card_id, task_id=1, name="selftest", clients=[CLIENT_KEY],
+        send_time=now + timedelta(hours=1), tags=[], status=CardStatus.ready,
+        get_task=get_task, update=update,
+        get_messages=no_messages, get_complete_messages_by_client=no_messages,
+    )
+    return card
+
+
+async def collect_tasks(card_id) -> list[ScheduledTask]:
+    """Создать задачи всех типов настоящими планирующими функциями."""
+    created: list[ScheduledTask] = []
+    factory = FakeSessionFactory(created)
+    card = fake_card(card_id)
+
+    async def create_scheduled_task(session, function_path, execute_at, **kwargs):
+        task = ScheduledTask(function_path=function_path, execute_at=execute_at, arguments=kwargs)
+        session.add(task)
+        return task
+
+    async def get_card(cls, key, value, session=None):
+        return card
+
+    async def no_rows(cls, *args, **kwargs):
+        return []
+
+    async def create_row(cls, **kwargs):
+        task = ScheduledTask(**kwargs)
+        created.append(task)
+        return task
+
+    async def noop(*args, **kwargs):
+        return None
+
+    json_utils.open_clients = lambda: {CLIENT_KEY: {"executor_name": "telegram_executor"}}
+    notifications.open_clients = json_utils.open_clients
+    scheduler_module.create_scheduled_task = create_scheduled_task
+    database.connection.session_factory = factory
+    storage_gc.session_factory = factory
+    Card.get_by_key = classmethod(get_card)
+    User.filter_by = classmethod(no_rows)
+    ScheduledTask.filter_by = classmethod(no_rows)
+    ScheduledTask.create = classmethod(create_row)
+    import modules.card.status_changers as status_changers
+    status_changers.to_sent = noop
+    executors_client._get_tg = lambda: FakeTelegram()
+    executors_client.notify_dispatcher = NotificationDispatcher(max_inline_wait=0.01)
+
+    session = factory()
+    await scheduler_module.schedule_card_notifications(session, card)
+    await scheduler_module.schedule_post_tasks(session, card)
+    await notifications.finalize_card_publication(str(card_id))
+    await reset_tasks.check_and_create_monthly_reset_task()
+    await reset_tasks.check_and_create_yearly_reset_task()
+    await storage_gc.schedule_storage_gc(moscow_now(), cursor=0)
+    await executors_client.notify_user(42, "selftest", card_id=str(card_id))
+
+    # Аргументы хранятся в JSON-колонке
+    for task in created:
+        task.task_id = uuid4()
+        task.arguments = json.loads(json.dumps(task.arguments or {}))
+        task.attempts, task.max_attempts = 1, 5
+    return created
+
+
+async def run_task(task: ScheduledTask, cards: set) -> dict:
+    """Выполнить задачу настоящим _execute_task, проверив аргументы по сигнатуре."""
+    scheduler = TaskScheduler(FakeSessionFactory(cards=cards))
+    failures, calls = [], []
+
+    def import_function(function_path):
+        func = TaskScheduler._import_function(scheduler, function_path)
+        assert inspect.iscoroutinefunction(func), function_path
+
+        async def call(**arguments):
+            inspect.signature(func).bind(**arguments)
+            calls.append(function_path)
+
+        return call
+
+    async def fail_task(task, error):
+        failures.append(repr(error))
+
+    scheduler._import_function = import_function
+    scheduler._fail_task = fail_task
+    await scheduler._execute_task(task)
+    return {"failures": failures, "called": bool(calls)}
+
+
+async def run_finalize(card, scalars: list) -> dict:
+    """Выполнить finalize_card_publication при заданном состоянии отправок."""
+    created: list[ScheduledTask] = []
+    database.connection.session_factory = FakeSessionFactory(created, scalars=scalars)
+
+    async def get_card(cls, key, value, session=None):
+        return card
+
+    Card.get_by_key = classmethod(get_card)
+    scheduler = TaskScheduler(FakeSessionFactory(cards={card.card_id}))
+    failures, released = [], []
+
+    async def fail_task(task, error):
+        failures.append(repr(error))
+
+    async def release_task(task, execute_at=None):
+        released.append(execute_at)
+
+    scheduler._fail_task = fail_task
+    scheduler._release_task = release_task
+    task = ScheduledTask(
+        task_id=uuid4(), function_path="modules.tasks.notifications.finalize_card_publication",
+        execute_at=moscow_now(), arguments={"card_id": str(card.card_id)}, attempts=1, max_attempts=5,
+    )
+    await scheduler._execute_task(task)
+    return {"failures": failures, "released": released, "created": created}
+
+
+async def check_finalize_gating(card_id):
+    # Отправка ещё ждёт повтора — финализация переносится за неё
+    retry_at = moscow_now() + timedelta(minutes=4)
+    card = fake_card(card_id)
+    result = await run_finalize(card, scalars=[retry_at, 0])
+    assert not result["failures"], result["failures"]
+    assert result["released"] and result["released"][0] > retry_at, result["released"]
+    assert card.status == CardStatus.ready and not result["created"], card.status
+
+    # Отправка ушла в failed_tasks — карточка не становится отправленной
+    card = fake_card(card_id)
+    result = await run_finalize(card, scalars=[None, 1])
+    assert not result["failures"] and not result["released"], result
+    assert card.status == CardStatus.ready and not result["created"], card.status
+
+    # Все отправки выполнены — статус sent и задача удаления
+    card = fake_card(card_id)
+    result = await run_finalize(card, scalars=[None, 0])
+    assert not result["failures"] and not result["released"], result
+    assert card.status == CardStatus.sent, card.status
+    assert [t.function_path.rsplit('.', 1)[1] for t in result["created"]] == ["delete_sent_card"]
+
+
+async def check_send_idempotent(card_id):
+    import modules.entities_sender as entities_sender
+    import modules.post_sender as post_sender
+    from models.CardMessage import CardMessage
+
+    # Telegram: пост ушёл, опрос упал — результат частичный, ID поста есть
+    async def send_message(**kwargs):
+        return {"success": True, "message_id": 10}
+
+    async def broken_poll(**kwargs):
+        raise RuntimeError("poll failed")
+
+    entities_sender.send_poll_preview = broken_poll
+    executor = SimpleNamespace(bot=None, send_message=send_message)
+    partial = await post_sender._send_post_tg(executor, "1", "text", [], [{"type": "poll"}], {})
+    assert not partial["success"] and partial["sent_message_ids"]["send_main"] == [10], partial
+
+    card = SimpleNamespace(card_id=card_id, name="selftest", saved=[])
+
+    async def add_message(**kwargs):
+        card.saved.append(kwargs)
+
+    card.add_message = add_message
+    card.publish_view = lambda client_key: dict.fromkeys(
+        ("content", "tags", "post_images", "settings", "entities", "files"))
+    responses, alerts, existing = [], [], []
+
+    async def load_aggregate(cls, card_id, session=None):
+        return card
+
+    async def filter_by(cls, **kwargs):
+        return list(existing)
+
+    async def send_post(**kwargs):
+        return responses.pop(0)
+
+    async def notify_admins(card, client_key, error, logs=None):
+        alerts.append(error)
+
+    Card.load_aggregate = classmethod(load_aggregate)
+    CardMessage.filter_by = classmethod(filter_by)
+    post_sender.send_post = send_post
+    notifications.notify_admins_about_post_failure = notify_admins
+
+    # Частичная доставка: ID сохранены, админы уведомлены, повтора нет
+    responses.append(partial)
+    await notifications.send_post_now(str(card_id), CLIENT_KEY)
+    assert [m["message_id"] for m in card.saved] == [10] and len(alerts) == 1, (card.saved, alerts)
+
+    # Ничего не доставлено — ошибка для повтора
+    responses.append({"success": False, "error": "timeout"})
+    try:
+        await notifications.send_post_now(str(card_id), CLIENT_KEY)
+    except notifications.PostSendError:
+        pass
+    else:
+        raise AssertionError("undelivered post was not retried")
+
+    # Повтор после доставки — пост не отправляется заново
+    existing.append(SimpleNamespace(message_type="send_main", data_info=CLIENT_KEY))
+    responses.append({"success": True})
+    await notifications.send_post_now(str(card_id), CLIENT_KEY)
+    assert responses, "post was sent twice"
+
+
+async def run():
+    card_id = uuid4()
+    tasks = await collect_tasks(card_id)
+    expected = {
+        "modules.tasks.notifications.send_card_deadline_reminder",
+        "modules.tasks.notifications.send_admin_no_executor_alert",
+        "modules.tasks.notifications.send_forum_deadline_passed",
+        "modules.tasks.notifications.send_post_now",
+        "modules.tasks.notifications.finalize_card_publication",
+        "modules.tasks.notifications.delete_sent_card",
+        "modules.tasks.notifications.reset_monthly_tasks",
+        "modules.tasks.notifications.reset_yearly_tasks",
+        storage_gc.GC_FUNCTION_PATH,
+        "modules.exec.executors_client.notify_user",
+    }
+    counts = Counter(task.function_path for task in tasks)
+    missing = expected - set(counts)
+    assert not missing, f"tasks were not created: {sorted(missing)}"
+
+    for task in tasks:
+        result = await run_task(task, cards={card_id})
+        assert not result["failures"], (task.function_path, result["failures"])
+        assert result["called"], f"{task.function_path} was not called"
+        print(f"{task.function_path.rsplit('.', 1)[1]:<30} ok  {sorted(task.arguments)}")
+    print(f"{'total':<30} {sum(counts.values())} tasks, {len(counts)} types")
+
+    await check_finalize_gating(card_id)
+    print(f"{'finalize-gating':<30} ok")
+
+    await check_send_idempotent(card_id)
+    print(f"{'send-idempotent':<30} ok")
+
+
+def main(argv: list[str] | None = None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.parse_args(argv)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Сверка хранилища файлов с card_files и отчёт об объёме.
+
+Выполняет полный обход хранилища тем же кодом, что и задача
+планировщика (``modules.tasks.storage_gc``): удаляет файлы без записей
+CardFile; записи без файлов — только с ``--delete-missing-rows``.
+Без ``--apply`` ничего не удаляется.
+
+Пример запуска (внутри контейнера app):
+
+    python ../scripts/storage_gc.py --report --top 20
+    python ../scripts/storage_gc.py --apply --ops-per-second 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "app"))
+
+from modules.tasks.storage_gc import collect_storage_garbage, storage_usage  # noqa: E402
+
+
+def mb(size: int) -> str:
+    return f"{size / 1024 ** 2:.1f} MB"
+
+
+def print_usage(usage: dict):
+    print(f"total: {mb(usage['logical_bytes'])} in card_files, "
+          f"{mb(usage['physical_bytes'])} unique blobs")
+
+    print()
+    header = f"{'card_id':<38}{'files':>7}{'size':>12}  name"
+    print(header)
+    print("-" * len(header))
+    for row in usage["cards"]:
+        print(f"{row['card_id']:<38}{row['files']:>7}{mb(row['bytes']):>12}  {row['name']}")
+
+    print()
+    header = f"{'user_id (customer)':<38}{'cards':>7}{'files':>7}{'size':>12}"
+    print(header)
+    print("-" * len(header))
+    for row in usage["users"]:
+        print(f"{row['user_id'] or '-':<38}{row['cards']:>7}{row['files']:>7}{mb(row['bytes']):>12}")
+
+
+async def run(args):
+    result = await collect_storage_garbage(
+        cursor=0,
+        parts=0,
+        ops_per_second=args.ops_per_second,
+        grace_hours=args.grace_hours,
+        dry_run=not args.apply,
+        delete_missing_rows=args.delete_missing_rows,
+        reschedule=False,
+    )
+    prefix = "" if args.apply else "[dry-run] "
+    print(f"{prefix}{result['stats']}")
+    for error in result["stats"].errors:
+        print(f"  error: {error}")
+
+    if args.report:
+        print()
+        print_usage(await storage_usage(args.top))
+
+
+def main(argv: list[str] | None = None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--apply", action="store_true", help="delete orphans (default: dry run)")
+    p.add_argument("--ops-per-second", type=float, default=200, help="file operations budget")
+    p.add_argument("--delete-missing-rows", action="store_true",
+                   help="also delete card_files rows whose blob is missing")
+    p.add_argument("--grace-hours", type=float, default=24, help="keep unreferenced files younger than this")
+    p.add_argument("--report", action="store_true", help="print usage per card and per user")
+    p.add_argument("--top", type=int, default=20, help="rows in usage report (0 — all)")
+    args = p.parse_args(argv)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
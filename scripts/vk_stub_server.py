@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Локальная заглушка VK API для проверки VKExecutor без обращения к VK.
+
+Отвечает на методы, которые использует ``vk.main.VKExecutor``
+(``wall.*``, ``messages.*``, ``photos.getWallUploadServer`` /
+``photos.saveWallPhoto``, ``video.save``, ``docs.*``) и принимает
+загрузку файлов на собственные upload-адреса. Все вызовы сохраняются
+в ``VKStubServer.calls`` — удобно для проверок в тестах::
+
+    async with VKStubServer() as stub:
+        executor = VKExecutor({"access_token": "t", "user_token": "u",
+                               "group_id": 1, "api_url": stub.api_url})
+        await executor.create_wall_post("text")
+        assert stub.calls[-1][0] == "wall.post"
+
+Запуск отдельным процессом (``api_url`` из вывода указать в конфиге
+vk_executor):
+
+    python scripts/vk_stub_server.py --port 8089 --latency 0.5
+
+Режим ``--selftest`` поднимает заглушку, загружает через VKExecutor
+несколько фото (``upload_wall_media``), публикует пост и печатает
+максимальную задержку цикла событий за это время.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import sys
+import time
+from pathlib import Path
+
+from aiohttp import web
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class VKStubServer:
+    """aiohttp-сервер, имитирующий VK API и upload-серверы."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.calls: list[tuple[str, dict]] = []
+        self.uploads: list[tuple[str, str, int]] = []
+        self.posts: dict[int, dict] = {}
+        self._ids = itertools.count(1)
+        self._runner: web.AppRunner | None = None
+
+        self.app = web.Application(client_max_size=1024 ** 3)
+        self.app.router.add_post("/method/{method}", self._method)
+        self.app.router.add_post("/upload/{kind}", self._upload)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/method"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # При port=0 порт выбирает система
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "VKStubServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # ── API ──────────────────────────────────────────────────────────────
+
+    async def _method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls.append((method, params))
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if not params.get("access_token"):
+            return self._error(5, "User authorization failed: no access_token passed.")
+
+        handler = self.METHODS.get(method)
+        if handler is None:
+            return self._error(3, "Unknown method passed")
+        return web.json_response({"response": handler(self, params)})
+
+    @staticmethod
+    def _error(code: int, message: str) -> web.Response:
+        return web.json_response({"error": {"error_code": code, "error_msg": message}})
+
+    def _upload_url(self, kind: str) -> str:
+        return f"{self.base_url}/upload/{kind}"
+
+    def _wall_post(self, params):
+        post_id = next(self._ids)
+        self.posts[post_id] = params
+        return {"post_id": post_id}
+
+    def _wall_edit(self, params):
+        post_id = int(params["post_id"])
+        self.posts[post_id] = params
+        return {"post_id": post_id}
+
+    def _wall_get(self, params):
+        items = [{"id": pid, "text": p.get("message", "")} for pid, p in self.posts.items()]
+        return {"count": len(items), "items": items}
+
+    def _save_wall_photo(self, params):
+        return [{"id": next(self._ids), "owner_id": -abs(int(params["group_id"]))}]
+
+    def _video_save(self, params):
+        return {
+            "upload_url": self._upload_url("video"),
+            "video_id": next(self._ids),
+            "owner_id": -abs(int(params["group_id"])),
+        }
+
+    def _docs_save(self, params):
+        return {"type": "doc", "doc": {"id": next(self._ids), "owner_id": -1,
+                                       "title": params.get("title", "")}}
+
+    METHODS = {
+        "wall.post": _wall_post,
+        "wall.edit": _wall_edit,
+        "wall.delete": lambda self, p: 1,
+        "wall.get": _wall_get,
+        "wall.pin": lambda self, p: 1,
+        "wall.unpin": lambda self, p: 1,
+        "wall.createComment": lambda self, p: {"comment_id": next(self._ids)},
+        "wall.deleteComment": lambda self, p: 1,
+        "messages.send": lambda self, p: next(self._ids),
+        "messages.edit": lambda self, p: 1,
+        "messages.delete": lambda self, p: {p.get("message_ids", "0"): 1},
+        "photos.getWallUploadServer": lambda self, p: {"upload_url": self._upload_url("photo")},
+        "photos.saveWallPhoto": _save_wall_photo,
+        "video.save": _video_save,
+        "docs.getWallUploadServer": lambda self, p: {"upload_url": self._upload_url("doc")},
+        "docs.save": _docs_save,
+    }
+
+    # ── Upload ───────────────────────────────────────────────────────────
+
+    async def _upload(self, request: web.Request) -> web.Response:
+        kind = request.match_info["kind"]
+        reader = await request.multipart()
+        part = await reader.next()
+        if part is None:
+            return web.json_response({"error": "no file"}, status=400)
+
+        size = 0
+        while chunk := await part.read_chunk():
+            size += len(chunk)
+        self.uploads.append((kind, part.filename, size))
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if kind == "photo":
+            return web.json_response({"server": 1, "photo": f'[{{"size":{size}}}]', "hash": "stub"})
+        if kind == "doc":
+            return web.json_response({"file": f"doc-{size}"})
+        return web.json_response({"size": size})
+
+
+async def selftest(latency: float, photos: int):
+    sys.path.insert(0, str(ROOT / "app"))
+    from vk.main import VKExecutor
+
+    async with VKStubServer(latency=latency) as stub:
+        executor = VKExecutor({
+            "access_token": "group-token",
+            "user_token": "user-token",
+            "group_id": 1,
+            "api_url": stub.api_url,
+        })
+
+        lag = 0.0
+        stop = asyncio.Event()
+
+        async def heartbeat():
+            nonlocal lag
+            while not stop.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lag = max(lag, time.perf_counter() - started - 0.01)
+
+        beat = asyncio.create_task(heartbeat())
+        photo = b"\x89PNG\r\n\x1a\n" + b"\0" * 200_000
+        files = [{"data": photo, "name": f"{i}.png", "type": "photo"} for i in range(photos)]
+        try:
+            started = time.perf_counter()
+            results = await executor.upload_wall_media(files)
+            assert all(res["success"] for res in results), results
+            attachments = [res["attachment"] for res in results]
+            post = await executor.create_wall_post("selftest", attachments=attachments)
+            assert post["success"], post
+            elapsed = time.perf_counter() - started
+        finally:
+            stop.set()
+            await beat
+            await executor.transport.close()
+
+        print(f"calls: {len(stub.calls)}, uploads: {len(stub.uploads)}, post_id: {post['post_id']}")
+        print(f"elapsed: {elapsed:.2f}s, max event loop lag: {lag * 1000:.1f}ms")
+
+
+async def serve(host: str, port: int, latency: float):
+    async with VKStubServer(host, port, latency) as stub:
+        print(f"VK stub listening, api_url={stub.api_url}")
+        await asyncio.Event().wait()
+
+
+def main(argv: list[str] | None = None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--latency", type=float, default=0.0, help="delay per request, seconds")
+    p.add_argument("--selftest", action="store_true", help="run VKExecutor against the stub")
+    p.add_argument("--photos", type=int, default=5, help="photos to upload in --selftest")
+    args = p.parse_args(argv)
+
+    try:
+        if args.selftest:
+            asyncio.run(selftest(args.latency, args.photos))
+        else:
+            asyncio.run(serve(args.host, args.port, args.latency))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()